@@ -1,45 +1,51 @@
 from dotenv import load_dotenv
 load_dotenv()  # .env dosyasını yükle
 
+import io
 import os
 import logging
-from datetime import datetime
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, Response
+import threading
+from datetime import datetime, timedelta
+import click
+from flask import Flask, Blueprint, render_template, request, redirect, url_for, flash, jsonify, Response, current_app, send_file, stream_with_context
+from flask.cli import with_appcontext
 from flask_login import LoginManager, login_user, login_required, logout_user, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
 from functools import wraps
-from database import db, init_db
-import cv2
+from database import db, init_db, add_missing_columns
+from ingest_queue import WriteBehindQueue
+from user_cache import SessionUser, UserCache
+from http_cache import init_http_cache, conditional_json, ensure_table_versions
+from camera_sharding import assign_cameras, settle_capacity
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
-# Create Flask app
-app = Flask(__name__)
-app.secret_key = os.environ.get("SESSION_SECRET")
-
-# Initialize database
-init_db(app)
+# Görüntü işleme modülleri (cv2, numpy) içe aktarılırken yüklenmez; sadece kamera
+# uç noktaları ilk çağrıldığında yüklenir, böylece worker açılışı hızlı ve hafif kalır
+bp = Blueprint('main', __name__)
 
 # Initialize Flask-Login
 login_manager = LoginManager()
-login_manager.init_app(app)
-login_manager.login_view = 'login'
+login_manager.login_view = 'main.login'
 login_manager.login_message = 'Lütfen önce giriş yapın.'
 
-# Import models after db initialization to avoid circular imports
-from models import User, AuthorizedPlate, PlateRecord, AuthorizationHistory, CameraSettings
+from models import User, AuthorizedPlate, PlateRecord, AuthorizationHistory, CameraSettings, AuthorizedPlateChange, Visit, DetectorNode
+from visits import record_visits, rebuild_visits
+from plate_search import search_plate_records, ensure_search_index
+from plate_import import parse_plate_csv, import_authorized_plates, export_authorized_plates
+from evidence_store import EVIDENCE_KINDS, is_evidence_ref, evidence_path, thumbnail_path
 
 def role_required(roles):
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
             if not current_user.is_authenticated:
-                return redirect(url_for('login'))
+                return redirect(url_for('main.login'))
             if current_user.role not in roles:
                 flash('Bu sayfaya erişim yetkiniz yok.')
-                return redirect(url_for('dashboard'))
+                return redirect(url_for('main.dashboard'))
             return f(*args, **kwargs)
         return decorated_function
     return decorator
@@ -58,19 +64,84 @@ def api_token_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def record_plate_change(plate, deleted=False, plate_number=None):
+    """
+    Append an AuthorizedPlateChange row so edge detectors pick up the change
+    """
+    db.session.add(AuthorizedPlateChange(
+        plate_number=plate_number or plate.plate_number,
+        is_active=bool(plate.is_active) and not deleted,
+        sensitivity=plate.sensitivity,
+        deleted=deleted
+    ))
+
+def mark_camera_connected(app, camera_id):
+    with app.app_context():
+        camera = CameraSettings.query.get(camera_id)
+        if camera:
+            camera.last_connected = datetime.utcnow()
+            db.session.commit()
+
+_camera_manager_lock = threading.Lock()
+
+def get_camera_manager(create=True):
+    """
+    Return the app's CameraManager, creating it on first use
+
+    Camera connections are opened once per worker and shared by all viewers.
+    With create=False None is returned when no camera was opened yet, so
+    endpoints that only stop connections do not load OpenCV.
+    """
+    app = current_app._get_current_object()
+    manager = app.extensions.get('camera_manager')
+    if manager is None and create:
+        with _camera_manager_lock:
+            manager = app.extensions.get('camera_manager')
+            if manager is None:
+                from camera_manager import CameraManager
+                manager = app.extensions['camera_manager'] = CameraManager(
+                    on_connect=lambda camera_id: mark_camera_connected(app, camera_id),
+                    idle_timeout=float(os.environ.get("CAMERA_IDLE_TIMEOUT", 60))
+                )
+    return manager
+
+def stop_camera_connection(camera_id):
+    manager = get_camera_manager(create=False)
+    if manager:
+        manager.stop(camera_id)
+
+# Canlı yayın kapasitesi API'den ayrı ayarlanır; yayınlar stream_server.py ile ayrı
+# bir süreçte sunuluyorsa STREAM_BASE_URL o sunucunun adresidir
+STREAM_BASE_URL = os.environ.get("STREAM_BASE_URL", "")
+STREAM_JPEG_QUALITY = int(os.environ.get("STREAM_JPEG_QUALITY", 80))
+stream_slots = threading.BoundedSemaphore(int(os.environ.get("STREAM_MAX_CLIENTS", 4)))
+
+def ensure_camera_connection(camera):
+    from video_capture import CaptureOptions, build_stream_url
+    stream_url, _ = build_stream_url(camera)
+    options = CaptureOptions.from_settings(camera.settings, stream_url)
+    return get_camera_manager().ensure(camera.id, stream_url, options)
+
+def load_session_user(user_id):
+    user = User.query.get(user_id)
+    return SessionUser.from_user(user) if user else None
+
+# Kullanıcı kimliği ve rolü her istekte veritabanından okunmaz
+user_cache = UserCache(load_session_user, ttl=float(os.environ.get("USER_CACHE_TTL", 30)))
+
 @login_manager.user_loader
 def load_user(user_id):
     try:
-        return User.query.get(int(user_id))
+        return user_cache.get(int(user_id))
     except (ValueError, TypeError):
         return None
 
-@app.route('/')
+@bp.route('/')
 @login_required
 def index():
-    return redirect(url_for('dashboard'))
+    return redirect(url_for('main.dashboard'))
 
-@app.route('/login', methods=['GET', 'POST'])
+@bp.route('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
         username = request.form.get('username')
@@ -81,31 +152,32 @@ def login():
             login_user(user)
             user.last_login = datetime.utcnow()
             db.session.commit()
-            return redirect(url_for('dashboard'))
+            user_cache.invalidate(user.id)
+            return redirect(url_for('main.dashboard'))
 
         flash('Geçersiz kullanıcı adı veya şifre')
     return render_template('login.html')
 
-@app.route('/logout')
+@bp.route('/logout')
 @login_required
 def logout():
     logout_user()
     flash('Başarıyla çıkış yaptınız')
-    return redirect(url_for('login'))
+    return redirect(url_for('main.login'))
 
-@app.route('/dashboard')
+@bp.route('/dashboard')
 @login_required
 def dashboard():
-    return render_template('dashboard.html')
+    return render_template('dashboard.html', stream_base_url=STREAM_BASE_URL)
 
-@app.route('/users')
+@bp.route('/users')
 @login_required
 @role_required(['admin'])
 def users():
     users = User.query.all()
     return render_template('users.html', users=users)
 
-@app.route('/api/users', methods=['POST'])
+@bp.route('/api/users', methods=['POST'])
 @login_required
 @role_required(['admin'])
 def add_user():
@@ -128,7 +200,13 @@ def add_user():
 
     return jsonify(new_user.to_dict()), 201
 
-@app.route('/api/users/<int:user_id>/toggle-status', methods=['POST'])
+@bp.route('/api/users/cache-stats', methods=['GET'])
+@login_required
+@role_required(['admin'])
+def get_user_cache_stats():
+    return jsonify(user_cache.stats())
+
+@bp.route('/api/users/<int:user_id>/toggle-status', methods=['POST'])
 @login_required
 @role_required(['admin'])
 def toggle_user_status(user_id):
@@ -139,17 +217,18 @@ def toggle_user_status(user_id):
 
     user.is_active = not user.is_active
     db.session.commit()
+    user_cache.invalidate(user_id)
 
     return jsonify({'status': 'success'})
 
-@app.route('/api/users/<int:user_id>', methods=['GET'])
+@bp.route('/api/users/<int:user_id>', methods=['GET'])
 @login_required
 @role_required(['admin'])
 def get_user(user_id):
     user = User.query.get_or_404(user_id)
     return jsonify(user.to_dict())
 
-@app.route('/api/users/<int:user_id>', methods=['PUT'])
+@bp.route('/api/users/<int:user_id>', methods=['PUT'])
 @login_required
 @role_required(['admin'])
 def update_user(user_id):
@@ -176,9 +255,10 @@ def update_user(user_id):
         user.role = data['role']
 
     db.session.commit()
+    user_cache.invalidate(user_id)
     return jsonify(user.to_dict())
 
-@app.route('/api/users/<int:user_id>', methods=['DELETE'])
+@bp.route('/api/users/<int:user_id>', methods=['DELETE'])
 @login_required
 @role_required(['admin'])
 def delete_user(user_id):
@@ -189,21 +269,23 @@ def delete_user(user_id):
 
     db.session.delete(user)
     db.session.commit()
+    user_cache.invalidate(user_id)
     return jsonify({'status': 'success'})
 
-@app.route('/authorized-plates')
+@bp.route('/authorized-plates')
 @login_required
 def authorized_plates():
     plates = AuthorizedPlate.query.all()
     return render_template('authorized_plates.html', plates=plates)
 
-@app.route('/api/authorized-plates', methods=['GET'])
+@bp.route('/api/authorized-plates', methods=['GET'])
 @login_required
+@conditional_json('authorized_plate')
 def get_authorized_plates():
     plates = AuthorizedPlate.query.all()
-    return jsonify([plate.to_dict() for plate in plates])
+    return [plate.to_dict() for plate in plates]
 
-@app.route('/api/authorized-plates', methods=['POST'])
+@bp.route('/api/authorized-plates', methods=['POST'])
 @login_required
 def add_authorized_plate():
     data = request.get_json()
@@ -219,11 +301,37 @@ def add_authorized_plate():
 
     new_plate = AuthorizedPlate(plate_number=plate_number, description=description)
     db.session.add(new_plate)
+    db.session.flush()
+    record_plate_change(new_plate)
     db.session.commit()
 
     return jsonify(new_plate.to_dict()), 201
 
-@app.route('/api/authorized-plates/<int:plate_id>', methods=['PUT'])
+@bp.route('/api/authorized-plates/import', methods=['POST'])
+@login_required
+@role_required(['admin'])
+def import_authorized_plates_csv():
+    # CSV, multipart "file" alanı veya doğrudan istek gövdesi olarak gönderilebilir
+    upload = request.files.get('file')
+    stream = io.TextIOWrapper(upload.stream if upload else request.stream, encoding='utf-8-sig', newline='')
+
+    errors = []
+    try:
+        stats = import_authorized_plates(parse_plate_csv(stream, errors), changed_by=current_user.username)
+    except (ValueError, UnicodeDecodeError) as e:
+        db.session.rollback()
+        return jsonify({'error': f'CSV okunamadı: {str(e)}'}), 400
+
+    return jsonify({**stats, 'error_count': len(errors), 'errors': errors[:100]})
+
+@bp.route('/api/authorized-plates/export', methods=['GET'])
+@login_required
+def export_authorized_plates_csv():
+    # İstek bağlamı akış bitene kadar açık kalır; sorgular isteği karşılayan uygulamanın veritabanına gider
+    return Response(stream_with_context(export_authorized_plates()), mimetype='text/csv',
+                    headers={'Content-Disposition': 'attachment; filename=authorized_plates.csv'})
+
+@bp.route('/api/authorized-plates/<int:plate_id>', methods=['PUT'])
 @login_required
 def update_authorized_plate(plate_id):
     plate = AuthorizedPlate.query.get_or_404(plate_id)
@@ -251,6 +359,8 @@ def update_authorized_plate(plate_id):
 
         old_number = plate.plate_number
         plate.plate_number = data['plate_number']
+        if old_number != plate.plate_number:
+            record_plate_change(plate, deleted=True, plate_number=old_number)
 
         history = AuthorizationHistory(
             plate_number=data['plate_number'],
@@ -276,16 +386,54 @@ def update_authorized_plate(plate_id):
         )
         db.session.add(history)
 
+    record_plate_change(plate)
     db.session.commit()
     return jsonify(plate.to_dict())
 
-@app.route('/api/authorized-plates/<int:plate_id>', methods=['GET'])
+@bp.route('/api/authorized-plates/<int:plate_id>', methods=['GET'])
 @login_required
 def get_plate(plate_id):
     plate = AuthorizedPlate.query.get_or_404(plate_id)
     return jsonify(plate.to_dict())
 
-@app.route('/api/authorized-plates/<int:plate_id>', methods=['DELETE'])
+# Kimlikler commit sırasıyla değil ekleme sırasıyla verilir; daha küçük kimlikli bir değişiklik
+# geç commit edilebilir. Dedektörün sürümü bu süre kadar geride tutulur ve son değişiklikler
+# her senkronizasyonda tekrar gönderilir (değişiklikler tekrar uygulanabilir).
+AUTH_SYNC_SAFETY_WINDOW = float(os.environ.get("AUTH_SYNC_SAFETY_WINDOW", 60))
+
+@bp.route('/api/authorized-plates/sync', methods=['GET'])
+@api_token_required
+def sync_authorized_plates():
+    since = request.args.get('since', 0, type=int)
+    latest = db.session.query(db.func.max(AuthorizedPlateChange.id)).scalar() or 0
+    cutoff = datetime.utcnow() - timedelta(seconds=AUTH_SYNC_SAFETY_WINDOW)
+    # Birincil anahtar üzerinde en yeni değişiklikten geriye, pencereden eski ilk değişikliğe yürünür
+    settled = 0
+    for change_id, timestamp in db.session.query(AuthorizedPlateChange.id, AuthorizedPlateChange.timestamp) \
+            .order_by(AuthorizedPlateChange.id.desc()).yield_per(500):
+        if timestamp < cutoff:
+            settled = change_id
+            break
+
+    if since <= 0 or since > latest:
+        # Tam liste: dedektör ilk kez bağlanıyor veya sürümü geçersiz
+        plates = AuthorizedPlate.query.filter_by(is_active=True).all()
+        return jsonify({
+            'version': settled,
+            'full': True,
+            'plates': [{'plate_number': p.plate_number, 'sensitivity': p.sensitivity} for p in plates]
+        })
+
+    changes = AuthorizedPlateChange.query.filter(
+        AuthorizedPlateChange.id > since
+    ).order_by(AuthorizedPlateChange.id).all()
+    return jsonify({
+        'version': max(since, settled),
+        'full': False,
+        'changes': [change.to_dict() for change in changes]
+    })
+
+@bp.route('/api/authorized-plates/<int:plate_id>', methods=['DELETE'])
 @login_required
 def delete_plate(plate_id):
     plate = AuthorizedPlate.query.get_or_404(plate_id)
@@ -298,24 +446,107 @@ def delete_plate(plate_id):
         changed_by=current_user.username
     )
     db.session.add(history)
+    record_plate_change(plate, deleted=True)
 
     db.session.delete(plate)
     db.session.commit()
     return jsonify({'status': 'success'})
 
-@app.route('/api/plates', methods=['GET'])
+@bp.route('/api/plates', methods=['GET'])
 @login_required
+@conditional_json('plate_record')
 def get_plates():
     plates = PlateRecord.query.all()
-    return jsonify([plate.to_dict() for plate in plates])
+    return [plate.to_dict() for plate in plates]
+
+@bp.route('/api/plates/search', methods=['GET'])
+@login_required
+def search_plates():
+    query = request.args.get('q', '')
+    limit = min(request.args.get('limit', 50, type=int), 500)
+
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            score, record_id = cursor.split(':')
+            cursor = (float(score), int(record_id))
+        except ValueError:
+            return jsonify({'error': 'Geçersiz sayfa imleci'}), 400
+
+    rows, next_cursor = search_plate_records(query, limit=limit, cursor=cursor)
+    return jsonify({
+        'results': [{'id': record.id, 'score': score, **record.to_dict()} for record, score in rows],
+        'next_cursor': f"{next_cursor[0]}:{next_cursor[1]}" if next_cursor else None
+    })
+
+def write_plate_events(events):
+    """
+    Insert plate events, merge them into visits and update last_access of
+    the matching authorized plates in a single transaction
+    """
+    db.session.execute(db.insert(PlateRecord), [{
+        'plate_number': event['plate_number'],
+        'confidence': event['confidence'],
+        'timestamp': event['timestamp'],
+        'is_authorized': event['is_authorized'],
+        'edge_authorized': event.get('edge_authorized'),
+        'processed_by': event['processed_by'],
+        'action_taken': event['action_taken'],
+        'camera_id': event.get('camera_id'),
+        'evidence': event.get('evidence')
+    } for event in events])
+
+    last_access = {}
+    for event in events:
+        if event.get('authorized_plate_id'):
+            plate_id = event['authorized_plate_id']
+            last_access[plate_id] = max(last_access.get(plate_id, event['timestamp']), event['timestamp'])
+    for plate_id, timestamp in last_access.items():
+        AuthorizedPlate.query.filter(
+            AuthorizedPlate.id == plate_id,
+            db.or_(AuthorizedPlate.last_access == None, AuthorizedPlate.last_access < timestamp)
+        ).update({'last_access': timestamp}, synchronize_session=False)
+
+    record_visits(events)
+    db.session.commit()
+
+def parse_plate_record(record):
+    """
+    Validate one plate record of /api/plates or /api/plates/bulk; returns
+    (plate_number, confidence, timestamp)
+    """
+    if not isinstance(record, dict):
+        raise ValueError('kayıt bir nesne olmalı')
+    plate_number = record.get('plate_number')
+    if not isinstance(plate_number, str) or not plate_number or len(plate_number) > 20:
+        raise ValueError('plate_number boş olmayan ve en fazla 20 karakterlik bir metin olmalı')
+    confidence = record.get('confidence', 100)
+    if isinstance(confidence, bool) or not isinstance(confidence, (int, float)):
+        raise ValueError('confidence sayı olmalı')
+    timestamp = record.get('timestamp')
+    try:
+        timestamp = datetime.fromisoformat(timestamp) if timestamp else datetime.utcnow()
+    except (TypeError, ValueError):
+        raise ValueError(f'geçersiz timestamp: {timestamp}')
+    camera_id = record.get('camera_id')
+    if camera_id is not None and (isinstance(camera_id, bool) or not isinstance(camera_id, int)):
+        raise ValueError('camera_id tam sayı olmalı')
+    processed_by = record.get('processed_by', 'system')
+    if not isinstance(processed_by, str) or len(processed_by) > 64:
+        raise ValueError('processed_by en fazla 64 karakterlik bir metin olmalı')
+    return plate_number, confidence, timestamp
 
 # Update /api/plates endpoint to use token auth instead of session auth
-@app.route('/api/plates', methods=['POST'])
+@bp.route('/api/plates', methods=['POST'])
 @api_token_required
 def add_plate():
-    plate_number = request.json.get('plate_number')
-    confidence = request.json.get('confidence', 100)
-    processed_by = request.json.get('processed_by', 'system')
+    # write_behind modunda kayıt sonradan yazılır; hatalı kayıt başarı yanıtı almadan reddedilir
+    record = request.get_json(silent=True)
+    try:
+        plate_number, confidence, timestamp = parse_plate_record(record)
+    except ValueError as e:
+        return jsonify({'error': f'Geçersiz kayıt: {str(e)}'}), 400
+    processed_by = record.get('processed_by', 'system')
 
     # Yetkili plaka kontrolü
     authorized_plate = AuthorizedPlate.query.filter_by(
@@ -324,22 +555,36 @@ def add_plate():
     ).first()
 
     is_authorized = bool(authorized_plate)
-    if authorized_plate:
-        authorized_plate.last_access = datetime.utcnow()
-        if confidence < authorized_plate.sensitivity:
-            is_authorized = False
-        db.session.commit()
+    if authorized_plate and confidence < authorized_plate.sensitivity:
+        is_authorized = False
+
+    # Dedektörün yerel kopyadan verdiği karar ayrıca saklanır; kayıt sunucunun kararını taşır
+    edge_decision = record.get('is_authorized')
+    if edge_decision is not None:
+        edge_decision = bool(edge_decision)
+        if edge_decision != is_authorized:
+            logger.warning(f"Edge decision for {plate_number} differs from server: "
+                           f"edge={edge_decision}, server={is_authorized}")
 
     action_taken = "Kapı Açıldı" if is_authorized else "Erişim Reddedildi"
-    new_plate = PlateRecord(
-        plate_number=plate_number,
-        confidence=confidence,
-        is_authorized=is_authorized,
-        processed_by=processed_by,
-        action_taken=action_taken
-    )
-    db.session.add(new_plate)
-    db.session.commit()
+    event = {
+        'plate_number': plate_number,
+        'confidence': confidence,
+        'timestamp': timestamp,
+        'is_authorized': is_authorized,
+        'edge_authorized': edge_decision,
+        'processed_by': processed_by,
+        'action_taken': action_taken,
+        'camera_id': record.get('camera_id'),
+        'evidence': record.get('evidence') if is_evidence_ref(record.get('evidence')) else None,
+        'authorized_plate_id': authorized_plate.id if authorized_plate else None
+    }
+
+    ingest_queue = current_app.extensions.get('ingest_queue')
+    if ingest_queue:
+        ingest_queue.submit(event)
+    else:
+        write_plate_events([event])
 
     return jsonify({
         'status': 'success',
@@ -347,28 +592,159 @@ def add_plate():
         'action_taken': action_taken
     })
 
-@app.route('/plate-history')
+@bp.route('/api/plates/bulk', methods=['POST'])
+@api_token_required
+def add_plates_bulk():
+    records = (request.get_json(silent=True) or {}).get('records', [])
+    if not isinstance(records, list):
+        return jsonify({'error': 'records bir liste olmalı'}), 400
+    if not records:
+        return jsonify({'status': 'success', 'inserted': 0})
+
+    parsed = []
+    for index, record in enumerate(records):
+        try:
+            parsed.append(parse_plate_record(record))
+        except ValueError as e:
+            return jsonify({'error': f'Geçersiz kayıt: {str(e)}', 'index': index}), 400
+
+    # Tüm plakalar için yetki bilgisini tek sorguda al
+    plate_numbers = {plate_number for plate_number, _, _ in parsed}
+    authorized_plates = {
+        plate.plate_number: plate
+        for plate in AuthorizedPlate.query.filter(
+            AuthorizedPlate.plate_number.in_(plate_numbers),
+            AuthorizedPlate.is_active == True
+        )
+    }
+
+    events = []
+    for record, (plate_number, confidence, timestamp) in zip(records, parsed):
+        authorized_plate = authorized_plates.get(plate_number)
+        is_authorized = bool(authorized_plate) and confidence >= authorized_plate.sensitivity
+
+        events.append({
+            'plate_number': plate_number,
+            'confidence': confidence,
+            'timestamp': timestamp,
+            'is_authorized': is_authorized,
+            'processed_by': record.get('processed_by', 'system'),
+            'action_taken': "Kapı Açıldı" if is_authorized else "Erişim Reddedildi",
+            'camera_id': record.get('camera_id'),
+            'evidence': record.get('evidence') if is_evidence_ref(record.get('evidence')) else None,
+            'authorized_plate_id': authorized_plate.id if authorized_plate else None
+        })
+
+    write_plate_events(events)
+
+    return jsonify({'status': 'success', 'inserted': len(events)}), 201
+
+@bp.route('/api/ingest/status', methods=['GET'])
+@api_token_required
+def get_ingest_status():
+    ingest_queue = current_app.extensions.get('ingest_queue')
+    if not ingest_queue:
+        return jsonify({'mode': 'sync'})
+    return jsonify({'mode': 'write_behind', **ingest_queue.stats()})
+
+def parse_datetime_arg(name):
+    """
+    Parse an ISO 8601 query argument; None if missing, ValueError if invalid
+    """
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f'{name} ISO 8601 biçiminde bir tarih olmalı: {value}')
+
+@bp.route('/api/visits', methods=['GET'])
+@login_required
+@conditional_json('visit')
+def get_visits():
+    query = Visit.query
+    try:
+        since = parse_datetime_arg('since')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if since:
+        query = query.filter(Visit.last_seen >= since)
+    plate_number = request.args.get('plate_number')
+    if plate_number:
+        query = query.filter(Visit.plate_number == plate_number)
+    limit = min(request.args.get('limit', 100, type=int), 1000)
+    visits = query.order_by(Visit.first_seen.desc()).limit(limit).all()
+    return [visit.to_dict() for visit in visits]
+
+@bp.route('/api/visits/stats', methods=['GET'])
+@login_required
+@conditional_json('visit', key=lambda: datetime.utcnow().date())
+def get_visit_stats():
+    try:
+        since = parse_datetime_arg('since')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    since = since or datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    visits = db.session.query(Visit.first_seen, Visit.sighting_count).filter(Visit.first_seen >= since).all()
+
+    # Saat bazında ziyaret sayısı
+    hourly = [0] * 24
+    for first_seen, _ in visits:
+        hourly[first_seen.hour] += 1
+    return {
+        'since': since.isoformat(),
+        'visits': len(visits),
+        'sightings': sum(count for _, count in visits),
+        'hourly': hourly
+    }
+
+HISTORY_PAGE_SIZE = int(os.environ.get("HISTORY_PAGE_SIZE", 500))
+
+@bp.route('/plate-history')
 @login_required
 def plate_history():
-    plate_records = PlateRecord.query.order_by(PlateRecord.timestamp.desc()).all()
-    auth_history = AuthorizationHistory.query.order_by(AuthorizationHistory.timestamp.desc()).all()
-    return render_template('plate_history.html', plate_records=plate_records, auth_history=auth_history)
-
-@app.route('/camera-settings')
+    # Ziyaretler sayfa sayfa, yetkilendirme geçmişi en yeni kayıtlarla sınırlı yüklenir
+    page = max(request.args.get('page', 1, type=int), 1)
+    visits = Visit.query.order_by(Visit.first_seen.desc(), Visit.id.desc()).paginate(
+        page=page, per_page=HISTORY_PAGE_SIZE, error_out=False)
+    auth_history = AuthorizationHistory.query.order_by(
+        AuthorizationHistory.timestamp.desc()
+    ).limit(HISTORY_PAGE_SIZE).all()
+    return render_template('plate_history.html', visits=visits, auth_history=auth_history)
+
+@bp.route('/camera-settings')
 @login_required
 @role_required(['admin'])
 def camera_settings():
     cameras = CameraSettings.query.all()
     return render_template('camera_settings.html', cameras=cameras)
 
-@app.route('/api/cameras', methods=['GET'])
+def validate_camera_settings(settings):
+    """
+    Return an error message for invalid camera settings, None if they are valid
+    """
+    if settings is None:
+        return None
+    if not isinstance(settings, dict):
+        return 'Kamera ayarları bir nesne olmalı'
+    if settings.get('roi'):
+        from roi import RegionOfInterest
+        try:
+            RegionOfInterest.parse(settings['roi'])
+        except ValueError as e:
+            return f'Geçersiz ROI: {str(e)}'
+    return None
+
+@bp.route('/api/cameras', methods=['GET'])
 @login_required
 @role_required(['admin'])
+@conditional_json('camera_settings')
 def get_cameras():
     cameras = CameraSettings.query.all()
-    return jsonify([camera.to_dict() for camera in cameras])
+    return [camera.to_dict() for camera in cameras]
 
-@app.route('/api/cameras', methods=['POST'])
+@bp.route('/api/cameras', methods=['POST'])
 @login_required
 @role_required(['admin'])
 def add_camera():
@@ -377,6 +753,10 @@ def add_camera():
     if not all(k in data for k in ['name', 'ip_address']):
         return jsonify({'error': 'Kamera adı ve IP adresi gerekli'}), 400
 
+    error = validate_camera_settings(data.get('settings'))
+    if error:
+        return jsonify({'error': error}), 400
+
     new_camera = CameraSettings(
         name=data['name'],
         ip_address=data['ip_address'],
@@ -392,20 +772,24 @@ def add_camera():
 
     return jsonify(new_camera.to_dict()), 201
 
-@app.route('/api/cameras/<int:camera_id>', methods=['GET'])
+@bp.route('/api/cameras/<int:camera_id>', methods=['GET'])
 @login_required
 @role_required(['admin'])
 def get_camera(camera_id):
     camera = CameraSettings.query.get_or_404(camera_id)
     return jsonify(camera.to_dict())
 
-@app.route('/api/cameras/<int:camera_id>', methods=['PUT'])
+@bp.route('/api/cameras/<int:camera_id>', methods=['PUT'])
 @login_required
 @role_required(['admin'])
 def update_camera(camera_id):
     camera = CameraSettings.query.get_or_404(camera_id)
     data = request.get_json()
 
+    error = validate_camera_settings(data.get('settings'))
+    if error:
+        return jsonify({'error': error}), 400
+
     if 'name' in data:
         camera.name = data['name']
     if 'ip_address' in data:
@@ -417,6 +801,7 @@ def update_camera(camera_id):
     if 'password' in data:
         camera.password = data['password']
     if 'settings' in data:
+        # PUT ayarların tamamını değiştirir; gönderilmeyen anahtarlar (roi, capture vb.) silinir
         camera.settings = data['settings']
     if 'stream_type' in data:
         camera.stream_type = data['stream_type']
@@ -424,89 +809,60 @@ def update_camera(camera_id):
         camera.rtsp_path = data['rtsp_path']
 
     db.session.commit()
+    stop_camera_connection(camera_id)
     return jsonify(camera.to_dict())
 
-@app.route('/api/cameras/<int:camera_id>', methods=['DELETE'])
+@bp.route('/api/cameras/<int:camera_id>', methods=['DELETE'])
 @login_required
 @role_required(['admin'])
 def delete_camera(camera_id):
     camera = CameraSettings.query.get_or_404(camera_id)
     db.session.delete(camera)
     db.session.commit()
+    stop_camera_connection(camera_id)
     return jsonify({'status': 'success'})
 
-@app.route('/api/cameras/<int:camera_id>/toggle-status', methods=['POST'])
+@bp.route('/api/cameras/<int:camera_id>/toggle-status', methods=['POST'])
 @login_required
 @role_required(['admin'])
 def toggle_camera_status(camera_id):
     camera = CameraSettings.query.get_or_404(camera_id)
     camera.is_active = not camera.is_active
     db.session.commit()
+    if not camera.is_active:
+        stop_camera_connection(camera_id)
     return jsonify({'status': 'success'})
 
-@app.route('/api/cameras/<int:camera_id>/test-connection', methods=['POST'])
+@bp.route('/api/cameras/<int:camera_id>/test-connection', methods=['POST'])
 @login_required
 @role_required(['admin'])
 def test_camera_connection(camera_id):
     camera = CameraSettings.query.get_or_404(camera_id)
 
     try:
-        if camera.stream_type == 'rtsp':
-            # RTSP bağlantı URL'ini oluştur
-            auth = f"{camera.username}:{camera.password}@" if camera.username and camera.password else ""
-            rtsp_url = f"rtsp://{auth}{camera.ip_address}:{camera.port}{camera.rtsp_path}"
-
-            # OpenCV ile RTSP stream'ine bağlanmayı dene
-            cap = cv2.VideoCapture(rtsp_url)
-            if not cap.isOpened():
-                return jsonify({
-                    'status': 'error',
-                    'message': 'RTSP bağlantısı başarısız: Stream açılamadı'
-                }), 400
-
-            # İlk frame'i al
-            ret, frame = cap.read()
-            cap.release()
-
-            if not ret:
-                return jsonify({
-                    'status': 'error',
-                    'message': 'RTSP bağlantısı başarısız: Frame okunamadı'
-                }), 400
+        # Bağlantı arka planda kurulur; istek sadece önbellekteki durumu okur
+        conn = ensure_camera_connection(camera)
+        status = conn.status()
 
-            camera.last_connected = datetime.utcnow()
-            db.session.commit()
+        if status['state'] == 'connected':
             return jsonify({
                 'status': 'success',
-                'message': 'RTSP bağlantısı başarılı'
+                'message': f"Bağlantı başarılı ({status['fps']:.1f} FPS)",
+                'camera_status': status
             })
 
-        else:  # HTTP bağlantısı için
-            import requests
-            from requests.exceptions import RequestException
-            protocols = ['http', 'https']
-            for protocol in protocols:
-                try:
-                    url = f"{protocol}://{camera.ip_address}:{camera.port}"
-                    auth = None
-                    if camera.username and camera.password:
-                        auth = (camera.username, camera.password)
-
-                    response = requests.get(url, auth=auth, timeout=5)
-                    if response.status_code == 200:
-                        camera.last_connected = datetime.utcnow()
-                        db.session.commit()
-                        return jsonify({
-                            'status': 'success',
-                            'message': f'HTTP bağlantısı başarılı (Protocol: {protocol})'
-                        })
-                except RequestException:
-                    continue
-
+        if status['state'] in ('idle', 'connecting') and not status['last_error']:
             return jsonify({
-                'status': 'error',
-                'message': 'HTTP bağlantısı başarısız: Sunucuya erişilemiyor'
-            }), 400
+                'status': 'pending',
+                'message': 'Bağlantı kuruluyor, lütfen birkaç saniye sonra tekrar deneyin',
+                'camera_status': status
+            }), 202
+
+        return jsonify({
+            'status': 'error',
+            'message': f"Bağlantı başarısız: {status['last_error'] or status['state']}",
+            'camera_status': status
+        }), 400
 
     except Exception as e:
         return jsonify({
@@ -514,66 +870,181 @@ def test_camera_connection(camera_id):
             'message': f'Bağlantı testi başarısız: {str(e)}'
         }), 400
 
-@app.route('/video_feed/<int:camera_id>')
+@bp.route('/api/cameras/status', methods=['GET'])
+@login_required
+@role_required(['admin'])
+def get_camera_statuses():
+    manager = get_camera_manager(create=False)
+    return jsonify(manager.statuses() if manager else {})
+
+@bp.route('/video_feed/<int:camera_id>')
 @login_required
 def video_feed(camera_id):
+    camera = CameraSettings.query.get_or_404(camera_id)
+    if not camera.is_active:
+        logger.warning(f"Camera {camera_id} is not active")
+        return Response(status=404)
+
+    # Her yayın bir iş parçacığını sürekli meşgul eder; sınır aşılırsa API'ye yer bırakılır
+    if not stream_slots.acquire(blocking=False):
+        logger.warning(f"Stream limit reached, rejecting camera {camera_id} viewer")
+        return Response(status=503, headers={'Retry-After': '5'})
+
+    try:
+        conn = ensure_camera_connection(camera)
+    except Exception:
+        # Yanıt oluşmadan çıkılırsa call_on_close hiç çağrılmaz; yer burada bırakılır
+        stream_slots.release()
+        raise
+
     def generate_frames():
+        seq = 0
         try:
-            # Use application context
-            with app.app_context():
-                camera = CameraSettings.query.get_or_404(camera_id)
-                if not camera.is_active:
-                    logger.warning(f"Camera {camera_id} is not active")
-                    return
-
-                # Build RTSP URL
-                auth = f"{camera.username}:{camera.password}@" if camera.username and camera.password else ""
-                if camera.stream_type == 'rtsp':
-                    stream_url = f"rtsp://{auth}{camera.ip_address}:{camera.port}{camera.rtsp_path}"
-                else:
-                    stream_url = f"http://{camera.ip_address}:{camera.port}/video_feed"
-
-                logger.info(f"Attempting to connect to camera stream: {stream_url.replace(auth, '***@')}")
-
-                cap = cv2.VideoCapture(stream_url)
-                if not cap.isOpened():
-                    logger.error(f"Failed to open camera stream: {stream_url.replace(auth, '***@')}")
-                    return
-
-                logger.info(f"Successfully connected to camera {camera_id}")
-
-                while True:
-                    success, frame = cap.read()
-                    if not success:
-                        logger.error(f"Failed to read frame from camera {camera_id}")
-                        break
-                    else:
-                        ret, buffer = cv2.imencode('.jpg', frame)
-                        if not ret:
-                            logger.error(f"Failed to encode frame from camera {camera_id}")
-                            break
-                        frame = buffer.tobytes()
-                        yield (b'--frame\r\n'
-                            b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
-
-                cap.release()
-                logger.info(f"Camera {camera_id} stream ended")
+            while not conn.stopped:
+                seq, jpeg = conn.wait_jpeg(seq, timeout=1.0, quality=STREAM_JPEG_QUALITY)
+                if jpeg is None:
+                    # Kamera yeniden bağlanırken akışı açık tut; boş satır yazmak
+                    # kopan istemciyi fark etmeyi sağlar (sınırdan önceki CRLF yok sayılır)
+                    yield b'\r\n'
+                    continue
+                yield (b'--frame\r\n'
+                    b'Content-Type: image/jpeg\r\n\r\n' + jpeg + b'\r\n')
+
+            logger.info(f"Camera {camera_id} stream ended")
 
         except Exception as e:
             logger.error(f"Error in video feed for camera {camera_id}: {str(e)}")
             return
 
-    return Response(generate_frames(),
-                    mimetype='multipart/x-mixed-replace; boundary=frame')
+    response = Response(generate_frames(),
+                        mimetype='multipart/x-mixed-replace; boundary=frame')
+    response.call_on_close(stream_slots.release)
+    return response
 
-@app.route('/api/active_cameras')
+@bp.route('/api/active_cameras')
 @login_required
+@conditional_json('camera_settings')
 def get_active_cameras():
     cameras = CameraSettings.query.filter_by(is_active=True).all()
-    return jsonify([camera.to_dict() for camera in cameras])
+    return [camera.to_dict() for camera in cameras]
+
+# Dedektör düğümleri: kalp atışı bu süreden eskiyse düğüm ölü sayılır ve kameraları dağıtılır
+NODE_HEARTBEAT_INTERVAL = float(os.environ.get("NODE_HEARTBEAT_INTERVAL", 5))
+NODE_TIMEOUT = float(os.environ.get("NODE_TIMEOUT", 15))
+NODE_DEFAULT_CAPACITY = float(os.environ.get("NODE_DEFAULT_CAPACITY", 10))
+NODE_CAPACITY_THRESHOLD = float(os.environ.get("NODE_CAPACITY_THRESHOLD", 0.25))
+
+def camera_assignment():
+    """
+    Return ({camera_id: node_id}, live nodes) for the active cameras
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=NODE_TIMEOUT)
+    nodes = DetectorNode.query.filter(DetectorNode.last_heartbeat >= cutoff).all()
+    camera_ids = [camera_id for (camera_id,) in db.session.query(CameraSettings.id).filter_by(is_active=True)]
+    assignment = assign_cameras(camera_ids, {node.id: node.capacity_fps or NODE_DEFAULT_CAPACITY for node in nodes})
+    return assignment, nodes
+
+@bp.route('/api/nodes/<node_id>/heartbeat', methods=['POST'])
+@api_token_required
+def node_heartbeat(node_id):
+    data = request.get_json(silent=True) or {}
+    now = datetime.utcnow()
+
+    capacity = data.get('capacity_fps')
+    if capacity is not None and (isinstance(capacity, bool) or not isinstance(capacity, (int, float))
+                                 or not capacity > 0):
+        return jsonify({'error': 'capacity_fps pozitif bir sayı olmalı'}), 400
+
+    # Bilinmeyen düğüm ilk kalp atışında kaydedilir
+    node = DetectorNode.query.get(node_id)
+    if node is None:
+        node = DetectorNode(id=node_id, registered_at=now)
+        db.session.add(node)
+        logger.info(f"Detector node registered: {node_id}")
+    node.hostname = data.get('hostname', node.hostname)
+    node.last_heartbeat = now
+    node.status = data.get('cameras')
+
+    # Kapasite yalnızca eşiği aşan değişimlerde yazılır; küçük dalgalanmalar kameraları yerinden oynatmaz
+    if capacity is not None:
+        settled = settle_capacity(node.capacity_fps, capacity, NODE_CAPACITY_THRESHOLD)
+        if settled != node.capacity_fps:
+            logger.info(f"Detector node {node_id} capacity: {node.capacity_fps} -> {settled} FPS")
+            node.capacity_fps = settled
+    db.session.commit()
+
+    from video_capture import build_stream_url
+    assignment, _ = camera_assignment()
+    camera_ids = [camera_id for camera_id, owner in assignment.items() if owner == node_id]
+    cameras = CameraSettings.query.filter(CameraSettings.id.in_(camera_ids)).all() if camera_ids else []
+    return jsonify({
+        'node_id': node_id,
+        'heartbeat_interval': NODE_HEARTBEAT_INTERVAL,
+        'cameras': [{
+            'id': camera.id,
+            'name': camera.name,
+            'source': build_stream_url(camera)[0],
+            'settings': camera.settings or {}
+        } for camera in cameras]
+    })
 
-with app.app_context():
+@bp.route('/api/nodes/<node_id>', methods=['DELETE'])
+@api_token_required
+def node_leave(node_id):
+    node = DetectorNode.query.get(node_id)
+    if node:
+        db.session.delete(node)
+        db.session.commit()
+        logger.info(f"Detector node left: {node_id}")
+    return jsonify({'status': 'success'})
+
+@bp.route('/api/nodes', methods=['GET'])
+@login_required
+@role_required(['admin'])
+def get_nodes():
+    assignment, live_nodes = camera_assignment()
+    live = {node.id for node in live_nodes}
+    return jsonify([{
+        **node.to_dict(),
+        'alive': node.id in live,
+        'cameras': sorted(camera_id for camera_id, owner in assignment.items() if owner == node.id)
+    } for node in DetectorNode.query.order_by(DetectorNode.id).all()])
+
+# Dedektörlerin kanıt görüntülerini yazdığı dizin (aynı makine veya ortak disk); boşsa kapalı
+EVIDENCE_DIR = os.environ.get("EVIDENCE_DIR", "")
+
+@bp.route('/evidence/<path:ref>/<kind>')
+@login_required
+def get_evidence(ref, kind):
+    if not EVIDENCE_DIR or kind not in EVIDENCE_KINDS or not is_evidence_ref(ref):
+        return Response(status=404)
+
+    if request.args.get('thumb'):
+        path = thumbnail_path(EVIDENCE_DIR, ref, kind)
+    else:
+        path = evidence_path(EVIDENCE_DIR, ref, kind)
+    if not path or not os.path.exists(path):
+        return Response(status=404)
+
+    # İçerik adresli dosyalar değişmez; tarayıcı uzun süre önbellekte tutabilir, Range istekleri desteklenir
+    response = send_file(path, mimetype='image/jpeg', conditional=True, max_age=7 * 24 * 3600)
+    response.cache_control.public = False
+    response.cache_control.private = True
+    return response
+
+def bootstrap_database():
+    """
+    Create tables, search index and the default admin user; safe to run repeatedly
+    """
     db.create_all()
+    add_missing_columns(PlateRecord, 'evidence', 'edge_authorized')
+    add_missing_columns(Visit, 'evidence')
+    ensure_search_index()
+    ensure_table_versions()
+
+    # Ziyaret tablosu yeni eklendiyse mevcut kayıtlardan oluştur
+    if not db.session.query(Visit.id).first() and db.session.query(PlateRecord.id).first():
+        rebuild_visits()
 
     # Admin kullanıcısı yoksa oluştur
     admin_user = User.query.filter_by(username='admin').first()
@@ -588,5 +1059,46 @@ with app.app_context():
         db.session.add(admin_user)
         db.session.commit()
 
+@click.command('init-db')
+@with_appcontext
+def init_db_command():
+    """Create the database schema and the default admin user."""
+    bootstrap_database()
+    click.echo("Veritabanı hazır")
+
+def create_app(config=None):
+    """
+    Application factory
+
+    Building the app does not touch the database or load OpenCV; run
+    `flask --app app init-db` once per deployment to create the schema.
+    """
+    app = Flask(__name__)
+    app.secret_key = os.environ.get("SESSION_SECRET")
+
+    if config:
+        app.config.update(config)
+
+    # Initialize database
+    init_db(app)
+    init_http_cache(app)
+    login_manager.init_app(app)
+    app.register_blueprint(bp)
+    app.cli.add_command(init_db_command)
+
+    # write_behind modunda kayıtlar kuyruğa alınır ve gruplar halinde yazılır; yazıcı iş parçacığı ilk kayıtta başlar
+    if os.environ.get("INGEST_MODE", "sync") == "write_behind":
+        app.extensions['ingest_queue'] = WriteBehindQueue(
+            app, write_plate_events,
+            flush_interval=float(os.environ.get("INGEST_FLUSH_INTERVAL_MS", 10)) / 1000,
+            max_batch=int(os.environ.get("INGEST_MAX_BATCH", 500))
+        )
+    return app
+
+# gunicorn app:app, main.py ve yardımcı betikler için varsayılan uygulama
+app = create_app()
+
 if __name__ == '__main__':
+    with app.app_context():
+        bootstrap_database()
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
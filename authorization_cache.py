@@ -0,0 +1,197 @@
+import os
+import json
+import time
+import queue
+import logging
+import threading
+from datetime import datetime
+import requests
+
+logger = logging.getLogger(__name__)
+
+ACTION_OPEN = "Kapı Açıldı"
+ACTION_DENY = "Erişim Reddedildi"
+
+
+class AuthorizationCache:
+    """
+    Local replica of active AuthorizedPlate rows for gate decisions without
+    a server round trip
+
+    The replica is synced incrementally from /api/authorized-plates/sync and
+    saved to snapshot_path, so a detector that restarts while the server is
+    unreachable still decides from its last known list.
+    """
+    def __init__(self, api_url, api_token, sync_interval=30.0, snapshot_path=None):
+        self.api_url = api_url
+        self.api_token = api_token
+        self.sync_interval = sync_interval
+        self.snapshot_path = snapshot_path
+        self.version = 0
+        self.last_sync = None
+        self._plates = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._load_snapshot()
+
+    @property
+    def ready(self):
+        return self.version > 0 or bool(self._plates)
+
+    def _load_snapshot(self):
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return
+        try:
+            with open(self.snapshot_path, encoding='utf-8') as f:
+                snapshot = json.load(f)
+            self._plates = snapshot['plates']
+            self.version = snapshot['version']
+            logger.info("Yetkili plaka kopyası yüklendi: %d plaka (sürüm %d)", len(self._plates), self.version)
+        except (OSError, ValueError, KeyError) as e:
+            logger.error("Yetkili plaka kopyası okunamadı: %s", e)
+
+    def _save_snapshot(self, plates, version):
+        if not self.snapshot_path:
+            return
+        tmp_path = f"{self.snapshot_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': version, 'plates': plates}, f)
+        os.replace(tmp_path, self.snapshot_path)
+
+    def sync(self):
+        """
+        Fetch changes since the local version; returns True on success
+        """
+        try:
+            response = requests.get(
+                f"{self.api_url}/api/authorized-plates/sync",
+                params={'since': self.version},
+                headers={'X-API-Token': self.api_token},
+                timeout=10
+            )
+            response.raise_for_status()
+            data = response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            logger.warning("Yetkili plaka senkronizasyonu başarısız: %s", e)
+            return False
+
+        with self._lock:
+            if data['full']:
+                plates = {p['plate_number']: p['sensitivity'] for p in data['plates']}
+            else:
+                plates = dict(self._plates)
+                for change in data['changes']:
+                    if change['deleted'] or not change['is_active']:
+                        plates.pop(change['plate_number'], None)
+                    else:
+                        plates[change['plate_number']] = change['sensitivity']
+            changed = data['version'] != self.version or plates != self._plates
+            # Sözlük bütünüyle değiştirilir; decide() kilitsiz okuyabilir
+            self._plates = plates
+            self.version = data['version']
+            self.last_sync = datetime.utcnow()
+
+        if changed:
+            logger.info("Yetkili plakalar senkronize edildi: %d plaka (sürüm %d)", len(plates), data['version'])
+            self._save_snapshot(plates, data['version'])
+        return True
+
+    def decide(self, plate_number, confidence):
+        """
+        Return (is_authorized, action_taken); confidence is a percentage
+        """
+        sensitivity = self._plates.get(plate_number)
+        is_authorized = sensitivity is not None and confidence >= sensitivity
+        return is_authorized, ACTION_OPEN if is_authorized else ACTION_DENY
+
+    def start(self):
+        self.sync()
+        self._thread = threading.Thread(target=self._run, name='auth-sync', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.sync_interval):
+            self.sync()
+
+
+class EventReporter:
+    """
+    Report plate events to the server from a background thread
+
+    Events that fail to send are retried with a growing delay; when the
+    queue is full the oldest events are dropped first.
+    """
+    def __init__(self, api_url, api_token, max_queue=10000, max_backoff=60.0):
+        self.api_url = api_url
+        self.api_token = api_token
+        self.max_backoff = max_backoff
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='event-reporter', daemon=True)
+        self._thread.start()
+
+    def submit(self, event):
+        while True:
+            try:
+                self._queue.put_nowait(event)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def _post(self, event):
+        response = requests.post(
+            f"{self.api_url}/api/plates",
+            json=event,
+            headers={'X-API-Token': self.api_token},
+            timeout=5
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def _run(self):
+        backoff = 1.0
+        while not self._stop.is_set():
+            try:
+                event = self._queue.get(timeout=1.0)
+            except queue.Empty:
+                continue
+
+            while not self._stop.is_set():
+                try:
+                    self._post(event)
+                    backoff = 1.0
+                    break
+                except requests.exceptions.HTTPError as e:
+                    if e.response is not None and e.response.status_code < 500:
+                        # İstemci hatası tekrar denemeyle düzelmez
+                        logger.error("Plaka olayı sunucu tarafından reddedildi: %s", e)
+                        break
+                    logger.warning("Plaka olayı gönderilemedi, %.0f sn sonra tekrar denenecek: %s", backoff, e)
+                    self._stop.wait(backoff)
+                    backoff = min(self.max_backoff, backoff * 2)
+                except requests.exceptions.RequestException as e:
+                    logger.warning("Plaka olayı gönderilemedi, %.0f sn sonra tekrar denenecek: %s", backoff, e)
+                    self._stop.wait(backoff)
+                    backoff = min(self.max_backoff, backoff * 2)
+
+    def stop(self, timeout=5.0):
+        """
+        Try to drain the queue for up to timeout seconds, then stop
+        """
+        deadline = time.monotonic() + timeout
+        while self._queue.qsize() and time.monotonic() < deadline:
+            time.sleep(0.1)
+        self._stop.set()
@@ -0,0 +1,335 @@
+import os
+import sys
+import json
+import hashlib
+import logging
+import argparse
+import multiprocessing
+from datetime import datetime, timedelta
+import cv2
+import requests
+from log_config import setup_logging
+
+logger = logging.getLogger(__name__)
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mkv', '.mov', '.ts', '.m4v', '.mpg', '.mpeg')
+
+# Her işçi süreçte bir kez oluşturulan dedektör
+_detector = None
+
+
+def find_videos(inputs):
+    """
+    Expand files and directories into a sorted list of video files
+    """
+    videos = []
+    for path in inputs:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                videos.extend(os.path.join(root, name) for name in files
+                              if name.lower().endswith(VIDEO_EXTENSIONS))
+        elif os.path.isfile(path):
+            videos.append(path)
+        else:
+            logger.warning("Girdi bulunamadı: %s", path)
+    return sorted(videos)
+
+
+def plan_segments(path, segment_seconds):
+    """
+    Split a video into (path, start_frame, end_frame) tasks of segment_seconds each
+    """
+    cap = cv2.VideoCapture(path)
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    finally:
+        cap.release()
+
+    if frame_count <= 0 or not segment_seconds:
+        return [(path, 0, frame_count if frame_count > 0 else None)]
+
+    step = max(1, int(fps * segment_seconds))
+    return [(path, start, min(start + step, frame_count)) for start in range(0, frame_count, step)]
+
+
+def task_key(task):
+    path, start, end = task
+    return f"{os.path.abspath(path)}:{start}:{end}"
+
+
+def load_checkpoint(path):
+    """
+    Return (completed task keys, JSONL output size at the last checkpoint or None)
+    """
+    if not path or not os.path.exists(path):
+        return set(), None
+    with open(path, encoding='utf-8') as f:
+        state = json.load(f)
+    return set(state.get('completed', [])), state.get('offset')
+
+
+def save_checkpoint(path, completed, offset=None):
+    if not path:
+        return
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'completed': sorted(completed), 'offset': offset}, f)
+    os.replace(tmp_path, path)
+
+
+class JsonlOutput:
+    """
+    Append segment results to a JSONL file
+
+    The checkpoint stores the file size after each segment. Resuming cuts
+    the file back to that size, so lines of a segment that was written but
+    not yet checkpointed are dropped instead of duplicated.
+    """
+    def __init__(self, path, resume=False, offset=None):
+        self._file = open(path, 'a' if resume else 'w', encoding='utf-8')
+        if resume and offset is not None:
+            self._file.truncate(offset)
+            # truncate() konumu değiştirmez; tell() yeni sonu göstermeli
+            self._file.seek(0, os.SEEK_END)
+
+    def write(self, task, results):
+        for result in results:
+            self._file.write(json.dumps(result, ensure_ascii=False) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    @property
+    def offset(self):
+        return self._file.tell()
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetOutput:
+    """
+    Write each segment as its own part file in the output directory
+
+    Parts are named after the segment and written atomically, so a segment
+    processed again after a crash replaces its part. Read the directory with
+    pyarrow.parquet.read_table(path).
+    """
+    offset = None
+
+    def __init__(self, path):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise RuntimeError("Parquet çıktısı için pyarrow kurulu olmalı")
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def write(self, task, results):
+        if not results:
+            return
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        name = hashlib.sha1(task_key(task).encode()).hexdigest()[:16]
+        part = os.path.join(self.path, f"part-{name}.parquet")
+        pq.write_table(pa.Table.from_pylist(results), f"{part}.tmp")
+        os.replace(f"{part}.tmp", part)
+
+    def close(self):
+        pass
+
+
+def count_edge_tpus():
+    try:
+        from pycoral.utils import edgetpu
+    except ImportError:
+        return 0
+    return len(edgetpu.list_edge_tpus())
+
+
+def _init_worker(api_url, api_token, device_counter=None):
+    global _detector
+    from plate_detection import PlateDetector
+
+    # Her işçi kendi Edge TPU'sunu kullanır; aynı cihazı iki süreç açamaz
+    device = None
+    if device_counter is not None:
+        with device_counter.get_lock():
+            device = f":{device_counter.value}"
+            device_counter.value += 1
+    _detector = PlateDetector(api_url, api_token, tpu_device=device)
+
+
+def process_segment(task, stride=5, min_detection_interval=5.0):
+    """
+    Detect plates in one video segment as fast as frames can be decoded
+
+    Only every stride-th frame is decoded; the others are skipped with grab().
+    Timestamps are estimated from the file's modification time minus its
+    duration, plus the frame offset.
+    """
+    path, start, end = task
+    cap = cv2.VideoCapture(path)
+    results = []
+    try:
+        if not cap.isOpened():
+            logger.error("Video açılamadı: %s", path)
+            return task, results
+
+        fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        recorded_start = datetime.utcfromtimestamp(os.path.getmtime(path)) - timedelta(seconds=frame_count / fps)
+        if start:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+
+        last_seen = {}
+        index = start
+        while end is None or index < end:
+            if (index - start) % stride:
+                if not cap.grab():
+                    break
+                index += 1
+                continue
+
+            ret, frame = cap.read()
+            if not ret:
+                break
+
+            offset = index / fps
+            for detection in _detector.process_frame(frame):
+                plate_number = detection['plate_number']
+                if offset - last_seen.get(plate_number, -min_detection_interval) < min_detection_interval:
+                    continue
+                last_seen[plate_number] = offset
+                results.append({
+                    'source': path,
+                    'frame': index,
+                    'video_time': round(offset, 3),
+                    'timestamp': (recorded_start + timedelta(seconds=offset)).isoformat(),
+                    'plate_number': plate_number,
+                    'confidence': detection['confidence'] * 100,
+                    'box': [int(v) for v in detection['box']],
+                })
+            index += 1
+    finally:
+        cap.release()
+
+    return task, results
+
+
+def _process_segment_star(args):
+    return process_segment(*args)
+
+
+def upload_results(api_url, api_token, results, batch_size=500):
+    """
+    Insert results through the bulk plate endpoint
+    """
+    for i in range(0, len(results), batch_size):
+        records = [{
+            'plate_number': r['plate_number'],
+            'confidence': r['confidence'],
+            'timestamp': r['timestamp'],
+            'processed_by': 'batch_detector'
+        } for r in results[i:i + batch_size]]
+        response = requests.post(
+            f"{api_url}/api/plates/bulk",
+            json={'records': records},
+            headers={'X-API-Token': api_token},
+            timeout=30
+        )
+        response.raise_for_status()
+
+
+def run_batch(inputs, output, stride=5, workers=1, segment_seconds=600,
+              checkpoint=None, upload=False, api_url=None, api_token=None):
+    """
+    Process recorded videos with a process pool and write the detections
+
+    Results are written as each segment finishes and the segment is then
+    recorded in the checkpoint, so an interrupted run can be resumed.
+    Output ending in .parquet is a directory with one part per segment.
+
+    With upload, a segment is uploaded after its checkpoint is saved, so a
+    resumed run never uploads it twice; if the upload fails the run stops
+    and the segment's results remain in the output.
+    """
+    tasks = [task for video in find_videos(inputs) for task in plan_segments(video, segment_seconds)]
+    completed, offset = load_checkpoint(checkpoint)
+    pending = [task for task in tasks if task_key(task) not in completed]
+    logger.info("%d segment bulundu, %d tanesi işlenecek", len(tasks), len(pending))
+
+    device_counter = None
+    tpus = count_edge_tpus()
+    if tpus:
+        if workers > tpus:
+            logger.warning("%d işçi istendi ama %d Edge TPU var, işçi sayısı %d yapıldı", workers, tpus, tpus)
+            workers = tpus
+        device_counter = multiprocessing.Value('i', 0)
+
+    if output.endswith('.parquet'):
+        out = ParquetOutput(output)
+    else:
+        out = JsonlOutput(output, resume=bool(completed), offset=offset)
+    total = 0
+
+    try:
+        with multiprocessing.Pool(workers, initializer=_init_worker,
+                                  initargs=(api_url, api_token, device_counter)) as pool:
+            jobs = ((task, stride) for task in pending)
+            for task, results in pool.imap_unordered(_process_segment_star, jobs):
+                out.write(task, results)
+
+                total += len(results)
+                completed.add(task_key(task))
+                save_checkpoint(checkpoint, completed, out.offset)
+                if upload and results:
+                    try:
+                        upload_results(api_url, api_token, results)
+                    except requests.RequestException:
+                        logger.error("Segment sonuçları yüklenemedi, çıktı dosyasında duruyor: %s [%s-%s]",
+                                     task[0], task[1], task[2])
+                        raise
+                logger.info("Segment tamamlandı: %s [%s-%s] (%d plaka)", task[0], task[1], task[2], len(results))
+    finally:
+        out.close()
+
+    logger.info("Toplu işlem tamamlandı: %d plaka kaydı", total)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kayıtlı videolarda toplu plaka tanıma")
+    parser.add_argument('inputs', nargs='+', help="Video dosyaları veya dizinler")
+    parser.add_argument('-o', '--output', default='batch_results.jsonl',
+                        help="Çıktı dosyası (.jsonl) veya parça dizini (.parquet)")
+    parser.add_argument('--stride', type=int, default=5, help="Her N frame'den birini işle")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="İşçi süreç sayısı (her biri kendi modelini ve Edge TPU'sunu kullanır)")
+    parser.add_argument('--segment-seconds', type=int, default=600,
+                        help="Videoları bu uzunlukta parçalara böl (0 = dosya başına bir parça)")
+    parser.add_argument('--checkpoint', help="Devam etmek için kullanılacak checkpoint dosyası")
+    parser.add_argument('--upload', action='store_true',
+                        help="Sonuçları /api/plates/bulk ile sunucuya toplu yükle")
+    args = parser.parse_args()
+
+    try:
+        run_batch(
+            args.inputs, args.output,
+            stride=max(1, args.stride),
+            workers=max(1, args.workers),
+            segment_seconds=args.segment_seconds,
+            checkpoint=args.checkpoint,
+            upload=args.upload,
+            api_url=os.environ.get("API_URL", "http://localhost:5000"),
+            api_token=os.environ.get("API_TOKEN", "test-token-123"),
+        )
+    except Exception as e:
+        logger.error("Toplu işlem hatası: %s", e)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    setup_logging()
+    main()
@@ -0,0 +1,314 @@
+import time
+import random
+import logging
+import threading
+import cv2
+from video_capture import CaptureOptions, FFmpegPipeCapture, open_capture
+
+logger = logging.getLogger(__name__)
+
+
+class CameraConnection:
+    """
+    Keep one capture open in a background thread and reconnect with
+    exponential backoff when it fails
+
+    Consumers never touch the capture directly: they wait for the newest
+    frame with wait_frame() and read health data with status().
+    """
+    def __init__(self, camera_id, source, options=None, on_connect=None,
+                 min_backoff=1.0, max_backoff=30.0, stale_timeout=10.0):
+        self.camera_id = camera_id
+        self.source = source
+        self.options = options or CaptureOptions()
+        self.on_connect = on_connect
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.stale_timeout = stale_timeout
+
+        self.state = 'idle'
+        self.fps = 0.0
+        self.reconnect_count = 0
+        self.last_error = None
+        self.last_frame_time = None
+        self.connected_since = None
+        self.last_used = time.time()
+
+        self._cap = None
+        self._generation = 0
+        self._frame = None
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._jpeg = (0, None)
+        self._jpeg_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return self
+        self._stop.clear()
+        self._spawn()
+        return self
+
+    def _spawn(self):
+        # Her okuma iş parçacığının bir kuşağı var; eski kuşak frame yayınlamadan çıkar
+        self._generation += 1
+        self._thread = threading.Thread(target=self._run, args=(self._generation,),
+                                        name=f'camera-{self.camera_id}', daemon=True)
+        self._thread.start()
+
+    def _current(self, generation):
+        return generation == self._generation and not self._stop.is_set()
+
+    def stop(self, timeout=2.0):
+        self._stop.set()
+        self._interrupt()
+        with self._cond:
+            self.state = 'stopped'
+            self._cond.notify_all()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+    @property
+    def stopped(self):
+        return self._stop.is_set()
+
+    def _interrupt(self):
+        # ffmpeg alt sürecini öldürmek bloklanmış okumayı hemen sonlandırır
+        cap = self._cap
+        if isinstance(cap, FFmpegPipeCapture):
+            try:
+                cap.release()
+            except Exception:
+                pass
+
+    def check_health(self):
+        """
+        Force a reconnect if the connection stopped delivering frames
+        """
+        if self.state != 'connected' or self.last_frame_time is None:
+            return
+        age = time.time() - self.last_frame_time
+        if age > self.stale_timeout:
+            logger.warning("Kamera %s %.1f sn'dir frame göndermiyor, yeniden bağlanılıyor",
+                           self.camera_id, age)
+            self.last_error = 'stale stream'
+            if isinstance(self._cap, FFmpegPipeCapture):
+                self._interrupt()
+            else:
+                # Takılan OpenCV okuması dışarıdan kesilemez; iş parçacığı bırakılır,
+                # okuma döndüğünde kendi bağlantısını kapatır ve yerine yenisi açılır
+                self.last_frame_time = time.time()
+                self._spawn()
+
+    def _run(self, generation):
+        backoff = self.min_backoff
+        connected_before = generation > 1
+
+        while self._current(generation):
+            self.state = 'reconnecting' if connected_before else 'connecting'
+            cap = None
+            try:
+                cap = open_capture(self.source, self.options)
+                opened = cap.isOpened()
+            except Exception as e:
+                opened = False
+                self.last_error = str(e)
+
+            if not self._current(generation):
+                self._release(cap)
+                break
+            self._cap = cap
+
+            if not opened:
+                self.last_error = self.last_error or 'stream could not be opened'
+                self._release(cap)
+                delay = backoff * random.uniform(0.8, 1.2)
+                logger.warning("Kamera %s bağlanamadı, %.1f sn sonra tekrar denenecek",
+                               self.camera_id, delay)
+                self._stop.wait(delay)
+                backoff = min(self.max_backoff, backoff * 2)
+                continue
+
+            if connected_before:
+                self.reconnect_count += 1
+            connected_before = True
+            backoff = self.min_backoff
+            self.state = 'connected'
+            self.last_error = None
+            self.connected_since = time.time()
+            self.last_frame_time = time.time()
+            logger.info("Kamera %s bağlandı", self.camera_id)
+            if self.on_connect:
+                try:
+                    self.on_connect(self.camera_id)
+                except Exception as e:
+                    logger.error("Kamera %s bağlantı geri çağrısı hatası: %s", self.camera_id, e)
+
+            self._read_loop(cap, generation)
+            self._release(cap)
+
+        if self._stop.is_set():
+            self.state = 'stopped'
+
+    def _read_loop(self, cap, generation):
+        copy_frames = isinstance(cap, FFmpegPipeCapture)
+        while self._current(generation):
+            try:
+                ret, frame = cap.read()
+            except Exception as e:
+                ret, frame = False, None
+                self.last_error = str(e)
+            if not self._current(generation):
+                return
+            if not ret:
+                self.last_error = self.last_error or 'frame could not be read'
+                logger.error("Kamera %s frame okunamadı", self.camera_id)
+                return
+
+            now = time.time()
+            if self.last_frame_time:
+                interval = now - self.last_frame_time
+                if interval > 0:
+                    self.fps = 0.9 * self.fps + 0.1 * (1.0 / interval) if self.fps else 1.0 / interval
+            self.last_frame_time = now
+
+            with self._cond:
+                self._frame = frame.copy() if copy_frames else frame
+                self._seq += 1
+                self._cond.notify_all()
+
+    def _release(self, cap):
+        if self._cap is cap:
+            self._cap = None
+        if cap is not None:
+            try:
+                cap.release()
+            except Exception:
+                pass
+
+    def wait_frame(self, last_seq=0, timeout=1.0):
+        """
+        Block until a frame newer than last_seq arrives
+
+        Returns (seq, frame); frame is None on timeout or after stop().
+        """
+        self.last_used = time.time()
+        with self._cond:
+            if self._seq <= last_seq and not self._stop.is_set():
+                self._cond.wait(timeout)
+            if self._seq <= last_seq or self._frame is None:
+                return last_seq, None
+            return self._seq, self._frame
+
+    def wait_jpeg(self, last_seq=0, timeout=1.0, quality=80):
+        """
+        Like wait_frame() but returns the frame JPEG-encoded
+
+        The encoding is done once per frame and shared by all viewers.
+        """
+        seq, frame = self.wait_frame(last_seq, timeout)
+        if frame is None:
+            return seq, None
+        with self._jpeg_lock:
+            # Başka bir izleyici daha yeni frame'i kodladıysa o kullanılır
+            if self._jpeg[0] < seq:
+                ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+                if not ret:
+                    logger.error("Kamera %s frame'i JPEG'e çevrilemedi", self.camera_id)
+                    return seq, None
+                self._jpeg = (seq, buffer.tobytes())
+            return self._jpeg
+
+    def status(self):
+        now = time.time()
+        return {
+            'camera_id': self.camera_id,
+            'state': self.state,
+            'fps': round(self.fps, 2),
+            'last_frame_age': round(now - self.last_frame_time, 2) if self.last_frame_time else None,
+            'reconnect_count': self.reconnect_count,
+            'last_error': self.last_error,
+            'connected_since': self.connected_since,
+        }
+
+
+class CameraManager:
+    """
+    Registry of CameraConnection objects with a background health monitor
+
+    Connections nobody has read from for idle_timeout seconds (e.g. opened
+    only by a connection test) are stopped by the monitor.
+    """
+    def __init__(self, on_connect=None, health_interval=5.0, idle_timeout=60.0, **connection_kwargs):
+        self.on_connect = on_connect
+        self.health_interval = health_interval
+        self.idle_timeout = idle_timeout
+        self.connection_kwargs = connection_kwargs
+        self._connections = {}
+        self._lock = threading.Lock()
+        self._monitor = None
+
+    def ensure(self, camera_id, source, options=None):
+        """
+        Return the running connection for camera_id, (re)starting it if the
+        source or options changed
+        """
+        options = options or CaptureOptions()
+        with self._lock:
+            conn = self._connections.get(camera_id)
+            if conn and (conn.source != source or conn.options.__dict__ != options.__dict__):
+                conn.stop(timeout=0)
+                conn = None
+            if conn is None or conn.stopped:
+                conn = CameraConnection(camera_id, source, options, on_connect=self.on_connect,
+                                        **self.connection_kwargs)
+                self._connections[camera_id] = conn
+                conn.start()
+            conn.last_used = time.time()
+            self._start_monitor()
+            return conn
+
+    def get(self, camera_id):
+        return self._connections.get(camera_id)
+
+    def stop(self, camera_id):
+        with self._lock:
+            conn = self._connections.pop(camera_id, None)
+        if conn:
+            conn.stop(timeout=0)
+
+    def stop_all(self):
+        with self._lock:
+            connections = list(self._connections.values())
+            self._connections.clear()
+        for conn in connections:
+            conn.stop(timeout=0)
+
+    def status(self, camera_id):
+        conn = self._connections.get(camera_id)
+        return conn.status() if conn else None
+
+    def statuses(self):
+        return {camera_id: conn.status() for camera_id, conn in list(self._connections.items())}
+
+    def _start_monitor(self):
+        if self._monitor and self._monitor.is_alive():
+            return
+        self._monitor = threading.Thread(target=self._monitor_loop, name='camera-health', daemon=True)
+        self._monitor.start()
+
+    def _monitor_loop(self):
+        while True:
+            time.sleep(self.health_interval)
+            now = time.time()
+            for camera_id, conn in list(self._connections.items()):
+                if self.idle_timeout and now - conn.last_used > self.idle_timeout:
+                    logger.info("Kamera %s izleyicisiz kaldı, bağlantı kapatılıyor", camera_id)
+                    with self._lock:
+                        if self._connections.get(camera_id) is conn:
+                            del self._connections[camera_id]
+                    conn.stop(timeout=0)
+                    continue
+                conn.check_health()
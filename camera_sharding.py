@@ -0,0 +1,62 @@
+import math
+import bisect
+import hashlib
+from collections import defaultdict
+
+
+def _hash(value):
+    return int.from_bytes(hashlib.blake2b(str(value).encode(), digest_size=8).digest(), 'big')
+
+
+def assign_cameras(camera_ids, capacities, vnodes=128, balance=1.1):
+    """
+    Map camera ids to node ids by weighted consistent hashing
+
+    capacities is {node_id: capacity}; each node gets virtual points on the
+    ring in proportion to its capacity. Loads are bounded: a node takes at
+    most balance times its capacity share of the cameras, and a camera whose
+    ring owner is full goes to the next node clockwise. Adding or removing
+    a node therefore moves only the cameras that have to move.
+    """
+    capacities = {node: capacity for node, capacity in capacities.items() if capacity and capacity > 0}
+    if not capacities or not camera_ids:
+        return {}
+
+    total = sum(capacities.values())
+    mean = total / len(capacities)
+    ring = sorted(
+        (_hash(f"{node}#{i}"), node)
+        for node, capacity in capacities.items()
+        for i in range(max(1, round(vnodes * capacity / mean)))
+    )
+    points = [point for point, _ in ring]
+    limits = {node: max(1, math.ceil(len(camera_ids) * capacity / total * balance))
+              for node, capacity in capacities.items()}
+
+    load = defaultdict(int)
+    assignment = {}
+    # Kameralar her düğümde aynı sırayla yerleştirilir, böylece sonuç deterministiktir
+    for camera_id in sorted(camera_ids, key=lambda camera_id: _hash(f"camera:{camera_id}")):
+        start = bisect.bisect(points, _hash(f"camera:{camera_id}"))
+        for offset in range(len(ring)):
+            node = ring[(start + offset) % len(ring)][1]
+            if load[node] < limits[node]:
+                break
+        assignment[camera_id] = node
+        load[node] += 1
+    return assignment
+
+
+def settle_capacity(current, measured, threshold=0.25):
+    """
+    Capacity to store for a node that measured `measured` FPS while
+    `current` is stored
+
+    Changes within threshold (a fraction of current) are ignored. Every
+    stored change reshapes the ring, so jitter in the measured FPS would
+    otherwise move cameras, and restart their streams on two nodes, on
+    every heartbeat.
+    """
+    if current and abs(measured - current) <= threshold * current:
+        return current
+    return round(measured, 1)
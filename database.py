@@ -1,6 +1,7 @@
 import os
 import logging
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import inspect, text
 from sqlalchemy.orm import DeclarativeBase
 
 # Configure logging
@@ -13,8 +14,8 @@ class Base(DeclarativeBase):
 db = SQLAlchemy(model_class=Base)
 
 def init_db(app):
-    # Configure the database using environment variables
-    db_url = os.environ.get("DATABASE_URL")
+    # Configure the database using environment variables unless the app config already has it
+    db_url = app.config.get("SQLALCHEMY_DATABASE_URI") or os.environ.get("DATABASE_URL")
     if not db_url:
         raise RuntimeError(
             "DATABASE_URL environment variable is not set. "
@@ -25,25 +26,27 @@ def init_db(app):
     if db_url.startswith("postgres://"):
         db_url = db_url.replace("postgres://", "postgresql://", 1)
 
-    # Log database connection attempt
-    logger.info(f"Attempting to connect to database at {db_url.split('@')[-1]}")
-
     app.config["SQLALCHEMY_DATABASE_URI"] = db_url
-    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+    app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", {
         "pool_recycle": 300,
         "pool_pre_ping": True,
-    }
-
-    try:
-        # Initialize the app with the extension
-        db.init_app(app)
-
-        # Test the database connection
-        with app.app_context():
-            db.engine.connect()
-            logger.info("Successfully connected to the database")
-
-    except Exception as e:
-        logger.error(f"Failed to initialize database: {str(e)}")
-        logger.error("Please check your database configuration and ensure PostgreSQL is running")
-        raise
\ No newline at end of file
+    })
+
+    # Bağlantı ilk istekte açılır; açılışta veritabanına gidilmez (pool_pre_ping kopuk bağlantıları yakalar)
+    db.init_app(app)
+    logger.info(f"Database configured at {db_url.split('@')[-1]}")
+
+def add_missing_columns(model, *names):
+    """
+    Add new nullable columns to an existing table; create_all only creates
+    missing tables and never alters existing ones
+    """
+    table = model.__table__
+    existing = {column['name'] for column in inspect(db.engine).get_columns(table.name)}
+    with db.engine.begin() as conn:
+        for name in names:
+            if name in existing:
+                continue
+            column_type = table.columns[name].type.compile(db.engine.dialect)
+            conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {name} {column_type}'))
+            logger.info(f"Added column {table.name}.{name}")
@@ -0,0 +1,197 @@
+import os
+import sys
+import time
+import heapq
+import fcntl
+import sqlite3
+import hashlib
+import logging
+import tempfile
+import threading
+import numpy as np
+from multiprocessing import resource_tracker, shared_memory
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryDedupStore:
+    """
+    In-process duplicate suppression with heap-based expiry
+
+    seen_recently() is O(1) apart from popping expired entries, which is
+    amortized over the calls. At most max_entries keys are kept; beyond that
+    the entries closest to expiry are dropped first.
+    """
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._expires = {}
+        self._heap = []
+        self._lock = threading.Lock()
+
+    def _prune(self, now):
+        while self._heap and (self._heap[0][0] <= now or len(self._expires) > self.max_entries):
+            expires, key = heapq.heappop(self._heap)
+            # Anahtar sonradan yenilendiyse yığındaki eski kayıt yok sayılır
+            if self._expires.get(key) == expires:
+                del self._expires[key]
+
+    def seen_recently(self, key, interval, record=True):
+        """
+        Return True if key was recorded less than interval seconds ago;
+        otherwise record it now (unless record is False) and return False
+        """
+        now = time.time()
+        with self._lock:
+            self._prune(now)
+            if self._expires.get(key, 0) > now:
+                return True
+            if not record:
+                return False
+            expires = now + interval
+            self._expires[key] = expires
+            heapq.heappush(self._heap, (expires, key))
+            # Yenilenen anahtarların eski kayıtları yığını büyütmesin
+            if len(self._heap) > 2 * self.max_entries:
+                self._heap = [(e, k) for k, e in self._expires.items()]
+                heapq.heapify(self._heap)
+            return False
+
+    def __len__(self):
+        return len(self._expires)
+
+
+class SQLiteDedupStore:
+    """
+    Duplicate suppression shared by detector processes on one node through
+    a SQLite file in WAL mode
+    """
+    def __init__(self, path, prune_every=500):
+        self.path = path
+        self.prune_every = prune_every
+        self._calls = 0
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS dedup (key TEXT PRIMARY KEY, expires REAL NOT NULL)")
+        conn.execute("CREATE INDEX IF NOT EXISTS dedup_expires ON dedup (expires)")
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def seen_recently(self, key, interval, record=True):
+        now = time.time()
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT expires FROM dedup WHERE key = ?", (key,)).fetchone()
+            duplicate = bool(row and row[0] > now)
+            if not duplicate and record:
+                conn.execute("INSERT OR REPLACE INTO dedup (key, expires) VALUES (?, ?)", (key, now + interval))
+                self._calls += 1
+                if self._calls % self.prune_every == 0:
+                    conn.execute("DELETE FROM dedup WHERE expires <= ?", (now,))
+            conn.execute("COMMIT")
+            return duplicate
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+
+class SharedMemoryDedupStore:
+    """
+    Fixed-size open-addressing table in POSIX shared memory
+
+    Processes that open the same name share the table. Keys are stored as
+    64-bit hashes next to their expiry time; a probe covers at most `probe`
+    slots and, when all of them are live, overwrites the one closest to
+    expiry, so memory never grows. A lock file, by default <name>.lock in
+    the temp directory, serializes access; every process sharing the table
+    must use the same lock_path.
+    """
+    _dtype = np.dtype([('key', np.uint64), ('expires', np.float64)])
+
+    def __init__(self, name='plate_dedup', slots=8192, probe=16, lock_path=None):
+        self.name = name
+        self.slots = slots
+        self.probe = probe
+        self.lock_path = lock_path or os.path.join(tempfile.gettempdir(), f'{name}.lock')
+        size = slots * self._dtype.itemsize
+        try:
+            self._shm = self._open(name, create=True, size=size)
+            self._shm.buf[:size] = bytes(size)
+        except FileExistsError:
+            self._shm = self._open(name)
+        self._table = np.ndarray((slots,), dtype=self._dtype, buffer=self._shm.buf)
+        self._lock_file = open(self.lock_path, 'a')
+        self._thread_lock = threading.Lock()
+
+    @staticmethod
+    def _open(name, **kwargs):
+        # Tablo süreçler arasında kalıcıdır; çıkan süreç onu silmemeli
+        if sys.version_info >= (3, 13):
+            return shared_memory.SharedMemory(name=name, track=False, **kwargs)
+        shm = shared_memory.SharedMemory(name=name, **kwargs)
+        # Python < 3.13: izleyici POSIX bölümlerini başında '/' olan adla kaydeder
+        resource_tracker.unregister(f"/{shm.name}", 'shared_memory')
+        return shm
+
+    @staticmethod
+    def _hash(key):
+        value = int.from_bytes(hashlib.blake2b(str(key).encode(), digest_size=8).digest(), 'big')
+        return np.uint64(value or 1)
+
+    def seen_recently(self, key, interval, record=True):
+        now = time.time()
+        key_hash = self._hash(key)
+        start = int(key_hash % np.uint64(self.slots))
+        with self._thread_lock:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+            try:
+                target = None
+                oldest = None
+                for offset in range(self.probe):
+                    slot = (start + offset) % self.slots
+                    entry = self._table[slot]
+                    if entry['key'] == key_hash:
+                        if entry['expires'] > now:
+                            return True
+                        target = slot
+                        break
+                    if target is None and entry['expires'] <= now:
+                        target = slot
+                    if oldest is None or entry['expires'] < self._table[oldest]['expires']:
+                        oldest = slot
+                if not record:
+                    return False
+                slot = target if target is not None else oldest
+                self._table[slot] = (key_hash, now + interval)
+                return False
+            finally:
+                fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def close(self):
+        del self._table
+        self._shm.close()
+        self._lock_file.close()
+
+
+def create_dedup_store(url=None):
+    """
+    Build a dedup store from a URL: memory://, sqlite:///path/to/file.db or
+    shm://name[?lock=/path/to/name.lock]
+    """
+    url = url or os.environ.get('DEDUP_STORE', 'memory://')
+    if url.startswith('sqlite:///'):
+        return SQLiteDedupStore(url[len('sqlite:///'):])
+    if url.startswith('shm://'):
+        name, _, query = url[len('shm://'):].partition('?')
+        lock_path = query[len('lock='):] if query.startswith('lock=') else None
+        return SharedMemoryDedupStore(name or 'plate_dedup', lock_path=lock_path)
+    if url != 'memory://':
+        logger.warning("Bilinmeyen tekrar kontrol deposu %s, bellek içi depo kullanılıyor", url)
+    return MemoryDedupStore()
@@ -0,0 +1,256 @@
+import os
+import re
+import sys
+import time
+import queue
+import shutil
+import hashlib
+import logging
+import argparse
+import threading
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+# Kanıt referansı: <gün>/<hash'in ilk iki hanesi>/<hash>; dosyalar <referans>.<tür>.jpg
+EVIDENCE_REF = re.compile(r'^\d{4}-\d{2}-\d{2}/[0-9a-f]{2}/[0-9a-f]{32}$')
+EVIDENCE_KINDS = ('plate', 'vehicle')
+THUMB_DIR = '.thumbs'
+THUMB_WIDTH = int(os.environ.get("EVIDENCE_THUMB_WIDTH", 160))
+
+
+def is_evidence_ref(ref):
+    return isinstance(ref, str) and bool(EVIDENCE_REF.match(ref))
+
+
+def evidence_path(root, ref, kind):
+    return os.path.join(root, f"{ref}.{kind}.jpg")
+
+
+def _write_atomic(path, data):
+    # Aynı dosyayı aynı anda yazan iki iş parçacığı yarım dosya bırakmasın
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _crop(frame, box):
+    x, y, w, h = [int(v) for v in box]
+    x, y = max(0, x), max(0, y)
+    crop = frame[y:y+h, x:x+w]
+    return crop.copy() if crop.size else None
+
+
+class EvidenceWriter:
+    """
+    Store plate and vehicle crops of reported detections as JPEG evidence
+
+    submit() runs on the frame thread: it only copies the crops, hashes
+    their pixels and queues them; JPEG encoding and file writes happen on a
+    background thread. Files are content-addressed, so a crop that is seen
+    again is written once, and sharded by day, so age-based eviction drops
+    whole directories. When the queue is full evidence is dropped rather
+    than slowing down detection.
+    """
+    def __init__(self, root, quality=85, max_queue=64, max_bytes=None, max_age_days=None, evict_interval=600):
+        self.root = root
+        self.quality = quality
+        self.max_bytes = max_bytes
+        self.max_age_days = max_age_days
+        self.evict_interval = evict_interval
+        self.written = 0
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name='evidence-writer', daemon=True)
+        os.makedirs(root, exist_ok=True)
+        self._thread.start()
+
+    def submit(self, frame, plate_box, vehicle_box=None, timestamp=None):
+        """
+        Queue the crops of one detection and return its evidence reference, or None if dropped
+        """
+        crops = {'plate': _crop(frame, plate_box)}
+        if vehicle_box is not None:
+            crops['vehicle'] = _crop(frame, vehicle_box)
+        crops = {kind: crop for kind, crop in crops.items() if crop is not None}
+        if 'plate' not in crops:
+            return None
+
+        digest = hashlib.blake2b(digest_size=16)
+        for kind, crop in crops.items():
+            digest.update(f"{kind}{crop.shape}".encode())
+            digest.update(crop.tobytes())
+        key = digest.hexdigest()
+        ref = f"{(timestamp or datetime.utcnow()):%Y-%m-%d}/{key[:2]}/{key}"
+
+        try:
+            self._queue.put_nowait((ref, crops))
+        except queue.Full:
+            self.dropped += 1
+            logger.warning("Kanıt kuyruğu dolu, görüntü kaydedilmedi (toplam %d)", self.dropped)
+            return None
+        return ref
+
+    def _run(self):
+        import cv2
+
+        last_evict = time.monotonic()
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            ref, crops = item
+            for kind, crop in crops.items():
+                path = evidence_path(self.root, ref, kind)
+                if os.path.exists(path):
+                    continue
+                ok, buffer = cv2.imencode('.jpg', crop, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+                if not ok:
+                    logger.error("Kanıt görüntüsü JPEG'e çevrilemedi: %s", ref)
+                    continue
+                try:
+                    _write_atomic(path, buffer.tobytes())
+                    self.written += 1
+                except OSError as e:
+                    logger.error("Kanıt dosyası yazılamadı: %s (%s)", path, e)
+
+            if (self.max_bytes or self.max_age_days) and time.monotonic() - last_evict > self.evict_interval:
+                evict(self.root, self.max_bytes, self.max_age_days)
+                last_evict = time.monotonic()
+
+    def stats(self):
+        return {'queued': self._queue.qsize(), 'written': self.written, 'dropped': self.dropped}
+
+    def close(self, timeout=10):
+        self._queue.put(None)
+        self._thread.join(timeout)
+        logger.info("Kanıt yazıcısı kapatıldı: %s", self.stats())
+
+
+def _day_dirs(root):
+    return sorted(name for name in os.listdir(root) if re.match(r'^\d{4}-\d{2}-\d{2}$', name))
+
+
+def evict(root, max_bytes=None, max_age_days=None, now=None):
+    """
+    Delete evidence older than max_age_days, then the oldest files until
+    the store is under max_bytes; thumbnails go with their images.
+    Returns the number of removed files.
+    """
+    if not os.path.isdir(root):
+        return 0
+    removed = 0
+    thumbs_root = os.path.join(root, THUMB_DIR)
+
+    if max_age_days:
+        cutoff = f"{(now or datetime.utcnow()) - timedelta(days=max_age_days):%Y-%m-%d}"
+        for day in _day_dirs(root):
+            if day >= cutoff:
+                break
+            removed += sum(len(files) for _, _, files in os.walk(os.path.join(root, day)))
+            shutil.rmtree(os.path.join(root, day), ignore_errors=True)
+            if os.path.isdir(thumbs_root):
+                for width in os.listdir(thumbs_root):
+                    shutil.rmtree(os.path.join(thumbs_root, width, day), ignore_errors=True)
+
+    if max_bytes:
+        days = _day_dirs(root)
+        files = {}
+        total = 0
+        for day in days:
+            files[day] = []
+            for directory, _, names in os.walk(os.path.join(root, day)):
+                for name in names:
+                    path = os.path.join(directory, name)
+                    # Paylaşımlı dizinde başka bir düğüm dosyayı bu arada silmiş olabilir
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    files[day].append((stat.st_mtime, stat.st_size, path))
+                    total += stat.st_size
+
+        # En eski günden başlayarak, gün içinde de en eski dosyadan silinir
+        for day in days:
+            for _, size, path in sorted(files[day]):
+                if total <= max_bytes:
+                    break
+                total -= size
+                try:
+                    os.remove(path)
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+                relative = os.path.relpath(path, root)
+                if os.path.isdir(thumbs_root):
+                    for width in os.listdir(thumbs_root):
+                        thumb = os.path.join(thumbs_root, width, relative)
+                        if os.path.exists(thumb):
+                            try:
+                                os.remove(thumb)
+                            except FileNotFoundError:
+                                pass
+            if total <= max_bytes:
+                break
+
+    if removed:
+        logger.info("Kanıt deposundan %d dosya silindi", removed)
+    return removed
+
+
+def thumbnail_path(root, ref, kind, width=THUMB_WIDTH):
+    """
+    Path of a cached thumbnail of an evidence image, generating it on first
+    request; None if the image does not exist
+    """
+    source = evidence_path(root, ref, kind)
+    thumb = os.path.join(root, THUMB_DIR, str(width), f"{ref}.{kind}.jpg")
+    # İçerik adresli görüntü değişmediği için önbellekteki küçük resim hiç eskimez
+    if os.path.exists(thumb):
+        return thumb
+    if not os.path.exists(source):
+        return None
+
+    import cv2
+
+    image = cv2.imread(source)
+    if image is None:
+        logger.error("Kanıt görüntüsü okunamadı: %s", source)
+        return None
+    h, w = image.shape[:2]
+    if w > width:
+        image = cv2.resize(image, (width, max(1, round(h * width / w))), interpolation=cv2.INTER_AREA)
+    ok, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 80])
+    if not ok:
+        return None
+    _write_atomic(thumb, buffer.tobytes())
+    return thumb
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kanıt deposu bakımı")
+    parser.add_argument('command', choices=['evict', 'stats'])
+    parser.add_argument('--root', default=os.environ.get("EVIDENCE_DIR"))
+    parser.add_argument('--max-mb', type=float, default=float(os.environ.get("EVIDENCE_MAX_MB", 0)) or None)
+    parser.add_argument('--max-age-days', type=float,
+                        default=float(os.environ.get("EVIDENCE_MAX_AGE_DAYS", 0)) or None)
+    args = parser.parse_args()
+    if not args.root:
+        print("Kanıt dizini için --root veya EVIDENCE_DIR gerekli")
+        return 1
+
+    if args.command == 'evict':
+        removed = evict(args.root, int(args.max_mb * 1024 * 1024) if args.max_mb else None, args.max_age_days)
+        print(f"Silinen dosya: {removed}")
+    else:
+        for day in _day_dirs(args.root):
+            sizes = [os.path.getsize(os.path.join(directory, name))
+                     for directory, _, names in os.walk(os.path.join(args.root, day)) for name in names]
+            print(f"{day}: {len(sizes)} dosya, {sum(sizes) / 1024 / 1024:.1f}MB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,261 @@
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import cv2
+import numpy as np
+from video_capture import mask_source
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+
+
+def _fit(image, size):
+    """
+    Letterbox image into a (width, height) canvas without changing its
+    aspect ratio; returns (canvas, (used_width, used_height))
+    """
+    width, height = size
+    h, w = image.shape[:2]
+    scale = min(width / w, height / h, 1.0)
+    if scale < 1.0:
+        image = cv2.resize(image, (max(1, int(w * scale)), max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+    h, w = image.shape[:2]
+    canvas = np.zeros((height, width, 3), dtype=np.uint8)
+    canvas[:h, :w] = image
+    return canvas, (w, h)
+
+
+class FrameRecorder:
+    """
+    Record what the detector saw for offline profiling and replay
+
+    A recording is a directory with:
+      meta.json         mode, slot size and chunk size
+      chunk_00000.npy   fixed-stride uint8 array (chunk_size, H, W, 3)
+      index.jsonl       one line per recorded frame: time, camera, slots,
+                        vehicles, OCR outputs, detections and stage timings
+
+    Chunks are preallocated .npy memmaps, so writing a frame is a copy into
+    the page cache and reading is zero-copy via np.load(mmap_mode='r').
+    mode='frames' stores whole frames; mode='rois' stores only the vehicle
+    crops, one slot each. Images larger than the slot are scaled down.
+    """
+    def __init__(self, path, mode='frames', sample_every=10, slot_size=None, chunk_size=256):
+        if mode not in ('frames', 'rois'):
+            raise ValueError(f"Geçersiz kayıt modu: {mode}")
+        self.path = path
+        self.mode = mode
+        self.sample_every = max(1, sample_every)
+        self.slot_size = tuple(slot_size) if slot_size else ((320, 240) if mode == 'rois' else None)
+        self.chunk_size = chunk_size
+        self.frames_seen = 0
+        self.frames_recorded = 0
+        self._chunk = None
+        self._chunk_index = -1
+        self._slot = chunk_size
+        os.makedirs(path, exist_ok=True)
+
+        # Var olan kayda ekleme: parça boyutu ve numaralandırma devam eder
+        meta_path = os.path.join(path, 'meta.json')
+        if os.path.exists(meta_path):
+            with open(meta_path, encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta['mode'] != mode:
+                raise ValueError(f"Kayıt dizini {meta['mode']} modunda: {path}")
+            self.slot_size = tuple(meta['slot_size'])
+            self.chunk_size = meta['chunk_size']
+            self._chunk_index = len([name for name in os.listdir(path) if name.startswith('chunk_')]) - 1
+            self._slot = self.chunk_size
+        self._index = open(os.path.join(path, 'index.jsonl'), 'a', encoding='utf-8')
+
+    def _write_meta(self):
+        with open(os.path.join(self.path, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump({
+                'version': FORMAT_VERSION,
+                'mode': self.mode,
+                'slot_size': self.slot_size,
+                'chunk_size': self.chunk_size
+            }, f)
+
+    def _next_slot(self):
+        if self._slot >= self.chunk_size:
+            if self._chunk is not None:
+                self._chunk.flush()
+            self._chunk_index += 1
+            width, height = self.slot_size
+            self._chunk = np.lib.format.open_memmap(
+                os.path.join(self.path, f'chunk_{self._chunk_index:05d}.npy'),
+                mode='w+', dtype=np.uint8, shape=(self.chunk_size, height, width, 3)
+            )
+            self._slot = 0
+        slot = (self._chunk_index, self._slot)
+        self._slot += 1
+        return slot
+
+    def _store(self, image):
+        chunk_index, slot = self._next_slot()
+        canvas, used = _fit(image, self.slot_size)
+        self._chunk[slot] = canvas
+        return {'chunk': chunk_index, 'slot': slot, 'size': used}
+
+    def record(self, frame, camera_id, vehicles, plates, readings, detections, timings):
+        """
+        Record one processed frame if it falls on the sampling interval
+        """
+        self.frames_seen += 1
+        if (self.frames_seen - 1) % self.sample_every:
+            return
+
+        if self.slot_size is None:
+            self.slot_size = (frame.shape[1], frame.shape[0])
+        if self._chunk is None and self._chunk_index < 0:
+            self._write_meta()
+
+        if self.mode == 'frames':
+            images = [self._store(frame)]
+        else:
+            images = []
+            for vehicle in vehicles:
+                x, y, w, h = vehicle['box']
+                crop = frame[y:y+h, x:x+w]
+                if crop.size:
+                    images.append({**self._store(crop), 'box': [int(v) for v in vehicle['box']]})
+
+        entry = {
+            'time': time.time(),
+            'camera_id': camera_id if camera_id is None or isinstance(camera_id, int) else mask_source(camera_id),
+            'frame_size': [frame.shape[1], frame.shape[0]],
+            'images': images,
+            'vehicles': [{'box': [int(v) for v in vehicle['box']], 'score': float(vehicle['score']),
+                          'class': vehicle['class']} for vehicle in vehicles],
+            'ocr': [{'box': [int(v) for v in plate['box']], 'text': text, 'confidence': float(confidence)}
+                    for plate, (text, confidence) in zip(plates, readings)],
+            'detections': [{'plate_number': d['plate_number'], 'confidence': d['confidence'],
+                            'box': [int(v) for v in d['box']]} for d in detections],
+            'timings': {stage: round(seconds * 1000, 3) for stage, seconds in timings.items()}
+        }
+        self._index.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self.frames_recorded += 1
+
+    def close(self):
+        if self._chunk is not None:
+            self._chunk.flush()
+            self._chunk = None
+        self._index.close()
+        logger.info("Kayıt kapatıldı: %s (%d frame)", self.path, self.frames_recorded)
+
+
+class FrameReplay:
+    """
+    Read a FrameRecorder directory; chunks are memory-mapped, not loaded
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+            self.meta = json.load(f)
+        self.mode = self.meta['mode']
+        with open(os.path.join(path, 'index.jsonl'), encoding='utf-8') as f:
+            self.entries = [json.loads(line) for line in f if line.strip()]
+        self._chunks = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def image(self, ref):
+        chunk = self._chunks.get(ref['chunk'])
+        if chunk is None:
+            chunk = np.load(os.path.join(self.path, f"chunk_{ref['chunk']:05d}.npy"), mmap_mode='r')
+            self._chunks[ref['chunk']] = chunk
+        width, height = ref['size']
+        return chunk[ref['slot'], :height, :width]
+
+    def __iter__(self):
+        for entry in self.entries:
+            yield entry, [self.image(ref) for ref in entry['images']]
+
+
+def _percentile(values, q):
+    return round(float(np.percentile(values, q)), 3) if values else 0.0
+
+
+def replay(detector, path, speed='max', limit=None):
+    """
+    Feed a recording through the detector and return per-stage timing stats
+
+    speed='original' keeps the recorded inter-frame gaps, 'max' runs as fast
+    as possible. Results are not reported to the server.
+    """
+    recording = FrameReplay(path)
+    stages = {}
+    matched = expected = 0
+    previous_time = None
+    started_at = time.monotonic()
+    processed = 0
+
+    for entry, images in recording:
+        if limit and processed >= limit:
+            break
+        if speed == 'original' and previous_time is not None:
+            time.sleep(max(0.0, entry['time'] - previous_time))
+        previous_time = entry['time']
+
+        started = time.perf_counter()
+        if recording.mode == 'frames':
+            detections = detector.process_frame(np.ascontiguousarray(images[0]), camera_id=entry['camera_id'])
+            timings = dict(detector.last_timings)
+        else:
+            # Araç kırpıntıları tam görüntü gibi işlenir; araç tespiti adımı atlanır
+            detections = []
+            timings = {}
+            for image in images:
+                image = np.ascontiguousarray(image)
+                vehicle = {'box': (0, 0, image.shape[1], image.shape[0]), 'score': 1.0}
+                plates = detector.detect_plate_in_vehicle(image, vehicle) or []
+                for plate, (text, confidence) in zip(plates, detector.read_plates(image, plates, entry['camera_id'])):
+                    if text and confidence > 0.6:
+                        detections.append({'plate_number': text, 'confidence': float(confidence)})
+        timings['total'] = time.perf_counter() - started
+
+        for stage, seconds in timings.items():
+            stages.setdefault(stage, []).append(seconds * 1000)
+        recorded = {d['plate_number'] for d in entry['detections']}
+        expected += len(recorded)
+        matched += len(recorded & {d['plate_number'] for d in detections})
+        processed += 1
+
+    elapsed = time.monotonic() - started_at
+    return {
+        'frames': processed,
+        'elapsed_s': round(elapsed, 3),
+        'fps': round(processed / elapsed, 2) if elapsed else 0.0,
+        'recorded_plates_matched': f"{matched}/{expected}",
+        'stages_ms': {
+            stage: {'mean': round(float(np.mean(values)), 3), 'p50': _percentile(values, 50),
+                    'p95': _percentile(values, 95), 'max': round(float(np.max(values)), 3)}
+            for stage, values in stages.items()
+        }
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kayıtlı frame'leri dedektörden tekrar geçir")
+    parser.add_argument('recording', help="FrameRecorder kayıt dizini")
+    parser.add_argument('--speed', choices=['max', 'original'], default='max',
+                        help="max: olabildiğince hızlı, original: kayıttaki aralıklarla")
+    parser.add_argument('--limit', type=int, help="En fazla bu kadar frame işle")
+    args = parser.parse_args()
+
+    from plate_detection import PlateDetector
+
+    detector = PlateDetector(os.environ.get("API_URL", "http://localhost:5000"),
+                             os.environ.get("API_TOKEN", "test-token-123"))
+    print(json.dumps(replay(detector, args.recording, speed=args.speed, limit=args.limit),
+                     indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
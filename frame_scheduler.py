@@ -0,0 +1,190 @@
+import os
+import time
+import threading
+import cv2
+import numpy as np
+
+
+class FrameScheduler:
+    """
+    Pace one camera's processing loop toward a target FPS
+
+    The interval between frames is the target interval or the measured
+    (smoothed) processing time, whichever is longer, so a fast pipeline runs
+    at the target rate and a slow one runs back to back without sleeping.
+    Cameras without recent activity drop to idle_fps.
+    """
+    def __init__(self, target_fps=10.0, idle_fps=None, activity_hold=5.0, smoothing=0.2):
+        self.target_fps = float(target_fps)
+        self.idle_fps = float(idle_fps) if idle_fps else self.target_fps
+        self.activity_hold = activity_hold
+        self.smoothing = smoothing
+
+        self.avg_processing = 0.0
+        self.last_activity = 0.0
+        self.next_due = time.monotonic()
+        self.frames = 0
+        self._window_start = time.monotonic()
+        self._window_frames = 0
+        self.measured_fps = 0.0
+
+    @classmethod
+    def from_settings(cls, settings=None):
+        """
+        Build a scheduler from CameraSettings.settings, falling back to
+        DETECTOR_TARGET_FPS / DETECTOR_IDLE_FPS
+        """
+        settings = settings or {}
+        target_fps = settings.get('target_fps') or os.environ.get('DETECTOR_TARGET_FPS', 10)
+        idle_fps = settings.get('idle_fps') or os.environ.get('DETECTOR_IDLE_FPS') or None
+        return cls(target_fps=float(target_fps), idle_fps=idle_fps)
+
+    def is_active(self, now=None):
+        now = now or time.monotonic()
+        return now - self.last_activity < self.activity_hold
+
+    def interval(self, now=None):
+        fps = self.target_fps if self.is_active(now) else self.idle_fps
+        return max(1.0 / fps, self.avg_processing)
+
+    def record(self, processing_time, activity=False):
+        """
+        Record one processed frame and schedule the next one
+        """
+        now = time.monotonic()
+        if self.frames:
+            self.avg_processing += self.smoothing * (processing_time - self.avg_processing)
+        else:
+            self.avg_processing = processing_time
+        self.frames += 1
+        if activity:
+            self.last_activity = now
+
+        # Bir sonraki frame işlemin başladığı andan itibaren planlanır
+        self.next_due = max(now, now - processing_time + self.interval(now))
+
+        self._window_frames += 1
+        if now - self._window_start >= 1.0:
+            self.measured_fps = self._window_frames / (now - self._window_start)
+            self._window_start = now
+            self._window_frames = 0
+
+    def defer(self, delay=None):
+        """
+        Push the next due time back without counting a processed frame
+        """
+        self.next_due = time.monotonic() + (delay if delay is not None else 0.5 / self.target_fps)
+
+    def delay(self):
+        return max(0.0, self.next_due - time.monotonic())
+
+    def wait(self, stop_event=None):
+        delay = self.delay()
+        if delay > 0:
+            if stop_event:
+                stop_event.wait(delay)
+            else:
+                time.sleep(delay)
+
+    def stats(self):
+        return {
+            'target_fps': self.target_fps,
+            'idle_fps': self.idle_fps,
+            'measured_fps': round(self.measured_fps, 2),
+            'avg_processing_ms': round(self.avg_processing * 1000, 2),
+            'active': self.is_active(),
+        }
+
+
+class MultiCameraScheduler:
+    """
+    Share one processing loop between several cameras
+
+    next_camera() blocks until at least one camera is due and returns the
+    one with the highest priority: how overdue it is, weighted up for cameras
+    with recent motion or detections so they are served first without
+    starving idle cameras.
+    """
+    def __init__(self, active_weight=4.0):
+        self.active_weight = active_weight
+        self.cameras = {}
+        self._lock = threading.Lock()
+
+    def add(self, camera_id, scheduler=None):
+        with self._lock:
+            self.cameras[camera_id] = scheduler or FrameScheduler()
+        return self.cameras[camera_id]
+
+    def remove(self, camera_id):
+        with self._lock:
+            self.cameras.pop(camera_id, None)
+
+    def next_camera(self, stop_event=None, max_wait=1.0):
+        while not (stop_event and stop_event.is_set()):
+            now = time.monotonic()
+            with self._lock:
+                items = list(self.cameras.items())
+            if not items:
+                return None
+
+            best, best_score, earliest = None, None, None
+            for camera_id, scheduler in items:
+                overdue = now - scheduler.next_due
+                if overdue < 0:
+                    earliest = overdue if earliest is None else max(earliest, overdue)
+                    continue
+                score = (overdue + 1e-3) * (self.active_weight if scheduler.is_active(now) else 1.0)
+                if best_score is None or score > best_score:
+                    best, best_score = camera_id, score
+
+            if best is not None:
+                return best
+
+            delay = min(max_wait, -earliest)
+            if stop_event:
+                stop_event.wait(delay)
+            else:
+                time.sleep(delay)
+        return None
+
+    def record(self, camera_id, processing_time, activity=False):
+        scheduler = self.cameras.get(camera_id)
+        if scheduler:
+            scheduler.record(processing_time, activity)
+
+    def defer(self, camera_id, delay=None):
+        scheduler = self.cameras.get(camera_id)
+        if scheduler:
+            scheduler.defer(delay)
+
+    def stats(self):
+        return {camera_id: scheduler.stats() for camera_id, scheduler in list(self.cameras.items())}
+
+
+class MotionDetector:
+    """
+    Cheap motion check on a downscaled grayscale frame difference
+
+    An optional boolean mask of shape (size[1], size[0]) limits the check to
+    a region, e.g. RegionOfInterest.motion_mask(size).
+    """
+    def __init__(self, size=(160, 90), threshold=25, min_ratio=0.01, mask=None):
+        self.size = size
+        self.threshold = threshold
+        self.min_ratio = min_ratio
+        self.mask = mask
+        self._previous = None
+
+    def update(self, frame):
+        small = cv2.cvtColor(cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+        small = cv2.GaussianBlur(small, (5, 5), 0)
+        previous, self._previous = self._previous, small
+        if previous is None:
+            return False
+
+        changed = cv2.absdiff(small, previous) > self.threshold
+        if self.mask is not None:
+            changed = changed[self.mask]
+            if not changed.size:
+                return False
+        return np.count_nonzero(changed) / changed.size >= self.min_ratio
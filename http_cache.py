@@ -0,0 +1,181 @@
+import gzip
+import json
+import hashlib
+import logging
+from functools import wraps
+from flask import request, Response
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from database import db
+from models import TableVersion
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+COMPRESS_MIN_SIZE = 1024
+COMPRESS_MIMETYPES = {'application/json', 'text/csv', 'text/html'}
+
+
+def ensure_table_versions():
+    """
+    Create a version row for every mapped table that has none yet
+    """
+    existing = {name for (name,) in db.session.query(TableVersion.name)}
+    missing = [{'name': name, 'version': 0} for name in db.metadata.tables
+               if name not in existing and name != TableVersion.__tablename__]
+    if missing:
+        db.session.execute(db.insert(TableVersion), missing)
+        db.session.commit()
+
+
+def mark_tables_changed(session, tables):
+    """
+    Remember tables written in the session's transaction; their versions
+    are bumped when it commits
+    """
+    session.info.setdefault('changed_tables', set()).update(tables)
+
+
+def bump_table_versions(connection, tables):
+    """
+    Increment the version of the given tables on the writer's connection
+
+    Runs just before the writer's COMMIT, in the same transaction, so the
+    data and its new ETag become visible together and a failed bump fails
+    the commit instead of leaving a stale ETag behind. The version rows are
+    locked only from this UPDATE to the COMMIT; tables are updated in name
+    order so concurrent writers cannot deadlock on them.
+    """
+    tables = sorted(set(tables) - {TableVersion.__tablename__})
+    if not tables:
+        return
+    connection.execute(
+        db.update(TableVersion.__table__)
+        .where(TableVersion.__table__.c.name.in_(tables))
+        .values(version=TableVersion.__table__.c.version + 1)
+    )
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_after_flush(session, flush_context):
+    tables = {
+        obj.__table__.name
+        for obj in (*session.new, *session.dirty, *session.deleted)
+        if hasattr(obj, '__table__')
+    }
+    if tables:
+        mark_tables_changed(session, tables)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _collect_bulk_statement(orm_execute_state):
+    # db.insert(Model) ile toplu yazmalar ve Query.update/delete flush olaylarından geçmez
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None:
+            mark_tables_changed(orm_execute_state.session, [mapper.local_table.name])
+
+
+@event.listens_for(Session, 'before_commit')
+def _bump_before_commit(session):
+    # commit() bu olaydan sonra flush eder; bekleyen değişiklikler önce yazılsın ki tabloları toplansın
+    session.flush()
+    tables = session.info.pop('changed_tables', None)
+    if tables:
+        bump_table_versions(session.connection(), tables)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_after_rollback(session):
+    session.info.pop('changed_tables', None)
+
+
+def table_etag(*tables, key=None):
+    """
+    Weak ETag from the versions of the given tables and the request's query string
+    """
+    versions = dict(db.session.query(TableVersion.name, TableVersion.version)
+                    .filter(TableVersion.name.in_(tables)))
+    parts = [f"{table}:{versions.get(table, 0)}" for table in tables]
+    parts.append(request.query_string.decode('latin-1'))
+    if key:
+        parts.append(str(key()))
+    return hashlib.blake2b('|'.join(parts).encode(), digest_size=12).hexdigest()
+
+
+def dumps(data):
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False).encode()
+
+
+def conditional_json(*tables, key=None):
+    """
+    Serve a view's return value as JSON with an ETag from table versions
+
+    If-None-Match is answered with 304 before the view (and its query)
+    runs. The view returns plain data instead of a response; an error
+    returned as a (response, status) tuple is passed through uncached.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            etag = table_etag(*tables, key=key)
+            if request.if_none_match.contains_weak(etag):
+                response = Response(status=304)
+            else:
+                data = f(*args, **kwargs)
+                if isinstance(data, tuple):
+                    return data
+                response = Response(dumps(data), mimetype='application/json')
+            response.set_etag(etag, weak=True)
+            # Tarayıcı her seferinde doğrulasın; değişiklik yoksa 304 döner
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return decorated_function
+    return decorator
+
+
+def compress_response(response):
+    """
+    after_request hook: brotli or gzip compress large text responses
+    """
+    if (response.direct_passthrough or response.is_streamed or response.status_code < 200 or response.status_code >= 300
+            or response.mimetype not in COMPRESS_MIMETYPES or 'Content-Encoding' in response.headers):
+        return response
+
+    accepted = request.accept_encodings
+    if BROTLI_AVAILABLE and accepted['br']:
+        encoding = 'br'
+    elif accepted['gzip']:
+        encoding = 'gzip'
+    else:
+        return response
+
+    response.vary.add('Accept-Encoding')
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_SIZE:
+        return response
+
+    if encoding == 'br':
+        body = brotli.compress(body, quality=4)
+    else:
+        body = gzip.compress(body, compresslevel=5)
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def init_http_cache(app):
+    app.after_request(compress_response)
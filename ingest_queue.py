@@ -0,0 +1,130 @@
+import time
+import queue
+import atexit
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindQueue:
+    """
+    Group-commit queue for plate events
+
+    Request handlers submit() rows and return immediately; a background
+    thread collects up to max_batch rows or waits at most flush_interval
+    seconds after the first one, then hands the batch to writer() inside an
+    application context, so many events share one transaction. A batch that
+    keeps failing is written row by row, so only the rows that fail on
+    their own are dropped. The queue is drained on interpreter shutdown.
+
+    The thread starts with the first submit(), in the process that serves
+    requests: building the app for init-db or scripts, or in a gunicorn
+    master before it forks workers, starts nothing.
+    """
+    def __init__(self, app, writer, flush_interval=0.01, max_batch=500, max_queue=100000, retries=3):
+        self.app = app
+        self.writer = writer
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.retries = retries
+        self.flushed = 0
+        self.failed = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                thread = threading.Thread(target=self._run, name='ingest-writer', daemon=True)
+                thread.start()
+                atexit.register(self.stop)
+                self._thread = thread
+
+    def submit(self, row):
+        """
+        Queue one row; blocks only if max_queue rows are already waiting
+        """
+        self._ensure_started()
+        self._queue.put(row)
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def _collect(self):
+        try:
+            batch = [self._queue.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, rows):
+        with self.app.app_context():
+            self.writer(rows)
+
+    def _flush(self, batch):
+        for attempt in range(1, self.retries + 1):
+            try:
+                self._write(batch)
+                self.flushed += len(batch)
+                return
+            except Exception as e:
+                logger.error(f"Write-behind flush failed (attempt {attempt}/{self.retries}, "
+                             f"{len(batch)} rows): {str(e)}")
+                time.sleep(0.1 * attempt)
+
+        # Tek bir hatalı satır tüm grubu düşürmesin; satırlar tek tek yazılır
+        if len(batch) > 1:
+            logger.warning(f"Retrying {len(batch)} plate events one by one")
+        for row in batch:
+            try:
+                self._write([row])
+                self.flushed += 1
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Dropped plate event {row.get('plate_number')!r}: {str(e)}")
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._collect()
+            if batch:
+                self._flush(batch)
+
+    def stop(self, timeout=10.0):
+        """
+        Stop the writer thread and flush everything still queued
+        """
+        if self._stop.is_set() or self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        while True:
+            batch = []
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                break
+            self._flush(batch)
+
+    def stats(self):
+        return {
+            'pending': self.pending(),
+            'flushed': self.flushed,
+            'failed': self.failed,
+        }
@@ -0,0 +1,163 @@
+import os
+import sys
+import time
+import uuid
+import argparse
+import threading
+import statistics
+import requests
+
+
+def measure_ingest(api_url, token, count, prefix, camera_id=None):
+    """
+    POST count plate events one after another and return latencies in ms
+    """
+    latencies = []
+    errors = 0
+    headers = {'X-API-Token': token}
+    with requests.Session() as http:
+        for i in range(count):
+            started = time.perf_counter()
+            try:
+                response = http.post(f"{api_url}/api/plates", headers=headers, timeout=30, json={
+                    'plate_number': f"{prefix}{i % 100:03d}",
+                    'confidence': 50,
+                    'processed_by': 'load_test',
+                    'camera_id': camera_id
+                })
+                response.raise_for_status()
+            except requests.RequestException:
+                errors += 1
+                continue
+            latencies.append((time.perf_counter() - started) * 1000)
+    return latencies, errors
+
+
+def cleanup(api_url, token, prefix, timeout=30):
+    """
+    Delete the plate records and visits written by this run
+
+    Runs against the database in DATABASE_URL, which must be the server's;
+    waits for a write-behind ingest queue to drain first.
+    """
+    if not os.environ.get("DATABASE_URL"):
+        print(f"DATABASE_URL tanımlı değil; {prefix}* test kayıtları silinmedi")
+        return
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            status = requests.get(f"{api_url}/api/ingest/status", headers={'X-API-Token': token}, timeout=5).json()
+        except (requests.RequestException, ValueError):
+            break
+        if not status.get('pending'):
+            break
+        time.sleep(0.5)
+
+    from app import app
+    from database import db
+    from models import PlateRecord, Visit
+    with app.app_context():
+        records = PlateRecord.query.filter(
+            PlateRecord.plate_number.startswith(prefix),
+            PlateRecord.processed_by == 'load_test'
+        ).delete(synchronize_session=False)
+        visits = Visit.query.filter(Visit.plate_number.startswith(prefix)).delete(synchronize_session=False)
+        db.session.commit()
+    print(f"Test kayıtları silindi: {records} plaka kaydı, {visits} ziyaret")
+
+
+def summarize(latencies):
+    if not latencies:
+        return "istek başarısız"
+    ordered = sorted(latencies)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return f"p50={statistics.median(ordered):.1f}ms p95={p95:.1f}ms max={ordered[-1]:.1f}ms"
+
+
+class StreamViewer(threading.Thread):
+    """
+    Keep one MJPEG stream open and count the frames received
+    """
+    def __init__(self, url, cookies):
+        super().__init__(daemon=True)
+        self.url = url
+        self.cookies = cookies
+        self.frames = 0
+        self.status = None
+        self._stop = threading.Event()
+
+    def run(self):
+        try:
+            with requests.get(self.url, cookies=self.cookies, stream=True, timeout=30) as response:
+                self.status = response.status_code
+                if response.status_code != 200:
+                    return
+                for chunk in response.iter_content(chunk_size=65536):
+                    self.frames += chunk.count(b'--frame')
+                    if self._stop.is_set():
+                        return
+        except requests.RequestException:
+            self.status = self.status or 'error'
+
+    def stop(self):
+        self._stop.set()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Açık video yayınları varken plaka kayıt (ingest) gecikmesini ölç. "
+                    "Test olayları 'load_test' kullanıcısıyla yazılır ve sonunda sunucunun "
+                    "DATABASE_URL veritabanından silinir; geçici bir veritabanı kullanın."
+    )
+    parser.add_argument('--api', default='http://localhost:5000', help="API sunucusu")
+    parser.add_argument('--stream-url', help="Yayın sunucusu (varsayılan: --api)")
+    parser.add_argument('--camera-id', type=int, default=1)
+    parser.add_argument('--streams', type=int, default=50, help="Açık tutulacak yayın sayısı")
+    parser.add_argument('--requests', type=int, default=200, help="Her aşamadaki kayıt isteği sayısı")
+    parser.add_argument('--token', default='test-token-123')
+    parser.add_argument('--username', default='admin')
+    parser.add_argument('--password', default='admin123')
+    parser.add_argument('--warmup', type=float, default=3.0, help="Yayınlar açıldıktan sonra bekleme (sn)")
+    parser.add_argument('--keep', action='store_true', help="Test kayıtlarını silme")
+    args = parser.parse_args()
+
+    # Her çalıştırmanın plakaları ayrı bir önek taşır; temizlik yalnızca bunları siler
+    prefix = f"LT{uuid.uuid4().hex[:8].upper()}"
+
+    stream_url = args.stream_url or args.api
+
+    login = requests.Session()
+    login.post(f"{args.api}/login", data={'username': args.username, 'password': args.password}, timeout=10)
+    if 'session' not in login.cookies:
+        print("Giriş yapılamadı")
+        return 1
+
+    try:
+        baseline, baseline_errors = measure_ingest(args.api, args.token, args.requests, prefix)
+        print(f"Yayın yokken:      {summarize(baseline)} hata={baseline_errors}")
+
+        viewers = [StreamViewer(f"{stream_url}/video_feed/{args.camera_id}", login.cookies.get_dict())
+                   for _ in range(args.streams)]
+        for viewer in viewers:
+            viewer.start()
+        time.sleep(args.warmup)
+
+        loaded, loaded_errors = measure_ingest(args.api, args.token, args.requests, prefix)
+        open_streams = sum(1 for viewer in viewers if viewer.is_alive())
+        print(f"{open_streams}/{args.streams} yayın açıkken: {summarize(loaded)} hata={loaded_errors}")
+
+        rejected = sum(1 for viewer in viewers if viewer.status == 503)
+        frames = sum(viewer.frames for viewer in viewers)
+        print(f"Reddedilen yayın: {rejected}, alınan frame: {frames}")
+
+        for viewer in viewers:
+            viewer.stop()
+    finally:
+        if not args.keep:
+            cleanup(args.api, args.token, prefix)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
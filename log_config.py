@@ -0,0 +1,199 @@
+import os
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# LogRecord üzerinde her zaman bulunan alanlar; JSON çıktısında "extra" olarak yazılmaz
+_RESERVED_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_listener = None
+_lock = threading.Lock()
+_config = {}
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Format log records as single-line JSON objects
+    """
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Per-key token bucket for repetitive messages
+
+    The key is the ``log_key`` extra if given, otherwise the message template
+    together with the ``plate_number`` extra, so
+    ``logger.info("Plaka: %s", text, extra={'plate_number': text})`` is
+    limited per plate: a flood of the same plate is sampled while distinct
+    plates and their gate decisions are all logged. Other arguments, such as
+    a confidence that changes every frame, are not part of the key. Once a
+    key's bucket is empty, only every ``sample_every``-th record passes; it
+    carries the number of records suppressed since the last one. Beyond
+    ``max_keys`` the least recently used buckets are dropped.
+    """
+    def __init__(self, rate=1.0, burst=10, sample_every=0, max_keys=1024):
+        super().__init__()
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.sample_every = int(sample_every)
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if self.rate <= 0 or record.levelno >= logging.ERROR:
+            return True
+
+        key = getattr(record, 'log_key', None) or (record.name, record.msg, getattr(record, 'plate_number', None))
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                while len(self._buckets) >= self.max_keys:
+                    self._buckets.popitem(last=False)
+                bucket = self._buckets[key] = [self.burst, now, 0]
+            else:
+                self._buckets.move_to_end(key)
+
+            tokens, last, suppressed = bucket
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            if tokens >= 1:
+                bucket[:] = [tokens - 1, now, 0]
+            else:
+                suppressed += 1
+                if not self.sample_every or suppressed % self.sample_every:
+                    bucket[:] = [tokens, now, suppressed]
+                    return False
+                bucket[:] = [tokens, now, 0]
+                suppressed -= 1
+
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    QueueHandler that drops records instead of blocking when the queue is full
+    and leaves message formatting to the listener thread
+    """
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Biçimlendirme dinleyici thread'inde yapılır; sadece traceback'i sabitle
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _env_int(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def _env_float(name, default):
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def setup_logging(log_file=None, level=None, json_lines=None, max_bytes=None,
+                  backup_count=None, rate=None, burst=None, sample_every=None,
+                  queue_size=None):
+    """
+    Configure the root logger to log through a background queue listener
+
+    Every argument falls back to a LOG_* environment variable. Calling it
+    again is a no-op and returns the running listener.
+    """
+    global _listener
+    with _lock:
+        if _listener is not None:
+            return _listener
+
+        level = level or os.environ.get('LOG_LEVEL', 'INFO')
+        log_file = log_file if log_file is not None else os.environ.get('LOG_FILE', 'plate_detection.log')
+        if json_lines is None:
+            json_lines = os.environ.get('LOG_FORMAT', 'json').lower() == 'json'
+        max_bytes = max_bytes if max_bytes is not None else _env_int('LOG_MAX_BYTES', 10 * 1024 * 1024)
+        backup_count = backup_count if backup_count is not None else _env_int('LOG_BACKUP_COUNT', 5)
+        rate = rate if rate is not None else _env_float('LOG_RATE_LIMIT', 1.0)
+        burst = burst if burst is not None else _env_int('LOG_RATE_BURST', 10)
+        sample_every = sample_every if sample_every is not None else _env_int('LOG_SAMPLE_EVERY', 100)
+        queue_size = queue_size if queue_size is not None else _env_int('LOG_QUEUE_SIZE', 10000)
+
+        handlers = []
+        console = logging.StreamHandler()
+        console.setFormatter(logging.Formatter(TEXT_FORMAT))
+        handlers.append(console)
+
+        if log_file:
+            file_handler = RotatingFileHandler(log_file, maxBytes=max_bytes,
+                                               backupCount=backup_count, encoding='utf-8')
+            file_handler.setFormatter(JsonFormatter() if json_lines else logging.Formatter(TEXT_FORMAT))
+            handlers.append(file_handler)
+
+        log_queue = queue.Queue(maxsize=queue_size)
+        queue_handler = NonBlockingQueueHandler(log_queue)
+        queue_handler.addFilter(RateLimitFilter(rate=rate, burst=burst, sample_every=sample_every))
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(queue_handler)
+        root.setLevel(level.upper() if isinstance(level, str) else level)
+
+        _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+        _config.update(level=level, json_lines=json_lines, rate=rate, burst=burst,
+                       sample_every=sample_every, queue_size=queue_size)
+        return _listener
+
+
+def _restart_in_child():
+    # Dinleyici thread'i fork ile kopyalanmaz; alt süreç kendi dinleyicisini
+    # başlatır. Dönen dosyayı üst süreçle paylaşmamak için sadece konsola yazar.
+    global _listener, _lock
+    _lock = threading.Lock()
+    if _listener is not None:
+        _listener = None
+        setup_logging(log_file='', **_config)
+
+
+os.register_at_fork(after_in_child=_restart_in_child)
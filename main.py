@@ -1,4 +1,7 @@
-from app import app
+from app import app, bootstrap_database
 
 if __name__ == "__main__":
+    # Geliştirme sunucusu şemayı kendisi hazırlar; üretimde flask --app app init-db kullanılır
+    with app.app_context():
+        bootstrap_database()
     app.run(host="0.0.0.0", port=5000, debug=True)
@@ -85,9 +85,11 @@ class PlateRecord(db.Model):
     confidence = db.Column(db.Float, nullable=False)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     is_authorized = db.Column(db.Boolean, default=False)
+    edge_authorized = db.Column(db.Boolean)  # Dedektörün yerel kopyadan verdiği karar (yoksa boş)
     processed_by = db.Column(db.String(64))  # İşlemi yapan kullanıcı
     action_taken = db.Column(db.String(50))  # Yapılan işlem (örn: "Kapı Açıldı", "Erişim Reddedildi")
     camera_id = db.Column(db.Integer, db.ForeignKey('camera_settings.id'), nullable=True)
+    evidence = db.Column(db.String(64))  # Kanıt deposundaki plaka/araç görüntüsünün referansı
 
     def to_dict(self):
         return {
@@ -95,9 +97,11 @@ class PlateRecord(db.Model):
             'confidence': self.confidence,
             'timestamp': self.timestamp.isoformat(),
             'is_authorized': self.is_authorized,
+            'edge_authorized': self.edge_authorized,
             'processed_by': self.processed_by,
             'action_taken': self.action_taken,
-            'camera_id': self.camera_id
+            'camera_id': self.camera_id,
+            'evidence': self.evidence
         }
 
 class AuthorizationHistory(db.Model):
@@ -116,4 +120,78 @@ class AuthorizationHistory(db.Model):
             'description': self.description,
             'changed_by': self.changed_by,
             'timestamp': self.timestamp.isoformat()
-        }
\ No newline at end of file
+        }
+
+
+class AuthorizedPlateChange(db.Model):
+    # Yetkili plaka değişiklik günlüğü; id, dedektörlerin senkronize olduğu sürüm numarasıdır
+    id = db.Column(db.Integer, primary_key=True)
+    plate_number = db.Column(db.String(20), nullable=False)
+    is_active = db.Column(db.Boolean, default=True)
+    sensitivity = db.Column(db.Float)
+    deleted = db.Column(db.Boolean, default=False)
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'version': self.id,
+            'plate_number': self.plate_number,
+            'is_active': self.is_active,
+            'sensitivity': self.sensitivity,
+            'deleted': self.deleted
+        }
+
+class Visit(db.Model):
+    # Aynı plakanın aynı kameradaki, aralarında VISIT_GAP_SECONDS'tan kısa süre olan okumaları tek ziyarettir
+    id = db.Column(db.Integer, primary_key=True)
+    plate_number = db.Column(db.String(20), nullable=False)
+    camera_id = db.Column(db.Integer, db.ForeignKey('camera_settings.id'), nullable=True)
+    first_seen = db.Column(db.DateTime, nullable=False, index=True)
+    last_seen = db.Column(db.DateTime, nullable=False)
+    sighting_count = db.Column(db.Integer, nullable=False, default=1)
+    best_confidence = db.Column(db.Float, nullable=False)
+    is_authorized = db.Column(db.Boolean, default=False)
+    action_taken = db.Column(db.String(50))
+    evidence = db.Column(db.String(64))  # En yüksek güvenli okumanın kanıt görüntüsü
+
+    __table_args__ = (
+        db.Index('ix_visit_plate_camera_last_seen', 'plate_number', 'camera_id', 'last_seen'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'plate_number': self.plate_number,
+            'camera_id': self.camera_id,
+            'first_seen': self.first_seen.isoformat(),
+            'last_seen': self.last_seen.isoformat(),
+            'sighting_count': self.sighting_count,
+            'best_confidence': self.best_confidence,
+            'is_authorized': self.is_authorized,
+            'action_taken': self.action_taken,
+            'evidence': self.evidence
+        }
+
+class TableVersion(db.Model):
+    # Her tablonun değişiklik sayacı; liste uç noktalarının ETag'i bundan üretilir
+    name = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+class DetectorNode(db.Model):
+    # Kamera işleyen dedektör süreçleri; kameralar canlı düğümler arasında paylaştırılır
+    id = db.Column(db.String(100), primary_key=True)
+    hostname = db.Column(db.String(100))
+    capacity_fps = db.Column(db.Float)
+    registered_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_heartbeat = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    status = db.Column(JSON)  # Düğümün bildirdiği kamera durumları
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'hostname': self.hostname,
+            'capacity_fps': self.capacity_fps,
+            'registered_at': self.registered_at.isoformat(),
+            'last_heartbeat': self.last_heartbeat.isoformat(),
+            'status': self.status
+        }
@@ -0,0 +1,147 @@
+import os
+import sys
+import time
+import socket
+import random
+import logging
+import argparse
+import threading
+import requests
+
+logger = logging.getLogger(__name__)
+
+
+class NodeAgent:
+    """
+    Keep a detector node registered with the API server and track its cameras
+
+    A heartbeat thread posts the node's capacity and camera status every
+    interval seconds; the reply carries the cameras this node owns. The
+    server drops nodes whose heartbeats stop and hands their cameras to the
+    remaining nodes, so a node that cannot reach the server keeps its last
+    assignment until it can.
+    """
+    def __init__(self, api_url, api_token, node_id=None, capacity_fn=None, status_fn=None, interval=5.0):
+        self.api_url = api_url
+        self.api_token = api_token
+        self.node_id = node_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.capacity_fn = capacity_fn
+        self.status_fn = status_fn
+        self.interval = interval
+        self.assignment = {}
+        self.version = 0
+        self._changed = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+        self._http = requests.Session()
+        self._http.headers['X-API-Token'] = api_token
+
+    def start(self):
+        self.heartbeat()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.heartbeat()
+
+    def heartbeat(self):
+        """
+        Send one heartbeat and apply the returned assignment; returns True on success
+        """
+        payload = {'hostname': socket.gethostname()}
+        if self.capacity_fn:
+            capacity = self.capacity_fn()
+            if capacity:
+                payload['capacity_fps'] = round(capacity, 2)
+        if self.status_fn:
+            payload['cameras'] = self.status_fn()
+
+        try:
+            response = self._http.post(f"{self.api_url}/api/nodes/{self.node_id}/heartbeat",
+                                       json=payload, timeout=5)
+            response.raise_for_status()
+            data = response.json()
+        except (requests.RequestException, ValueError) as e:
+            logger.warning("Kalp atışı gönderilemedi, mevcut kameralarla devam ediliyor: %s", e)
+            return False
+
+        self.interval = data.get('heartbeat_interval', self.interval)
+        assignment = {camera['id']: camera for camera in data.get('cameras', [])}
+        with self._changed:
+            if assignment != self.assignment:
+                added = assignment.keys() - self.assignment.keys()
+                removed = self.assignment.keys() - assignment.keys()
+                # Kaynak adresleri kimlik bilgisi içerebilir; yalnızca kamera kimlikleri yazılır
+                changed = [camera_id for camera_id in assignment.keys() & self.assignment.keys()
+                           if assignment[camera_id] != self.assignment[camera_id]]
+                logger.info("Kamera ataması değişti: +%s -%s ~%s", sorted(added), sorted(removed), sorted(changed))
+                self.assignment = assignment
+                self.version += 1
+                self._changed.notify_all()
+        return True
+
+    def wait_for_change(self, version, timeout=None):
+        """
+        Block until the assignment version differs from version; returns (version, assignment)
+        """
+        with self._changed:
+            self._changed.wait_for(lambda: self.version != version or self._stop.is_set(), timeout)
+            return self.version, dict(self.assignment)
+
+    def stop(self):
+        """
+        Stop heartbeats and leave the cluster so cameras move immediately
+        """
+        self._stop.set()
+        with self._changed:
+            self._changed.notify_all()
+        if self._thread:
+            self._thread.join(timeout=self.interval + 5)
+        try:
+            self._http.delete(f"{self.api_url}/api/nodes/{self.node_id}", timeout=5)
+        except requests.RequestException as e:
+            logger.warning("Düğüm kaydı silinemedi: %s", e)
+
+
+def simulate(agent, capacity):
+    """
+    Log assignment changes of a node without cameras or a TPU
+    """
+    agent.capacity_fn = lambda: capacity * random.uniform(0.9, 1.1)
+    agent.status_fn = lambda: {str(camera_id): 'simulated' for camera_id in agent.assignment}
+    agent.start()
+    version = 0
+    try:
+        while True:
+            version, assignment = agent.wait_for_change(version, timeout=60)
+            print(f"{time.strftime('%H:%M:%S')} {agent.node_id}: kameralar {sorted(assignment)}", flush=True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        agent.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dedektör düğümü kalp atışı istemcisi")
+    parser.add_argument('--simulate', action='store_true',
+                        help="Kamera açmadan yalnızca atamaları izle (yerel çoklu düğüm testi)")
+    parser.add_argument('--node-id', default=os.environ.get("NODE_ID"))
+    parser.add_argument('--capacity', type=float, default=10.0, help="Simülasyonda bildirilen FPS kapasitesi")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    agent = NodeAgent(os.environ.get("API_URL", "http://localhost:5000"),
+                      os.environ.get("API_TOKEN", "test-token-123"),
+                      node_id=args.node_id,
+                      interval=float(os.environ.get("NODE_HEARTBEAT_INTERVAL", 5)))
+    if not args.simulate:
+        print("Gerçek düğüm için NODE_COORDINATION=true ile plate_detection.py çalıştırın")
+        return 1
+    simulate(agent, args.capacity)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+import time
+import logging
+import threading
+from collections import OrderedDict
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def dhash(image, hash_size=8):
+    """
+    Difference hash of an image as a hash_size * hash_size bit integer
+    """
+    if image.ndim == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(image, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = small[:, 1:] > small[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def box_iou(a, b):
+    """
+    Intersection over union of two (x, y, w, h) boxes
+    """
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    w = min(ax + aw, bx + bw) - max(ax, bx)
+    h = min(ay + ah, by + bh) - max(ay, by)
+    if w <= 0 or h <= 0:
+        return 0.0
+    inter = w * h
+    return inter / float(aw * ah + bw * bh - inter)
+
+
+class OCRCache:
+    """
+    LRU/TTL cache of recognition results keyed by camera, plate position and
+    perceptual hash
+
+    A lookup hits when an unexpired entry of the same camera is within
+    max_distance bits (Hamming distance) of the crop's hash and its plate
+    box overlaps the crop's box by at least min_iou, so a different plate
+    that looks alike elsewhere in the frame is read again. Each camera
+    keeps at most max_entries entries, so a scan stays short.
+    """
+    def __init__(self, max_entries=64, ttl=5.0, max_distance=12, hash_size=16, min_iou=0.7, log_every=1000):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self.hash_size = hash_size
+        self.min_iou = min_iou
+        self.log_every = log_every
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def key(self, image, box=None):
+        return dhash(image, self.hash_size), tuple(int(v) for v in box) if box is not None else None
+
+    def get(self, camera_id, key):
+        """
+        Return the cached (text, confidence) for a near-duplicate crop, or None
+        """
+        image_hash, box = key
+        now = time.monotonic()
+        with self._lock:
+            entries = self._entries.get(camera_id)
+            result = None
+            if entries:
+                for stored_key in list(entries):
+                    text, confidence, stored_at = entries[stored_key]
+                    if now - stored_at > self.ttl:
+                        del entries[stored_key]
+                        continue
+                    stored_hash, stored_box = stored_key
+                    if (stored_hash ^ image_hash).bit_count() > self.max_distance:
+                        continue
+                    if box is not None and stored_box is not None and box_iou(box, stored_box) < self.min_iou:
+                        continue
+                    entries.move_to_end(stored_key)
+                    result = (text, confidence)
+                    break
+
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            lookups = self.hits + self.misses
+
+        if self.log_every and lookups % self.log_every == 0:
+            logger.info("OCR önbelleği: %s", self.stats())
+        return result
+
+    def put(self, camera_id, key, text, confidence):
+        with self._lock:
+            entries = self._entries.setdefault(camera_id, OrderedDict())
+            entries[key] = (text, confidence, time.monotonic())
+            entries.move_to_end(key)
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            'entries': sum(len(entries) for entries in self._entries.values()),
+        }
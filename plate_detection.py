@@ -1,22 +1,25 @@
 import cv2
 import numpy as np
-import easyocr
 import requests
 import logging
 import time
 import sys
 import os
 from datetime import datetime
+from log_config import setup_logging
+from video_capture import CaptureOptions, open_capture, settings_for_source, mask_source
+from camera_manager import CameraConnection
+from authorization_cache import AuthorizationCache, EventReporter
+from plate_recognizer import build_recognizers, crop_plate
+from ocr_cache import OCRCache
+from dedup_store import create_dedup_store
+from frame_scheduler import FrameScheduler, MotionDetector, MultiCameraScheduler
+from roi import RegionOfInterest, roi_for_source
+from frame_recorder import FrameRecorder
+from evidence_store import EvidenceWriter
 
 # Configure logging
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler('plate_detection.log')
-    ]
-)
+setup_logging()
 logger = logging.getLogger(__name__)
 
 # TPU imports with error handling
@@ -29,7 +32,7 @@ try:
     logger.info("TPU bağımlılıkları başarıyla yüklendi")
 except ImportError as e:
     TPU_AVAILABLE = False
-    logger.error(f"TPU bağımlılıkları yüklenemedi: {str(e)}")
+    logger.error("TPU bağımlılıkları yüklenemedi: %s", e)
     logger.error("Lütfen setup_tpu.sh betiğini çalıştırın")
 
 # Nesne sınıfları (COCO veri setinden)
@@ -39,19 +42,44 @@ COCO_LABELS = {
 }
 
 class PlateDetector:
-    def __init__(self, api_url, api_token):
+    def __init__(self, api_url, api_token, tpu_device=None):
         """
         Initialize the plate detector with Edge TPU support
+
+        tpu_device selects the Edge TPU (e.g. ':1') when several are attached.
         """
         try:
             logger.info("Plaka tanıma sistemi başlatılıyor...")
 
-            # Initialize EasyOCR for text recognition
-            logger.info("EasyOCR başlatılıyor...")
-            self.reader = easyocr.Reader(['tr'])
+            # Initialize plate recognition (CRNN model or EasyOCR)
+            self.recognizer, self.fallback_recognizer = build_recognizers()
+            self.fallback_threshold = float(os.environ.get("PLATE_OCR_FALLBACK_THRESHOLD", 0.7))
+
+            # Duran araçların neredeyse aynı plaka görüntüleri tekrar okunmaz
+            self.ocr_cache = None
+            if os.environ.get("OCR_CACHE", "true").lower() == "true":
+                self.ocr_cache = OCRCache(
+                    ttl=float(os.environ.get("OCR_CACHE_TTL", 5.0)),
+                    max_distance=int(os.environ.get("OCR_CACHE_MAX_DISTANCE", 12)),
+                    min_iou=float(os.environ.get("OCR_CACHE_MIN_IOU", 0.7))
+                )
 
             self.api_url = api_url
             self.api_token = api_token
+            self.auth_cache = None
+            self.reporter = None
+
+            # Profil için örneklenen frame'ler, tespitler ve aşama süreleri kaydedilebilir
+            self.recorder = None
+            self.last_timings = {}
+            # İşlenen frame süresinin hareketli ortalaması; düğüm kapasitesi (FPS) buradan bildirilir
+            self.avg_frame_time = None
+
+            # Bildirilen tespitlerin plaka ve araç görüntüleri kanıt olarak saklanabilir
+            self.evidence = None
+
+            # Aynı araç birden fazla kamerada veya süreçte görülebilir; tekrar kontrolü ortak depodan yapılır
+            self.dedup_store = create_dedup_store()
 
             if not TPU_AVAILABLE:
                 raise ImportError("TPU bağımlılıkları eksik")
@@ -64,7 +92,7 @@ class PlateDetector:
                 raise FileNotFoundError(f"TPU modeli bulunamadı: {model_path}")
 
             try:
-                self.interpreter = edgetpu.make_interpreter(model_path)
+                self.interpreter = edgetpu.make_interpreter(model_path, device=tpu_device)
                 self.interpreter.allocate_tensors()
 
                 # Get model details
@@ -73,14 +101,14 @@ class PlateDetector:
                 self.input_shape = self.input_details[0]['shape']
 
                 logger.info("TPU destekli plaka algılama sistemi başlatıldı")
-                logger.info(f"Model giriş boyutu: {self.input_shape}")
+                logger.info("Model giriş boyutu: %s", self.input_shape)
 
             except Exception as tpu_error:
-                logger.error(f"TPU başlatma hatası: {str(tpu_error)}")
+                logger.error("TPU başlatma hatası: %s", tpu_error)
                 raise
 
         except Exception as e:
-            logger.error(f"Başlatma hatası: {str(e)}")
+            logger.error("Başlatma hatası: %s", e)
             raise
 
     def preprocess_image(self, frame):
@@ -104,16 +132,22 @@ class PlateDetector:
             return processed_img
 
         except Exception as e:
-            logger.error(f"Görüntü ön işleme hatası: {str(e)}")
+            logger.error("Görüntü ön işleme hatası: %s", e)
             return None
 
-    def detect_vehicles(self, frame):
+    def detect_vehicles(self, frame, roi=None):
         """
-        Detect vehicles using Edge TPU
+        Detect vehicles using Edge TPU, only inside roi when given
         """
         try:
+            # ROI varsa model girişine sadece bölge verilir, kutular tam frame'e taşınır
+            offset_x, offset_y = 0, 0
+            region = frame
+            if roi is not None and frame is not None:
+                region, (offset_x, offset_y) = roi.crop(frame)
+
             # Preprocess image
-            input_data = self.preprocess_image(frame)
+            input_data = self.preprocess_image(region)
             if input_data is None:
                 return []
 
@@ -128,11 +162,11 @@ class PlateDetector:
                 scores = self.interpreter.get_tensor(self.output_details[2]['index'])[0]
 
             except Exception as tpu_error:
-                logger.error(f"TPU çıkarım hatası: {str(tpu_error)}")
+                logger.error("TPU çıkarım hatası: %s", tpu_error)
                 return []
 
             # Filter vehicle detections
-            height, width = frame.shape[:2]
+            height, width = region.shape[:2]
             vehicle_classes = [2, 3, 4, 6, 8]  # bicycle, car, motorcycle, bus, truck
             vehicles = []
 
@@ -145,94 +179,358 @@ class PlateDetector:
                     ymax = min(height, int(ymax * height))
 
                     vehicles.append({
-                        'box': (xmin, ymin, xmax - xmin, ymax - ymin),
+                        'box': (xmin + offset_x, ymin + offset_y, xmax - xmin, ymax - ymin),
                         'score': score,
                         'class': COCO_LABELS[int(class_id)]
                     })
 
-                    logger.debug(f"Araç tespit edildi: {COCO_LABELS[int(class_id)]}, güven: {score:.2f}")
+                    logger.debug("Araç tespit edildi: %s, güven: %.2f", COCO_LABELS[int(class_id)], score)
 
             return vehicles
 
         except Exception as e:
-            logger.error(f"Araç tespiti hatası: {str(e)}")
+            logger.error("Araç tespiti hatası: %s", e)
             return []
 
-    def process_camera_feed(self, camera_id=0):
+    def process_frame(self, frame, min_confidence=0.6, camera_id=None, roi=None):
+        """
+        Run vehicle detection, plate localization and OCR on a single frame
+
+        camera_id keys the OCR cache and is written by the recorder, so
+        stream URLs must be passed through mask_source() first.
+        """
+        started = time.perf_counter()
+        vehicles = self.detect_vehicles(frame, roi)
+        detected = time.perf_counter()
+
+        plates = []
+        for vehicle in vehicles:
+            # Find plate candidates in vehicle region
+            plates.extend(self.detect_plate_in_vehicle(frame, vehicle) or [])
+        located = time.perf_counter()
+
+        # Read all plate candidates of the frame in one batch
+        readings, cached = self._read_plates(frame, plates, camera_id)
+        read = time.perf_counter()
+
+        detections = []
+        for i, (plate, (plate_text, confidence)) in enumerate(zip(plates, readings)):
+            if plate_text and confidence > min_confidence:
+                detections.append({
+                    'plate_number': plate_text,
+                    'confidence': float(confidence),
+                    'box': plate['box'],
+                    'corners': plate.get('corners'),
+                    'vehicle_box': plate.get('vehicle_box'),
+                    'cached': i in cached
+                })
+
+        self.last_timings = {
+            'vehicle_detection': detected - started,
+            'plate_localization': located - detected,
+            'ocr': read - located
+        }
+        if self.recorder:
+            self.recorder.record(frame, camera_id, vehicles, plates, readings, detections, self.last_timings)
+
+        return detections
+
+    def handle_detections(self, frame, detections, min_detection_interval=5, camera_id=None, min_confidence=0.6):
+        """
+        Report new plates to the server, skipping plates seen within min_detection_interval seconds
+
+        Readings served from the OCR cache are read again first and dropped
+        if the text changes or the confidence falls to min_confidence; a
+        plate enters the dedup store only once it is going to be reported.
+
+        camera_id is the server's CameraSettings id when the camera was
+        assigned by the server, None for local sources. Boxes are drawn on
+        the frame only after every detection has been handled, so evidence
+        crops and OCR re-checks see the original pixels.
+        """
+        reported = []
+        for detection in detections:
+            plate_text = detection['plate_number']
+            confidence = detection['confidence']
+
+            # Check detection interval; yalnızca bakılır, kayıt doğrulamadan sonra yapılır
+            if self.dedup_store.seen_recently(plate_text, min_detection_interval, record=False):
+                continue
+
+            # Önbellekten gelen okuma kapı kararına girmeden önce OCR ile tekrar doğrulanır
+            if detection.get('cached'):
+                text, confidence = self.read_plates(frame, [detection], camera_id, use_cache=False)[0]
+                if text != plate_text or confidence <= min_confidence:
+                    logger.debug("Önbellekteki okuma doğrulanamadı: %s != %s (Güven: %.2f)",
+                                 plate_text, text, confidence)
+                    continue
+
+            # Başka bir süreç aynı plakayı bu arada bildirmiş olabilir
+            if self.dedup_store.seen_recently(plate_text, min_detection_interval):
+                continue
+
+            logger.info("Plaka tespit edildi: %s (Güven: %.2f)", plate_text, confidence,
+                        extra={'plate_number': plate_text, 'confidence': float(confidence)})
+
+            # Kırpıntılar kopyalanır; kodlama ve yazma arka planda yapılır
+            evidence = None
+            if self.evidence:
+                evidence = self.evidence.submit(frame, detection['box'], detection.get('vehicle_box'))
+
+            if self.auth_cache:
+                self.decide_locally(plate_text, confidence, camera_id, evidence)
+            else:
+                self.send_plate_to_server(plate_text, confidence, camera_id, evidence)
+            reported.append(detection)
+
+        # Draw detections
+        for detection in reported:
+            x, y, w, h = detection['box']
+            cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
+            cv2.putText(frame, detection['plate_number'], (x, y-10),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 0), 2)
+
+    @staticmethod
+    def motion_detector(roi=None):
+        """
+        Motion detector restricted to the ROI when one is set
+        """
+        detector = MotionDetector()
+        if roi is not None:
+            detector.mask = roi.motion_mask(detector.size)
+        return detector
+
+    def _source_setup(self, source, capture_options):
+        """
+        Return (roi, capture options, scheduler) of a command line source
+
+        Settings come from DETECTOR_CAMERA_SETTINGS, with DETECTOR_ROI and
+        the CAPTURE_* / DETECTOR_*_FPS variables as fallbacks.
+        """
+        settings = settings_for_source(source)
+        try:
+            roi = RegionOfInterest.from_settings(settings)
+        except ValueError as e:
+            logger.error("Kaynak %s ROI ayarı geçersiz: %s", mask_source(source), e)
+            roi = None
+        roi = roi or roi_for_source(source)
+        options = CaptureOptions.from_settings(settings, source) if settings.get('capture') else capture_options
+        return roi, options, FrameScheduler.from_settings(settings)
+
+    def process_camera_feeds(self, sources, capture_options=None):
+        """
+        Process several sources in one loop, serving the cameras with recent
+        motion or detections first
+
+        Live sources reconnect in the background; video files are read frame
+        by frame and leave the loop at their end.
+        """
+        capture_options = capture_options or CaptureOptions.from_env()
+        connections = {}
+        files = {}
+        try:
+            scheduler = MultiCameraScheduler()
+            motion = {}
+            rois = {}
+            seqs = {}
+            # Kayıt dosyasına ve OCR önbelleğine kimlik bilgisi içeren URL değil, maskelenmiş kaynak girer
+            source_keys = {source: mask_source(source) for source in sources}
+            for source in sources:
+                logger.info("Kamera akışı başlatılıyor: %s", mask_source(source))
+                rois[source], options, frame_scheduler = self._source_setup(source, capture_options)
+                if os.path.isfile(source):
+                    files[source] = open_capture(source, options)
+                    if not files[source].isOpened():
+                        raise Exception(f"Video dosyası açılamadı: {source}")
+                else:
+                    # Bağlantı günlüklerinde kimlik bilgisi görünmesin
+                    connections[source] = CameraConnection(mask_source(source), source, options).start()
+                scheduler.add(source, frame_scheduler)
+                motion[source] = self.motion_detector(rois[source])
+                seqs[source] = 0
+
+            while True:
+                source = scheduler.next_camera()
+                if source is None:
+                    logger.info("Tüm video kaynakları bitti")
+                    break
+                if source in files:
+                    ret, frame = files[source].read()
+                    if not ret:
+                        logger.info("Video dosyasının sonuna gelindi: %s", source)
+                        scheduler.remove(source)
+                        files.pop(source).release()
+                        continue
+                else:
+                    seqs[source], frame = connections[source].wait_frame(seqs[source], timeout=0)
+                    if frame is None:
+                        # Henüz yeni frame yok; kamerayı kısa süre sonra tekrar dene
+                        scheduler.defer(source)
+                        continue
+
+                started = time.monotonic()
+                moving = motion[source].update(frame)
+                detections = self.process_frame(frame, camera_id=source_keys[source], roi=rois[source])
+                self.handle_detections(frame, detections)
+                scheduler.record(source, time.monotonic() - started, activity=moving or bool(detections))
+
+        except KeyboardInterrupt:
+            logger.info("Kullanıcı tarafından durduruldu")
+        finally:
+            for connection in connections.values():
+                connection.stop()
+            for cap in files.values():
+                cap.release()
+
+    def process_assigned_cameras(self, agent, capture_options=None):
+        """
+        Process the cameras the server assigns to this node
+
+        Cameras are opened and closed as the agent's assignment changes, e.g.
+        when another node joins or stops sending heartbeats, and restarted
+        when their source or settings change. Per camera capture,
+        scheduling and ROI settings come from CameraSettings.
+        """
+        capture_options = capture_options or CaptureOptions.from_env()
+        scheduler = MultiCameraScheduler()
+        cameras = {}
+        version = -1
+
+        def status():
+            return {str(camera_id): camera['connection'].status() for camera_id, camera in list(cameras.items())}
+
+        agent.capacity_fn = lambda: 1.0 / self.avg_frame_time if self.avg_frame_time else None
+        agent.status_fn = status
+        agent.start()
+
+        try:
+            while True:
+                if agent.version != version:
+                    version, assignment = agent.wait_for_change(version, timeout=0)
+                    for camera_id in list(cameras):
+                        if camera_id not in assignment:
+                            logger.info("Kamera başka düğüme devredildi: %s", camera_id)
+                        elif assignment[camera_id] != cameras[camera_id]['payload']:
+                            # Kaynak veya ayarlar değişti; kamera yeni ayarlarla yeniden açılır
+                            logger.info("Kamera ayarları değişti, yeniden başlatılıyor: %s", camera_id)
+                        else:
+                            continue
+                        scheduler.remove(camera_id)
+                        cameras.pop(camera_id)['connection'].stop()
+                    for camera_id in assignment.keys() - cameras.keys():
+                        camera = assignment[camera_id]
+                        settings = camera.get('settings') or {}
+                        try:
+                            roi = RegionOfInterest.from_settings(settings)
+                        except ValueError as e:
+                            logger.error("Kamera %s ROI ayarı geçersiz, tüm frame işlenecek: %s", camera_id, e)
+                            roi = None
+                        logger.info("Kamera akışı başlatılıyor: %s (%s)", camera_id, camera.get('name'))
+                        options = (CaptureOptions.from_settings(settings, camera['source'])
+                                   if settings.get('capture') else capture_options)
+                        cameras[camera_id] = {
+                            'payload': camera,
+                            'connection': CameraConnection(camera_id, camera['source'], options).start(),
+                            'roi': roi,
+                            'motion': self.motion_detector(roi),
+                            'seq': 0
+                        }
+                        scheduler.add(camera_id, FrameScheduler.from_settings(settings))
+
+                if not cameras:
+                    agent.wait_for_change(version, timeout=1.0)
+                    continue
+
+                camera_id = scheduler.next_camera(max_wait=0.5)
+                if camera_id not in cameras:
+                    continue
+                camera = cameras[camera_id]
+                camera['seq'], frame = camera['connection'].wait_frame(camera['seq'], timeout=0)
+                if frame is None:
+                    scheduler.defer(camera_id)
+                    continue
+
+                started = time.monotonic()
+                moving = camera['motion'].update(frame)
+                detections = self.process_frame(frame, camera_id=camera_id, roi=camera['roi'])
+                self.handle_detections(frame, detections, camera_id=camera_id)
+                elapsed = time.monotonic() - started
+                self.avg_frame_time = elapsed if self.avg_frame_time is None else \
+                    0.9 * self.avg_frame_time + 0.1 * elapsed
+                scheduler.record(camera_id, elapsed, activity=moving or bool(detections))
+
+        except KeyboardInterrupt:
+            logger.info("Kullanıcı tarafından durduruldu")
+        finally:
+            agent.stop()
+            for camera in cameras.values():
+                camera['connection'].stop()
+
+    def process_camera_feed(self, camera_id=0, capture_options=None):
         """
         Process camera feed and detect plates
         """
         try:
-            logger.info(f"Kamera akışı başlatılıyor: {camera_id}")
+            logger.info("Kamera akışı başlatılıyor: %s", mask_source(camera_id))
+
+            roi, capture_options, scheduler = self._source_setup(
+                camera_id, capture_options or CaptureOptions.from_env())
+            if roi:
+                logger.info("Tespit bölgesi (ROI): %s", roi.bounds)
 
             # Handle RTSP URLs
             if isinstance(camera_id, str) and camera_id.startswith('rtsp://'):
                 logger.info("RTSP bağlantısı tespit edildi")
-                cap = cv2.VideoCapture(camera_id)
-                if not cap.isOpened():
-                    raise Exception(f"RTSP bağlantısı başarısız: {camera_id}")
-            else:
+            elif not (isinstance(camera_id, str) and os.path.isfile(camera_id)):
                 # Try to convert to integer for regular camera
                 try:
                     camera_id = int(camera_id)
                 except ValueError:
-                    logger.warning(f"Kamera ID'si sayıya çevrilemedi, orijinal değer kullanılıyor: {camera_id}")
-                cap = cv2.VideoCapture(camera_id)
+                    logger.warning("Kamera ID'si sayıya çevrilemedi, orijinal değer kullanılıyor: %s", mask_source(camera_id))
+
+            connection = None
+            if isinstance(camera_id, str) and os.path.isfile(camera_id):
+                # Kayıtlı video dosyası: sonuna gelindiğinde işlem biter
+                cap = open_capture(camera_id, capture_options)
                 if not cap.isOpened():
-                    raise Exception(f"Kamera bağlantısı başarısız: {camera_id}")
+                    raise Exception(f"Video dosyası açılamadı: {camera_id}")
+            else:
+                # Canlı kaynak: bağlantı koparsa arka planda yeniden bağlanılır
+                connection = CameraConnection(mask_source(camera_id), camera_id, capture_options).start()
 
-            # Track last detection time for each plate
-            last_detection_time = {}
-            min_detection_interval = 5  # Minimum seconds between same plate detections
+            motion = self.motion_detector(roi)
+            # Kayıt dosyasına ve OCR önbelleğine kimlik bilgisi içeren URL değil, maskelenmiş kaynak girer
+            source_key = camera_id if isinstance(camera_id, int) else mask_source(camera_id)
 
+            seq = 0
             while True:
-                ret, frame = cap.read()
-                if not ret:
-                    logger.error("Kameradan frame alınamadı")
-                    break
-
-                # Detect vehicles
-                vehicles = self.detect_vehicles(frame)
-
-                current_time = time.time()
-                for vehicle in vehicles:
-                    # Find plate candidates in vehicle region
-                    plates = self.detect_plate_in_vehicle(frame, vehicle)
-
-                    if not plates:
+                scheduler.wait()
+                if connection:
+                    seq, frame = connection.wait_frame(seq, timeout=1.0)
+                    if frame is None:
                         continue
-
-                    for plate in plates:
-                        # Read plate text
-                        plate_text, confidence = self.read_plate(frame, plate)
-
-                        if plate_text and confidence > 0.6:
-                            # Check detection interval
-                            if plate_text in last_detection_time:
-                                time_since_last = current_time - last_detection_time[plate_text]
-                                if time_since_last < min_detection_interval:
-                                    continue
-
-                            logger.info(f"Plaka tespit edildi: {plate_text} (Güven: {confidence:.2f})")
-                            self.send_plate_to_server(plate_text, confidence)
-                            last_detection_time[plate_text] = current_time
-
-                            # Draw detection
-                            x, y, w, h = plate['box']
-                            cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
-                            cv2.putText(frame, plate_text, (x, y-10),
-                                        cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 0), 2)
-
-                time.sleep(0.1)  # CPU kullanımını azalt
+                else:
+                    ret, frame = cap.read()
+                    if not ret:
+                        logger.info("Video dosyasının sonuna gelindi")
+                        break
+
+                started = time.monotonic()
+                moving = motion.update(frame)
+                detections = self.process_frame(frame, camera_id=source_key, roi=roi)
+                self.handle_detections(frame, detections)
+                scheduler.record(time.monotonic() - started, activity=moving or bool(detections))
 
         except KeyboardInterrupt:
             logger.info("Kullanıcı tarafından durduruldu")
         except Exception as e:
-            logger.error(f"Kamera işleme hatası: {str(e)}")
+            logger.error("Kamera işleme hatası: %s", e)
             raise
         finally:
             if 'cap' in locals():
                 cap.release()
+            if locals().get('connection'):
+                connection.stop()
 
     def detect_plate_in_vehicle(self, frame, vehicle):
         """
@@ -267,49 +565,130 @@ class PlateDetector:
                     if 2.0 <= aspect_ratio <= 5.0:
                         plate_candidates.append({
                             'box': (x + x_plate, y + y_plate, w_plate, h_plate),
-                            'confidence': vehicle['score']
+                            'corners': approx.reshape(4, 2) + (x, y),
+                            'confidence': vehicle['score'],
+                            'vehicle_box': vehicle['box']
                         })
 
             return plate_candidates
 
         except Exception as e:
-            logger.error(f"Plaka bölgesi tespiti hatası: {str(e)}")
+            logger.error("Plaka bölgesi tespiti hatası: %s", e)
             return None
 
-    def read_plate(self, frame, plate):
+    def read_plates(self, frame, plates, camera_id=None, use_cache=True):
         """
-        Read text from the plate region using EasyOCR
+        Read text from several plate regions; crops are rectified to the
+        recognizer's input size (raw boxes for EasyOCR) and recognized as
+        one batch, skipping near-duplicates of recently read crops
         """
-        try:
-            x, y, w, h = plate['box']
-            plate_img = frame[y:y+h, x:x+w]
+        return self._read_plates(frame, plates, camera_id, use_cache)[0]
 
-            if plate_img is None or plate_img.size == 0:
-                return None, 0
-
-            # Use EasyOCR to read the text
-            results = self.reader.readtext(plate_img)
+    def _read_plates(self, frame, plates, camera_id=None, use_cache=True):
+        """
+        read_plates() that also returns the set of indices served from the OCR cache
+        """
+        try:
+            crops = [crop_plate(frame, plate, self.recognizer.input_size) for plate in plates]
+            valid = [i for i, crop in enumerate(crops) if crop is not None and crop.size]
+            results = [(None, 0)] * len(plates)
+            cached = set()
+            if not valid:
+                return results, cached
+
+            keys = {}
+            pending = valid
+            if self.ocr_cache:
+                pending = []
+                for i in valid:
+                    keys[i] = self.ocr_cache.key(crops[i], plates[i]['box'])
+                    hit = self.ocr_cache.get(camera_id, keys[i]) if use_cache else None
+                    if hit is None:
+                        pending.append(i)
+                    else:
+                        results[i] = hit
+                        cached.add(i)
+
+            for i, result in zip(pending, self.recognizer.recognize_batch([crops[i] for i in pending])):
+                results[i] = result
+
+            # Düşük güvenli okumaları genel amaçlı OCR ile tekrar dene
+            if self.fallback_recognizer:
+                for i in pending:
+                    if results[i][1] < self.fallback_threshold:
+                        x, y, w, h = plates[i]['box']
+                        text, confidence = self.fallback_recognizer.recognize(frame[y:y+h, x:x+w])
+                        if confidence > results[i][1]:
+                            results[i] = (text, confidence)
+
+            # Okunamayan kırpıntı saklanmaz; benzer frame'ler TTL boyunca okunmadan kalmasın
+            if self.ocr_cache:
+                for i in pending:
+                    if results[i][0]:
+                        self.ocr_cache.put(camera_id, keys[i], *results[i])
+
+            return results, cached
 
-            if not results:
-                return None, 0
+        except Exception as e:
+            logger.error("Plaka okuma hatası: %s", e)
+            return [(None, 0)] * len(plates), set()
 
-            # Get the text with highest confidence
-            text = ""
-            confidence = 0
-            for (_, plate_text, conf) in results:
-                # Remove spaces and convert to uppercase
-                cleaned_text = "".join(plate_text.split()).upper()
-                if conf > confidence:
-                    text = cleaned_text
-                    confidence = conf
+    def read_plate(self, frame, plate):
+        """
+        Read text from a single plate region
+        """
+        return self.read_plates(frame, [plate])[0]
 
-            return text, confidence
+    def enable_recording(self, path, mode='frames', sample_every=10):
+        """
+        Record every sample_every-th processed frame for offline replay
+        """
+        self.recorder = FrameRecorder(path, mode=mode, sample_every=sample_every)
+        logger.info("Frame kaydı etkin: %s (%s, her %d frame)", path, mode, sample_every)
 
-        except Exception as e:
-            logger.error(f"Plaka okuma hatası: {str(e)}")
-            return None, 0
+    def enable_evidence(self, root, quality=85, max_mb=None, max_age_days=None):
+        """
+        Save plate and vehicle crops of reported detections under root
+        """
+        self.evidence = EvidenceWriter(root, quality=quality,
+                                       max_bytes=int(max_mb * 1024 * 1024) if max_mb else None,
+                                       max_age_days=max_age_days)
+        logger.info("Kanıt görüntüleri kaydediliyor: %s", root)
 
-    def send_plate_to_server(self, plate_number, confidence):
+    def enable_edge_authorization(self, sync_interval=30.0, snapshot_path='authorized_plates.json'):
+        """
+        Decide gate access from a local replica of authorized plates and
+        report events to the server in the background
+        """
+        self.auth_cache = AuthorizationCache(self.api_url, self.api_token,
+                                             sync_interval=sync_interval,
+                                             snapshot_path=snapshot_path).start()
+        self.reporter = EventReporter(self.api_url, self.api_token)
+        if not self.auth_cache.ready:
+            logger.warning("Yetkili plaka listesi henüz alınamadı, tüm geçişler reddedilecek")
+
+    def decide_locally(self, plate_number, confidence, camera_id=None, evidence=None):
+        """
+        Make the gate decision from the local replica and queue the event for the server
+        """
+        is_authorized, action_taken = self.auth_cache.decide(plate_number, confidence * 100)
+        if is_authorized:
+            logger.info("Plaka yetkili: %s (yerel karar)", plate_number, extra={'plate_number': plate_number})
+        else:
+            logger.info("Plaka yetkisiz: %s (yerel karar)", plate_number, extra={'plate_number': plate_number})
+
+        self.reporter.submit({
+            "plate_number": plate_number,
+            "confidence": confidence * 100,
+            "processed_by": "tpu_detector",
+            "is_authorized": is_authorized,
+            "camera_id": camera_id,
+            "evidence": evidence,
+            "timestamp": datetime.utcnow().isoformat()
+        })
+        return {'is_authorized': is_authorized, 'action_taken': action_taken}
+
+    def send_plate_to_server(self, plate_number, confidence, camera_id=None, evidence=None):
         """
         Send detected plate to the API server
         """
@@ -317,11 +696,14 @@ class PlateDetector:
             data = {
                 "plate_number": plate_number,
                 "confidence": confidence * 100,  # Convert to percentage
-                "processed_by": "tpu_detector"
+                "processed_by": "tpu_detector",
+                "camera_id": camera_id,
+                "evidence": evidence
             }
 
             # Log API request
-            logger.info(f"Plaka sunucuya gönderiliyor: {plate_number} (Güven: {confidence:.2f})")
+            logger.info("Plaka sunucuya gönderiliyor: %s (Güven: %.2f)", plate_number, confidence,
+                        extra={'plate_number': plate_number})
 
             response = requests.post(
                 f"{self.api_url}/api/plates",
@@ -333,12 +715,12 @@ class PlateDetector:
             result = response.json()
 
             # Log server response
-            logger.info(f"Sunucu yanıtı: {result}")
+            logger.debug("Sunucu yanıtı: %s", result)
 
             if result.get('is_authorized'):
-                logger.info(f"Plaka yetkili: {plate_number}")
+                logger.info("Plaka yetkili: %s", plate_number, extra={'plate_number': plate_number})
             else:
-                logger.info(f"Plaka yetkisiz: {plate_number}")
+                logger.info("Plaka yetkisiz: %s", plate_number, extra={'plate_number': plate_number})
 
             return result
 
@@ -346,10 +728,10 @@ class PlateDetector:
             logger.error("Sunucu yanıt vermedi (timeout)")
             return None
         except requests.exceptions.RequestException as e:
-            logger.error(f"Sunucuya gönderme hatası: {str(e)}")
+            logger.error("Sunucuya gönderme hatası: %s", e)
             return None
         except Exception as e:
-            logger.error(f"Beklenmeyen hata: {str(e)}")
+            logger.error("Beklenmeyen hata: %s", e)
             return None
 
 def main():
@@ -364,20 +746,56 @@ def main():
             sys.exit(1)
 
         # Initialize detector
-        logger.info(f"API URL: {API_URL}")
+        logger.info("API URL: %s", API_URL)
         detector = PlateDetector(API_URL, API_TOKEN)
+        if os.environ.get("EDGE_AUTH_CACHE", "true").lower() == "true":
+            detector.enable_edge_authorization(
+                sync_interval=float(os.environ.get("EDGE_AUTH_SYNC_INTERVAL", 30)),
+                snapshot_path=os.environ.get("EDGE_AUTH_SNAPSHOT", "authorized_plates.json")
+            )
+
+        if os.environ.get("RECORD_DIR"):
+            detector.enable_recording(
+                os.environ["RECORD_DIR"],
+                mode=os.environ.get("RECORD_MODE", "frames"),
+                sample_every=int(os.environ.get("RECORD_SAMPLE_EVERY", 10))
+            )
+
+        if os.environ.get("EVIDENCE_DIR"):
+            detector.enable_evidence(
+                os.environ["EVIDENCE_DIR"],
+                quality=int(os.environ.get("EVIDENCE_JPEG_QUALITY", 85)),
+                max_mb=float(os.environ.get("EVIDENCE_MAX_MB", 0)) or None,
+                max_age_days=float(os.environ.get("EVIDENCE_MAX_AGE_DAYS", 0)) or None
+            )
 
         # Process video source
-        if len(sys.argv) > 1:
+        if os.environ.get("NODE_COORDINATION", "false").lower() == "true":
+            from node_agent import NodeAgent
+            agent = NodeAgent(API_URL, API_TOKEN, node_id=os.environ.get("NODE_ID"),
+                              interval=float(os.environ.get("NODE_HEARTBEAT_INTERVAL", 5)))
+            logger.info("Düğüm koordinasyonu açık, düğüm: %s", agent.node_id)
+            detector.process_assigned_cameras(agent)
+        elif len(sys.argv) > 2:
+            logger.info("Video kaynakları: %s", [mask_source(source) for source in sys.argv[1:]])
+            detector.process_camera_feeds(sys.argv[1:])
+        elif len(sys.argv) > 1:
             source = sys.argv[1]
-            logger.info(f"Video kaynağı: {source}")
+            logger.info("Video kaynağı: %s", mask_source(source))
             detector.process_camera_feed(source)
         else:
             # Use default camera
             detector.process_camera_feed(0)
 
+        if detector.reporter:
+            detector.reporter.stop()
+        if detector.recorder:
+            detector.recorder.close()
+        if detector.evidence:
+            detector.evidence.close()
+
     except Exception as e:
-        logger.error(f"Program hatası: {str(e)}")
+        logger.error("Program hatası: %s", e)
         sys.exit(1)
 
 if __name__ == "__main__":
@@ -0,0 +1,204 @@
+import io
+import csv
+import sys
+import logging
+from itertools import islice
+from sqlalchemy import text
+from database import db
+from http_cache import mark_tables_changed
+from models import AuthorizedPlate, AuthorizationHistory, AuthorizedPlateChange
+
+logger = logging.getLogger(__name__)
+
+CSV_COLUMNS = ['plate_number', 'description', 'is_active', 'sensitivity']
+DEFAULT_SENSITIVITY = 85.0
+TRUE_VALUES = {'1', 'true', 'yes', 'evet', 'aktif', 'active'}
+FALSE_VALUES = {'0', 'false', 'no', 'hayir', 'hayır', 'pasif', 'inactive'}
+
+
+def normalize_plate(plate_number):
+    # "34 ab 123" -> "34AB123"
+    return "".join((plate_number or "").split()).upper()
+
+
+def _parse_bool(value):
+    value = (value or '').strip().lower()
+    if not value:
+        return True
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise ValueError(f"geçersiz is_active değeri: {value}")
+
+
+def parse_plate_csv(stream, errors):
+    """
+    Yield normalized plate rows from a CSV text stream
+
+    The header must contain plate_number; description, is_active and
+    sensitivity are optional and empty cells take the defaults. Invalid
+    rows are skipped and reported in errors as {'line', 'error'}.
+    """
+    reader = csv.DictReader(stream)
+    if not reader.fieldnames or 'plate_number' not in reader.fieldnames:
+        raise ValueError("CSV başlığında plate_number sütunu olmalı")
+
+    for row in reader:
+        try:
+            plate_number = normalize_plate(row.get('plate_number'))
+            if not plate_number or len(plate_number) > 20:
+                raise ValueError("plaka numarası boş veya 20 karakterden uzun")
+            sensitivity = (row.get('sensitivity') or '').strip()
+            sensitivity = float(sensitivity) if sensitivity else DEFAULT_SENSITIVITY
+            if not 0 <= sensitivity <= 100:
+                raise ValueError("hassasiyet 0-100 arasında olmalı")
+            yield {
+                'plate_number': plate_number,
+                'description': (row.get('description') or '').strip()[:200],
+                'is_active': _parse_bool(row.get('is_active')),
+                'sensitivity': sensitivity
+            }
+        except ValueError as e:
+            errors.append({'line': reader.line_num, 'error': str(e)})
+
+
+def _upsert_postgresql(rows):
+    """
+    COPY the chunk into a staging table and upsert it with ON CONFLICT;
+    returns the set of plate numbers that were newly inserted
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([row['plate_number'], row['description'], row['is_active'], row['sensitivity']])
+    buffer.seek(0)
+
+    connection = db.session.connection()
+    connection.execute(text(
+        "CREATE TEMP TABLE IF NOT EXISTS authorized_plate_staging "
+        "(plate_number VARCHAR(20), description VARCHAR(200), is_active BOOLEAN, sensitivity FLOAT) "
+        "ON COMMIT DELETE ROWS"
+    ))
+    cursor = connection.connection.cursor()
+    cursor.copy_expert(
+        "COPY authorized_plate_staging (plate_number, description, is_active, sensitivity) FROM STDIN WITH CSV",
+        buffer
+    )
+    result = connection.execute(text(
+        "INSERT INTO authorized_plate (plate_number, description, is_active, sensitivity, created_at) "
+        "SELECT plate_number, description, is_active, sensitivity, now() AT TIME ZONE 'utc' "
+        "FROM authorized_plate_staging "
+        "ON CONFLICT (plate_number) DO UPDATE SET "
+        "description = EXCLUDED.description, is_active = EXCLUDED.is_active, sensitivity = EXCLUDED.sensitivity "
+        "RETURNING plate_number, (xmax = 0) AS inserted"
+    ))
+    inserted = {plate_number for plate_number, was_inserted in result if was_inserted}
+    # Ham SQL ORM olaylarından geçmez; ETag'ler için sürüm commit sırasında artırılsın diye elle işaretlenir
+    mark_tables_changed(db.session, ['authorized_plate'])
+    return inserted
+
+
+def _upsert_generic(rows):
+    """
+    Portable upsert: one lookup, one bulk insert and one bulk update per chunk
+    """
+    existing = dict(db.session.query(AuthorizedPlate.plate_number, AuthorizedPlate.id).filter(
+        AuthorizedPlate.plate_number.in_([row['plate_number'] for row in rows])
+    ))
+    new_rows = [row for row in rows if row['plate_number'] not in existing]
+    if new_rows:
+        db.session.execute(db.insert(AuthorizedPlate), new_rows)
+    updates = [{'id': existing[row['plate_number']], **row} for row in rows if row['plate_number'] in existing]
+    if updates:
+        db.session.execute(db.update(AuthorizedPlate), updates)
+    return {row['plate_number'] for row in new_rows}
+
+
+def import_authorized_plates(rows, changed_by, chunk_size=1000):
+    """
+    Upsert plate rows in chunks, writing history and sync changes in bulk
+
+    A CSV row is the full state of a plate: existing plates get the row's
+    description, is_active and sensitivity. Each chunk is committed on its
+    own. Returns {'inserted', 'updated'} counts.
+    """
+    upsert = _upsert_postgresql if db.engine.dialect.name == 'postgresql' else _upsert_generic
+    stats = {'inserted': 0, 'updated': 0}
+    rows = iter(rows)
+
+    while True:
+        # Aynı parça içinde tekrar eden plakalarda son satır geçerlidir
+        chunk = {row['plate_number']: row for row in islice(rows, chunk_size)}
+        if not chunk:
+            break
+        chunk = list(chunk.values())
+
+        inserted = upsert(chunk)
+        db.session.execute(db.insert(AuthorizationHistory), [{
+            'plate_number': row['plate_number'],
+            'action': 'import',
+            'description': "Toplu içe aktarma: " + ("eklendi" if row['plate_number'] in inserted else "güncellendi"),
+            'changed_by': changed_by
+        } for row in chunk])
+        db.session.execute(db.insert(AuthorizedPlateChange), [{
+            'plate_number': row['plate_number'],
+            'is_active': row['is_active'],
+            'sensitivity': row['sensitivity'],
+            'deleted': False
+        } for row in chunk])
+        db.session.commit()
+
+        stats['inserted'] += len(inserted)
+        stats['updated'] += len(chunk) - len(inserted)
+
+    logger.info(f"Imported authorized plates: {stats}")
+    return stats
+
+
+def export_authorized_plates(chunk_size=1000):
+    """
+    Yield the authorized plates as CSV text, chunk by chunk in id order
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+
+    last_id = 0
+    while True:
+        plates = db.session.query(
+            AuthorizedPlate.id, AuthorizedPlate.plate_number, AuthorizedPlate.description,
+            AuthorizedPlate.is_active, AuthorizedPlate.sensitivity
+        ).filter(AuthorizedPlate.id > last_id).order_by(AuthorizedPlate.id).limit(chunk_size).all()
+        for plate_id, plate_number, description, is_active, sensitivity in plates:
+            writer.writerow([plate_number, description or '', 'true' if is_active else 'false', sensitivity])
+        if buffer.tell():
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if len(plates) < chunk_size:
+            break
+        last_id = plates[-1][0]
+
+
+if __name__ == "__main__":
+    # python plate_import.py import plates.csv
+    # python plate_import.py export plates.csv
+    if len(sys.argv) != 3 or sys.argv[1] not in ('import', 'export'):
+        print("Kullanım: python plate_import.py import|export <dosya.csv>")
+        sys.exit(1)
+
+    from app import app
+
+    with app.app_context():
+        if sys.argv[1] == 'import':
+            errors = []
+            with open(sys.argv[2], newline='', encoding='utf-8-sig') as f:
+                stats = import_authorized_plates(parse_plate_csv(f, errors), changed_by='cli')
+            print(f"Eklenen: {stats['inserted']}, güncellenen: {stats['updated']}, hatalı satır: {len(errors)}")
+            for error in errors[:20]:
+                print(f"  Satır {error['line']}: {error['error']}")
+        else:
+            with open(sys.argv[2], 'w', newline='', encoding='utf-8') as f:
+                for chunk in export_authorized_plates():
+                    f.write(chunk)
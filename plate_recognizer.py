@@ -0,0 +1,224 @@
+import os
+import sys
+import logging
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# LPRNet tarzı giriş boyutu (genişlik, yükseklik)
+PLATE_SIZE = (94, 24)
+DEFAULT_ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+try:
+    import onnxruntime
+    ONNXRUNTIME_AVAILABLE = True
+except ImportError:
+    ONNXRUNTIME_AVAILABLE = False
+
+
+def order_corners(points):
+    """
+    Order four (x, y) points as top-left, top-right, bottom-right, bottom-left
+    """
+    points = np.asarray(points, dtype=np.float32).reshape(4, 2)
+    sums = points.sum(axis=1)
+    diffs = np.diff(points, axis=1).ravel()
+    return np.array([
+        points[np.argmin(sums)],
+        points[np.argmin(diffs)],
+        points[np.argmax(sums)],
+        points[np.argmax(diffs)],
+    ], dtype=np.float32)
+
+
+def rectify_plate(frame, corners, size=PLATE_SIZE):
+    """
+    Perspective-warp the plate quadrilateral into a fixed-size canvas
+    """
+    width, height = size
+    target = np.array([[0, 0], [width - 1, 0], [width - 1, height - 1], [0, height - 1]], dtype=np.float32)
+    matrix = cv2.getPerspectiveTransform(order_corners(corners), target)
+    return cv2.warpPerspective(frame, matrix, size, flags=cv2.INTER_LINEAR)
+
+
+def crop_plate(frame, plate, size=PLATE_SIZE):
+    """
+    Return the normalized plate crop, rectified when corners are known
+
+    With size=None the raw box region is returned unchanged, for
+    recognizers that take crops of any size.
+    """
+    if size is not None and plate.get('corners') is not None:
+        return rectify_plate(frame, plate['corners'], size)
+    x, y, w, h = plate['box']
+    region = frame[y:y+h, x:x+w]
+    if region.size == 0:
+        return None
+    if size is None:
+        return region
+    return cv2.resize(region, size, interpolation=cv2.INTER_AREA)
+
+
+def ctc_greedy_decode(probs, alphabet, blank=0):
+    """
+    Collapse a (T, C) probability matrix into (text, confidence)
+
+    Confidence is the mean probability of the emitted characters.
+    """
+    best = probs.argmax(axis=1)
+    best_probs = probs[np.arange(len(best)), best]
+    chars, char_probs = [], []
+    previous = blank
+    for index, prob in zip(best, best_probs):
+        if index != blank and index != previous:
+            chars.append(alphabet[index - 1 if blank == 0 else index])
+            char_probs.append(prob)
+        previous = index
+    if not chars:
+        return None, 0
+    return ''.join(chars), float(np.mean(char_probs))
+
+
+def _softmax(logits, axis=-1):
+    shifted = logits - logits.max(axis=axis, keepdims=True)
+    exp = np.exp(shifted)
+    return exp / exp.sum(axis=axis, keepdims=True)
+
+
+class CRNNRecognizer:
+    """
+    Compact CRNN/CTC plate recognizer running an ONNX model on CPU
+
+    Uses ONNX Runtime when installed, otherwise OpenCV DNN. Inputs are
+    fixed-size normalized crops, so any number of plates runs as one batch.
+    The model output may be (N, T, C) or (N, C, T); C must be
+    len(alphabet) + 1 with the CTC blank at index 0.
+    """
+    def __init__(self, model_path, alphabet=DEFAULT_ALPHABET, input_size=PLATE_SIZE, backend=None):
+        self.model_path = model_path
+        self.alphabet = alphabet
+        self.input_size = input_size
+        self.num_classes = len(alphabet) + 1
+        self.backend = backend or ('onnxruntime' if ONNXRUNTIME_AVAILABLE else 'opencv')
+
+        if self.backend == 'onnxruntime':
+            self.session = onnxruntime.InferenceSession(model_path, providers=['CPUExecutionProvider'])
+            self.input_name = self.session.get_inputs()[0].name
+        else:
+            self.net = cv2.dnn.readNetFromONNX(model_path)
+            self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+            self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+
+        logger.info("Plaka tanıma modeli yüklendi: %s (%s)", model_path, self.backend)
+
+    def _prepare(self, crops):
+        batch = np.stack([
+            crop if crop.shape[1::-1] == self.input_size
+            else cv2.resize(crop, self.input_size, interpolation=cv2.INTER_AREA)
+            for crop in crops
+        ]).astype(np.float32)
+        batch = (batch - 127.5) * 0.0078125
+        return np.ascontiguousarray(batch.transpose(0, 3, 1, 2))
+
+    def _infer(self, batch):
+        if self.backend == 'onnxruntime':
+            return self.session.run(None, {self.input_name: batch})[0]
+        self.net.setInput(batch)
+        return self.net.forward()
+
+    def recognize_batch(self, crops):
+        """
+        Recognize a list of BGR crops; returns [(text, confidence), ...]
+        """
+        if not crops:
+            return []
+        output = self._infer(self._prepare(crops))
+        if output.ndim == 4:
+            output = output.reshape(output.shape[0], output.shape[1], -1)
+        if output.shape[1] == self.num_classes and output.shape[2] != self.num_classes:
+            output = output.transpose(0, 2, 1)
+
+        # Model ham logit döndürüyorsa olasılığa çevir
+        if not np.allclose(output.sum(axis=2), 1.0, atol=1e-2):
+            output = _softmax(output, axis=2)
+
+        return [ctc_greedy_decode(probs, self.alphabet) for probs in output]
+
+
+class EasyOCRRecognizer:
+    """
+    General-purpose EasyOCR reader behind the recognizer interface
+
+    EasyOCR detects text in crops of any size, so it gets the raw plate
+    box (input_size None) rather than the fixed-size rectified crop.
+    """
+    input_size = None
+
+    def __init__(self, languages=('tr',)):
+        import easyocr
+        logger.info("EasyOCR başlatılıyor...")
+        self.reader = easyocr.Reader(list(languages))
+
+    def recognize(self, image):
+        results = self.reader.readtext(image)
+        if not results:
+            return None, 0
+
+        # Get the text with highest confidence
+        text = ""
+        confidence = 0
+        for (_, plate_text, conf) in results:
+            # Remove spaces and convert to uppercase
+            cleaned_text = "".join(plate_text.split()).upper()
+            if conf > confidence:
+                text = cleaned_text
+                confidence = conf
+
+        return text, confidence
+
+    def recognize_batch(self, crops):
+        return [self.recognize(crop) for crop in crops]
+
+
+def quantize_model(model_path, output_path):
+    """
+    Write an INT8 dynamically quantized copy of an ONNX model
+    """
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    quantize_dynamic(model_path, output_path, weight_type=QuantType.QInt8)
+    logger.info("INT8 model yazıldı: %s", output_path)
+
+
+def build_recognizers():
+    """
+    Return (primary, fallback) recognizers from PLATE_OCR_* settings
+
+    PLATE_OCR_BACKEND=crnn uses PLATE_OCR_MODEL with EasyOCR as fallback
+    (unless PLATE_OCR_FALLBACK=false); a missing model falls back to EasyOCR.
+    """
+    backend = os.environ.get('PLATE_OCR_BACKEND', 'easyocr').lower()
+    model_path = os.environ.get('PLATE_OCR_MODEL', os.path.join('model', 'plate_crnn.onnx'))
+    use_fallback = os.environ.get('PLATE_OCR_FALLBACK', 'true').lower() == 'true'
+
+    if backend == 'crnn':
+        if os.path.exists(model_path):
+            primary = CRNNRecognizer(
+                model_path,
+                alphabet=os.environ.get('PLATE_OCR_ALPHABET', DEFAULT_ALPHABET),
+                backend=os.environ.get('PLATE_OCR_RUNTIME') or None
+            )
+            return primary, EasyOCRRecognizer() if use_fallback else None
+        logger.warning("Plaka tanıma modeli bulunamadı (%s), EasyOCR kullanılacak", model_path)
+
+    return EasyOCRRecognizer(), None
+
+
+if __name__ == "__main__":
+    # python plate_recognizer.py quantize model/plate_crnn.onnx model/plate_crnn_int8.onnx
+    if len(sys.argv) == 4 and sys.argv[1] == 'quantize':
+        logging.basicConfig(level=logging.INFO)
+        quantize_model(sys.argv[2], sys.argv[3])
+    else:
+        print("Kullanım: python plate_recognizer.py quantize <model.onnx> <model_int8.onnx>")
+        sys.exit(1)
@@ -0,0 +1,171 @@
+import os
+import logging
+import threading
+from collections import defaultdict
+from sqlalchemy import text, func, case, tuple_
+from database import db
+from models import PlateRecord
+
+logger = logging.getLogger(__name__)
+
+# Trigram indeksi 3 karakterden kısa sorgulara yardım etmez; bunlar plaka başı (önek) araması olur
+MIN_SUBSTRING_LENGTH = 3
+# Sıralamaya giren en fazla aday (PostgreSQL'de en yeni kayıtlar, yedek yolda en benzer plakalar)
+SEARCH_MAX_CANDIDATES = int(os.environ.get("SEARCH_MAX_CANDIDATES", 5000))
+
+
+def normalize_query(query):
+    # Plakalar boşluksuz ve büyük harfle saklanır ("34 AB" -> "34AB")
+    return "".join((query or "").split()).upper()
+
+
+def trigrams(value):
+    """
+    Trigram set of a string, padded the way pg_trgm pads words
+    """
+    padded = f"  {value.lower()} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def similarity(a, b):
+    """
+    pg_trgm style similarity: shared trigrams over all trigrams
+    """
+    first, second = trigrams(a), trigrams(b)
+    union = first | second
+    return len(first & second) / len(union) if union else 0.0
+
+
+class NGramIndex:
+    """
+    In-memory n-gram inverted index over distinct plate numbers
+
+    Used when the database has no pg_trgm (SQLite setups). The index is
+    built on first use and then extended with plates of records newer than
+    the last indexed id, so inserts from other processes are picked up too.
+    """
+    def __init__(self, n=3):
+        self.n = n
+        self.postings = defaultdict(set)
+        self.plates = set()
+        self.last_id = 0
+        self._lock = threading.Lock()
+
+    def _grams(self, value):
+        return {value[i:i + self.n] for i in range(len(value) - self.n + 1)}
+
+    def add(self, plate_number):
+        if plate_number in self.plates:
+            return
+        self.plates.add(plate_number)
+        for gram in self._grams(plate_number):
+            self.postings[gram].add(plate_number)
+
+    def refresh(self):
+        last_id = db.session.query(func.max(PlateRecord.id)).scalar() or 0
+        if last_id <= self.last_id:
+            return
+        rows = db.session.query(PlateRecord.plate_number).filter(
+            PlateRecord.id > self.last_id,
+            PlateRecord.id <= last_id
+        ).distinct()
+        for (plate_number,) in rows:
+            self.add(plate_number)
+        self.last_id = last_id
+
+    def match(self, query, limit=None):
+        """
+        Plate numbers containing query (starting with it if shorter than n),
+        as {plate_number: score} of at most limit best-scoring plates
+        """
+        with self._lock:
+            self.refresh()
+            grams = self._grams(query)
+            if grams:
+                candidates = set.intersection(*(self.postings.get(gram, set()) for gram in grams))
+                candidates = [plate for plate in candidates if query in plate]
+            else:
+                # Sorgu n'den kısa: farklı plaka sayısı küçük olduğu için hepsi taranır
+                candidates = [plate for plate in self.plates if plate.startswith(query)]
+        scores = {plate: round(similarity(query, plate), 6) for plate in candidates}
+        if limit and len(scores) > limit:
+            scores = dict(sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit])
+        return scores
+
+
+_ngram_index = NGramIndex()
+
+
+def uses_pg_trgm():
+    return db.engine.dialect.name == 'postgresql'
+
+
+def ensure_search_index():
+    """
+    Create the pg_trgm GIN index and the prefix (text_pattern_ops) btree
+    index on PlateRecord.plate_number (PostgreSQL only)
+
+    Only called from init-db (bootstrap_database), never while serving.
+    """
+    if not uses_pg_trgm():
+        return
+    try:
+        with db.engine.begin() as conn:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_plate_record_plate_number_trgm "
+                "ON plate_record USING gin (plate_number gin_trgm_ops)"
+            ))
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_plate_record_plate_number_prefix "
+                "ON plate_record (plate_number text_pattern_ops)"
+            ))
+    except Exception as e:
+        logger.error(f"Could not create search indexes: {str(e)}")
+
+
+def search_plate_records(query, limit=50, cursor=None):
+    """
+    Records whose plate contains query, best matches first
+
+    Queries shorter than MIN_SUBSTRING_LENGTH match plates starting with
+    the query. At most SEARCH_MAX_CANDIDATES candidates are ranked: the
+    newest matching records on PostgreSQL, the most similar plates in the
+    fallback index.
+
+    Results are ordered by (score, id) descending; cursor is the (score, id)
+    of the last row of the previous page. Returns (rows, next_cursor) where
+    rows are (PlateRecord, score) pairs.
+    """
+    query = normalize_query(query)
+    if not query:
+        return [], None
+
+    if uses_pg_trgm():
+        score = func.round(func.similarity(PlateRecord.plate_number, query).cast(db.Numeric), 6)
+        if len(query) < MIN_SUBSTRING_LENGTH:
+            # Sabit 'q%' deseni text_pattern_ops btree indeksini kullanır
+            pattern = query.replace('/', '//').replace('%', '/%').replace('_', '/_') + '%'
+            matching = PlateRecord.plate_number.like(pattern, escape='/')
+        else:
+            matching = PlateRecord.plate_number.contains(query, autoescape=True)
+        candidates = db.session.query(PlateRecord.id).filter(matching) \
+            .order_by(PlateRecord.id.desc()).limit(SEARCH_MAX_CANDIDATES)
+        condition = PlateRecord.id.in_(candidates.scalar_subquery())
+    else:
+        matches = _ngram_index.match(query, limit=SEARCH_MAX_CANDIDATES)
+        if not matches:
+            return [], None
+        score = case(matches, value=PlateRecord.plate_number, else_=0.0)
+        condition = PlateRecord.plate_number.in_(matches)
+
+    statement = db.session.query(PlateRecord, score).filter(condition)
+    if cursor:
+        statement = statement.filter(tuple_(score, PlateRecord.id) < tuple_(cursor[0], cursor[1]))
+    rows = statement.order_by(score.desc(), PlateRecord.id.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = (float(rows[-1][1]), rows[-1][0].id)
+    return [(record, float(value)) for record, value in rows], next_cursor
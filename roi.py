@@ -0,0 +1,111 @@
+import os
+import json
+import logging
+import cv2
+import numpy as np
+from video_capture import mask_source
+
+logger = logging.getLogger(__name__)
+
+
+class RegionOfInterest:
+    """
+    Per-camera detection region in normalized (0-1) frame coordinates
+
+    Stored in CameraSettings.settings['roi'] either as a rectangle
+    [x, y, w, h] or as a polygon [[x1, y1], [x2, y2], ...]. Detection runs on
+    the bounding rectangle of the region; for polygons the pixels outside
+    the polygon are blacked out first.
+    """
+    def __init__(self, spec):
+        self.points = self.parse(spec)
+        xs, ys = self.points[:, 0], self.points[:, 1]
+        self.bounds = (float(xs.min()), float(ys.min()), float(xs.max()), float(ys.max()))
+        self.is_rectangle = len(self.points) == 4 and len(set(np.round(xs, 6))) == 2 and len(set(np.round(ys, 6))) == 2
+        self._cache = {}
+
+    @staticmethod
+    def parse(spec):
+        """
+        Validate an ROI spec and return its polygon as an (N, 2) array; raises ValueError
+        """
+        if isinstance(spec, str):
+            spec = json.loads(spec)
+        if not isinstance(spec, (list, tuple)) or not spec:
+            raise ValueError("ROI bir dikdörtgen [x, y, w, h] veya nokta listesi olmalı")
+
+        if all(isinstance(v, (int, float)) for v in spec):
+            if len(spec) != 4:
+                raise ValueError("Dikdörtgen ROI 4 değer içermeli: [x, y, w, h]")
+            x, y, w, h = spec
+            points = [[x, y], [x + w, y], [x + w, y + h], [x, y + h]]
+        else:
+            points = spec
+
+        points = np.asarray(points, dtype=np.float32)
+        if points.ndim != 2 or points.shape[1] != 2 or len(points) < 3:
+            raise ValueError("Çokgen ROI en az 3 [x, y] noktası içermeli")
+        if points.min() < 0 or points.max() > 1:
+            raise ValueError("ROI koordinatları 0 ile 1 arasında olmalı")
+        return points
+
+    @classmethod
+    def from_settings(cls, settings):
+        spec = (settings or {}).get('roi')
+        return cls(spec) if spec else None
+
+    def _geometry(self, width, height):
+        key = (width, height)
+        if key not in self._cache:
+            x0, y0, x1, y1 = self.bounds
+            left, top = int(x0 * width), int(y0 * height)
+            right, bottom = max(left + 1, int(round(x1 * width))), max(top + 1, int(round(y1 * height)))
+            mask = None
+            if not self.is_rectangle:
+                pixels = (self.points * [width, height] - [left, top]).astype(np.int32)
+                mask = np.zeros((bottom - top, right - left), dtype=np.uint8)
+                cv2.fillPoly(mask, [pixels], 255)
+            self._cache[key] = (left, top, right, bottom, mask)
+        return self._cache[key]
+
+    def crop(self, frame):
+        """
+        Return (region, (offset_x, offset_y)); add the offset to map region
+        coordinates back to the full frame
+        """
+        height, width = frame.shape[:2]
+        left, top, right, bottom, mask = self._geometry(width, height)
+        region = frame[top:bottom, left:right]
+        if mask is not None:
+            region = cv2.bitwise_and(region, region, mask=mask)
+        return region, (left, top)
+
+    def motion_mask(self, size):
+        """
+        Boolean mask of the region at the given (width, height)
+        """
+        width, height = size
+        mask = np.zeros((height, width), dtype=np.uint8)
+        cv2.fillPoly(mask, [(self.points * [width, height]).astype(np.int32)], 1)
+        return mask.astype(bool)
+
+
+def roi_for_source(source, spec=None):
+    """
+    ROI of a detector source from DETECTOR_ROI
+
+    The value is either one ROI for every source or a JSON object mapping
+    sources (as given on the command line) to their ROI.
+    """
+    spec = spec if spec is not None else os.environ.get('DETECTOR_ROI')
+    if not spec:
+        return None
+    try:
+        if isinstance(spec, str):
+            spec = json.loads(spec)
+        if isinstance(spec, dict):
+            spec = spec.get(str(source))
+        return RegionOfInterest(spec) if spec else None
+    except ValueError as e:
+        logger.error("Geçersiz ROI (%s): %s", mask_source(source), e)
+        return None
@@ -0,0 +1,60 @@
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+# Her ölçüm temiz bir süreçte yapılır; gunicorn worker'ının açılışta yaptığı iş budur
+PROBE = """
+import json, resource, sys, time
+started = time.perf_counter()
+import app
+elapsed = time.perf_counter() - started
+print(json.dumps({
+    'seconds': elapsed,
+    'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'modules': len(sys.modules),
+    'heavy_modules': sorted(name for name in ('cv2', 'numpy', 'easyocr', 'torch') if name in sys.modules)
+}))
+"""
+
+
+def measure(runs):
+    """
+    Import app.py in runs fresh interpreters and return the per-run results
+    """
+    results = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', PROBE], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="app.py içe aktarma süresini ve belleğini ölç")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--max-seconds', type=float, help="Medyan süre bunu aşarsa hata kodu ile çık")
+    parser.add_argument('--max-rss-mb', type=float, help="Medyan bellek bunu aşarsa hata kodu ile çık")
+    args = parser.parse_args()
+
+    results = measure(args.runs)
+    seconds = statistics.median(result['seconds'] for result in results)
+    rss = statistics.median(result['max_rss_mb'] for result in results)
+    heavy = results[-1]['heavy_modules']
+    print(f"import app: {seconds * 1000:.0f}ms, {rss:.1f}MB RSS, {results[-1]['modules']} modül, "
+          f"ağır modüller: {', '.join(heavy) or 'yok'}")
+
+    failed = False
+    if args.max_seconds is not None and seconds > args.max_seconds:
+        print(f"Açılış süresi sınırı aşıldı: {seconds:.3f}s > {args.max_seconds}s")
+        failed = True
+    if args.max_rss_mb is not None and rss > args.max_rss_mb:
+        print(f"Bellek sınırı aşıldı: {rss:.1f}MB > {args.max_rss_mb}MB")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
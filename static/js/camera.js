@@ -39,7 +39,8 @@ class CameraManager {
         this.streamImg.style.width = '100%';
         this.streamImg.style.height = '100%';
         this.streamImg.style.objectFit = 'contain';
-        this.streamImg.src = `/video_feed/${cameraId}`;
+        // Yayınlar ayrı bir akış sunucusundan verilebilir (STREAM_BASE_URL)
+        this.streamImg.src = `${window.STREAM_BASE_URL || ''}/video_feed/${cameraId}`;
 
         // Add error handling for stream
         this.streamImg.onerror = (error) => {
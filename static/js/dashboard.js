@@ -53,58 +53,45 @@ class Dashboard {
 
     async fetchPlates() {
         try {
-            const response = await fetch('/api/plates');
-            const plates = await response.json();
-            this.updatePlatesList(plates);
-            this.updateChart(plates);
+            const [visitsResponse, statsResponse] = await Promise.all([
+                fetch('/api/visits?limit=5'),
+                fetch('/api/visits/stats')
+            ]);
+            this.updatePlatesList(await visitsResponse.json());
+            this.updateChart(await statsResponse.json());
         } catch (error) {
             console.error('Plaka verisi alınamadı:', error);
         }
     }
 
-    updatePlatesList(plates) {
+    updatePlatesList(visits) {
         if (!this.platesContainer) {
             console.error('Plates container not found');
             return;
         }
 
-        const latest = plates.slice(-5).reverse();
-        this.platesContainer.innerHTML = latest.map(plate => `
+        this.platesContainer.innerHTML = visits.map(visit => `
             <div class="plate-entry">
-                <div class="plate-number">${plate.plate_number}</div>
-                <div class="plate-confidence">Doğruluk: %${plate.confidence.toFixed(1)}</div>
-                <div class="plate-timestamp">${new Date(plate.timestamp).toLocaleString('tr-TR')}</div>
+                ${visit.evidence ? `
+                <a href="/evidence/${visit.evidence}/vehicle" target="_blank">
+                    <img class="plate-evidence" src="/evidence/${visit.evidence}/plate?thumb=1" loading="lazy" alt="">
+                </a>` : ''}
+                <div class="plate-number">${visit.plate_number}</div>
+                <div class="plate-confidence">Doğruluk: %${visit.best_confidence.toFixed(1)}</div>
+                <div class="plate-timestamp">${new Date(visit.first_seen).toLocaleString('tr-TR')}</div>
             </div>
         `).join('');
     }
 
-    updateChart(plates) {
+    updateChart(stats) {
         if (!this.chart) {
             console.error('Chart is not initialized');
             return;
         }
 
-        const hourlyData = new Map();
-        const now = new Date();
-        const dayStart = new Date(now.getFullYear(), now.getMonth(), now.getDate());
-
-        // Initialize all hours with 0
-        for (let i = 0; i < 24; i++) {
-            hourlyData.set(i, 0);
-        }
-
-        plates.forEach(plate => {
-            const plateTime = new Date(plate.timestamp);
-            if (plateTime >= dayStart) {
-                const hour = plateTime.getHours();
-                hourlyData.set(hour, (hourlyData.get(hour) || 0) + 1);
-            }
-        });
-
-        const sortedHours = Array.from(hourlyData.keys()).sort((a, b) => a - b);
-
-        this.chart.data.labels = sortedHours.map(hour => `${hour}:00`);
-        this.chart.data.datasets[0].data = sortedHours.map(hour => hourlyData.get(hour));
+        // stats.hourly: bugünün her saati için ziyaret sayısı
+        this.chart.data.labels = stats.hourly.map((_, hour) => `${hour}:00`);
+        this.chart.data.datasets[0].data = stats.hourly;
         this.chart.update();
     }
 
@@ -0,0 +1,228 @@
+"""
+ASGI server for MJPEG camera streams
+
+Runs the /video_feed/<camera_id> endpoint cooperatively so open streams
+do not pin WSGI workers that serve the API and detector ingest:
+
+    gunicorn -w 4 --threads 8 -b 0.0.0.0:5000 app:app      # API
+    uvicorn stream_server:app --host 0.0.0.0 --port 5001   # streams
+
+and set STREAM_BASE_URL=http://<host>:5001 for the API process. Captures
+keep running in CameraConnection threads; each camera has one pump thread
+that waits for new JPEG frames, and any number of viewers await them on
+the event loop. The session cookie of the main app authenticates viewers.
+"""
+import os
+import re
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from flask import session
+from app import app as flask_app, user_cache, ensure_camera_connection
+from models import CameraSettings
+
+logger = logging.getLogger(__name__)
+
+STREAM_MAX_CLIENTS = int(os.environ.get("STREAM_SERVER_MAX_CLIENTS", 200))
+STREAM_MAX_FPS = float(os.environ.get("STREAM_MAX_FPS", 15))
+STREAM_JPEG_QUALITY = int(os.environ.get("STREAM_JPEG_QUALITY", 80))
+
+FEED_PATH = re.compile(r'^/video_feed/(\d+)$')
+BOUNDARY = b'frame'
+
+
+class CameraBroadcast:
+    """
+    Fan out the newest JPEG frame of one camera to all of its viewers
+    """
+    def __init__(self, connection, executor):
+        self.connection = connection
+        self.executor = executor
+        self.seq = 0
+        self.jpeg = None
+        self.viewers = 0
+        self._changed = asyncio.Condition()
+        self._pump = None
+
+    def _ensure_pump(self):
+        if self._pump is None or self._pump.done():
+            self._pump = asyncio.get_running_loop().create_task(self._run())
+
+    def join(self):
+        self.viewers += 1
+        self._ensure_pump()
+
+    def leave(self):
+        self.viewers -= 1
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while self.viewers > 0 and not self.connection.stopped:
+            # Bloklayan bekleme kamera başına tek iş parçacığında yapılır
+            seq, jpeg = await loop.run_in_executor(
+                self.executor, self.connection.wait_jpeg, self.seq, 1.0, STREAM_JPEG_QUALITY
+            )
+            if jpeg is None:
+                continue
+            async with self._changed:
+                self.seq, self.jpeg = seq, jpeg
+                self._changed.notify_all()
+
+    async def wake(self):
+        """
+        Wake waiting viewers so they re-check whether they disconnected
+        """
+        async with self._changed:
+            self._changed.notify_all()
+
+    async def next_frame(self, last_seq, disconnected):
+        """
+        Wait for a frame newer than last_seq; returns (seq, jpeg), or
+        (last_seq, None) when the camera stops or the viewer disconnects
+        """
+        while not self.connection.stopped and not disconnected.is_set():
+            self._ensure_pump()
+            async with self._changed:
+                try:
+                    # Donan kamerada da ayrılan izleyici beklemeden çıkar
+                    await asyncio.wait_for(
+                        self._changed.wait_for(lambda: self.seq > last_seq or disconnected.is_set()),
+                        timeout=2.0
+                    )
+                except asyncio.TimeoutError:
+                    continue
+                if disconnected.is_set():
+                    break
+                return self.seq, self.jpeg
+        return last_seq, None
+
+
+class StreamServer:
+    """
+    Minimal ASGI application serving MJPEG camera streams
+    """
+    def __init__(self, max_clients=STREAM_MAX_CLIENTS, max_fps=STREAM_MAX_FPS):
+        self.max_clients = max_clients
+        self.min_interval = 1.0 / max_fps if max_fps else 0.0
+        self.clients = 0
+        self.broadcasts = {}
+        self.executor = ThreadPoolExecutor(max_workers=int(os.environ.get("STREAM_MAX_CAMERAS", 32)),
+                                           thread_name_prefix='stream-pump')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+
+        if scope['path'] == '/health':
+            await self._respond(send, 200, b'{"clients": %d}' % self.clients, b'application/json')
+            return
+
+        match = FEED_PATH.match(scope['path'])
+        if not match:
+            await self._respond(send, 404, b'Not Found')
+            return
+
+        if self.clients >= self.max_clients:
+            await self._respond(send, 503, b'Stream limit reached', headers=[(b'retry-after', b'5')])
+            return
+
+        # Yer kontrolle aynı adımda ayrılır; kimlik doğrulama beklenirken gelen istekler sınırı aşamaz
+        self.clients += 1
+        try:
+            cookie = b'; '.join(value for name, value in scope['headers'] if name == b'cookie').decode('latin-1')
+            connection, status = await asyncio.to_thread(self._open_camera, int(match.group(1)), cookie)
+            if connection is None:
+                await self._respond(send, status, b'')
+                return
+
+            await self._stream(connection, receive, send)
+        finally:
+            self.clients -= 1
+
+    def _open_camera(self, camera_id, cookie):
+        """
+        Authenticate the viewer from the Flask session cookie and return
+        (connection, status)
+        """
+        with flask_app.test_request_context(headers={'Cookie': cookie} if cookie else {}):
+            user_id = session.get('_user_id')
+            user = user_cache.get(int(user_id)) if user_id else None
+            if user is None or not user.is_active:
+                return None, 401
+            camera = CameraSettings.query.get(camera_id)
+            if camera is None or not camera.is_active:
+                return None, 404
+            return ensure_camera_connection(camera), 200
+
+    async def _stream(self, connection, receive, send):
+        broadcast = self.broadcasts.get(connection.camera_id)
+        if broadcast is None or broadcast.connection is not connection:
+            broadcast = self.broadcasts[connection.camera_id] = CameraBroadcast(connection, self.executor)
+
+        disconnected = asyncio.Event()
+
+        async def watch_disconnect():
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+            disconnected.set()
+            await broadcast.wake()
+
+        watcher = asyncio.get_running_loop().create_task(watch_disconnect())
+        broadcast.join()
+        try:
+            await send({
+                'type': 'http.response.start',
+                'status': 200,
+                'headers': [(b'content-type', b'multipart/x-mixed-replace; boundary=' + BOUNDARY),
+                            (b'cache-control', b'no-cache')]
+            })
+            seq = 0
+            loop = asyncio.get_running_loop()
+            while not disconnected.is_set():
+                started = loop.time()
+                seq, jpeg = await broadcast.next_frame(seq, disconnected)
+                if jpeg is None:
+                    break
+                await send({
+                    'type': 'http.response.body',
+                    'body': b'--' + BOUNDARY + b'\r\nContent-Type: image/jpeg\r\n\r\n' + jpeg + b'\r\n',
+                    'more_body': True
+                })
+                # Yavaş izleyiciler ve FPS sınırı için bir sonraki frame'i beklemeden önce ara ver
+                delay = self.min_interval - (loop.time() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+        except OSError:
+            # İstemci bağlantıyı kapattı
+            pass
+        finally:
+            broadcast.leave()
+            watcher.cancel()
+
+    async def _respond(self, send, status, body, content_type=b'text/plain', headers=()):
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(b'content-type', content_type), (b'content-length', str(len(body)).encode()), *headers]
+        })
+        await send({'type': 'http.response.body', 'body': body})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                camera_manager = flask_app.extensions.get('camera_manager')
+                if camera_manager:
+                    await asyncio.to_thread(camera_manager.stop_all)
+                self.executor.shutdown(wait=False, cancel_futures=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+app = StreamServer()
@@ -0,0 +1,132 @@
+import json
+
+import pytest
+import requests
+
+import batch_processing
+from batch_processing import JsonlOutput, load_checkpoint, save_checkpoint, run_batch, task_key
+
+TASKS = [('video.mp4', start, start + 100) for start in range(0, 500, 100)]
+FAIL_AT = {'start': None}
+
+
+def fake_process_segment(task, stride=5):
+    if task[1] == FAIL_AT['start']:
+        raise RuntimeError("segment çöktü")
+    return task, [{'plate_number': f"34AB{task[1]}", 'frame': task[1]}]
+
+
+@pytest.fixture
+def fake_pipeline(monkeypatch):
+    monkeypatch.setattr(batch_processing, 'find_videos', lambda inputs: ['video.mp4'])
+    monkeypatch.setattr(batch_processing, 'plan_segments', lambda path, seconds: list(TASKS))
+    monkeypatch.setattr(batch_processing, '_init_worker', lambda *args: None)
+    monkeypatch.setattr(batch_processing, 'process_segment', fake_process_segment)
+    FAIL_AT['start'] = None
+
+
+def read_lines(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def test_jsonl_resume_drops_segment_written_after_checkpoint(tmp_path):
+    output, checkpoint = str(tmp_path / 'out.jsonl'), str(tmp_path / 'ckpt')
+    out = JsonlOutput(output)
+    out.write(TASKS[0], [{'plate_number': 'A'}])
+    save_checkpoint(checkpoint, {task_key(TASKS[0])}, out.offset)
+    # Sonuçlar yazıldı ama checkpoint kaydedilmeden süreç öldü
+    out.write(TASKS[1], [{'plate_number': 'B'}])
+    out.close()
+
+    completed, offset = load_checkpoint(checkpoint)
+    out = JsonlOutput(output, resume=True, offset=offset)
+    out.write(TASKS[1], [{'plate_number': 'B'}])
+    out.close()
+
+    assert [line['plate_number'] for line in read_lines(output)] == ['A', 'B']
+
+
+def test_jsonl_resume_with_empty_segment_keeps_offset(tmp_path):
+    output, checkpoint = str(tmp_path / 'out.jsonl'), str(tmp_path / 'ckpt')
+    out = JsonlOutput(output)
+    out.write(TASKS[0], [{'plate_number': 'A'}])
+    save_checkpoint(checkpoint, {task_key(TASKS[0])}, out.offset)
+    out.write(TASKS[1], [{'plate_number': 'B' * 50}])
+    out.close()
+
+    # Devam edilen ilk segment sonuç üretmedi
+    completed, offset = load_checkpoint(checkpoint)
+    out = JsonlOutput(output, resume=True, offset=offset)
+    out.write(TASKS[1], [])
+    assert out.offset == offset
+    save_checkpoint(checkpoint, completed | {task_key(TASKS[1])}, out.offset)
+    out.close()
+
+    completed, offset = load_checkpoint(checkpoint)
+    out = JsonlOutput(output, resume=True, offset=offset)
+    out.write(TASKS[2], [{'plate_number': 'C'}])
+    out.close()
+
+    with open(output, 'rb') as f:
+        assert b'\0' not in f.read()
+    assert [line['plate_number'] for line in read_lines(output)] == ['A', 'C']
+
+
+def test_upload_happens_after_checkpoint(tmp_path, fake_pipeline, monkeypatch):
+    output, checkpoint = str(tmp_path / 'out.jsonl'), str(tmp_path / 'ckpt')
+    uploaded = []
+    fail = {'after': 2}
+
+    def fake_upload(api_url, api_token, results):
+        completed, _ = load_checkpoint(checkpoint)
+        assert all(task_key(task) in completed for task in TASKS if task[1] == results[0]['frame'])
+        if len(uploaded) == fail['after']:
+            raise requests.ConnectionError("bağlantı koptu")
+        uploaded.append(results[0]['frame'])
+
+    monkeypatch.setattr(batch_processing, 'upload_results', fake_upload)
+    with pytest.raises(requests.ConnectionError):
+        run_batch(['video.mp4'], output, checkpoint=checkpoint, upload=True)
+    first = list(uploaded)
+    fail['after'] = None
+    run_batch(['video.mp4'], output, checkpoint=checkpoint, upload=True)
+
+    # Yüklemesi yarıda kalan segment tekrar gönderilmez, diğerleri bir kez gönderilir
+    assert len(uploaded) == len(set(uploaded)) == len(TASKS) - 1
+    assert uploaded[:2] == first
+
+
+def test_run_batch_resumes_without_losing_or_duplicating(tmp_path, fake_pipeline):
+    output, checkpoint = str(tmp_path / 'out.jsonl'), str(tmp_path / 'ckpt')
+    FAIL_AT['start'] = 300
+    with pytest.raises(RuntimeError):
+        run_batch(['video.mp4'], output, checkpoint=checkpoint)
+    completed, _ = load_checkpoint(checkpoint)
+    assert task_key(TASKS[0]) in completed
+    assert task_key(TASKS[3]) not in completed
+
+    FAIL_AT['start'] = None
+    run_batch(['video.mp4'], output, checkpoint=checkpoint)
+
+    frames = sorted(line['frame'] for line in read_lines(output))
+    assert frames == [task[1] for task in TASKS]
+
+
+def test_run_batch_without_checkpoint_overwrites(tmp_path, fake_pipeline):
+    output = str(tmp_path / 'out.jsonl')
+    run_batch(['video.mp4'], output)
+    run_batch(['video.mp4'], output)
+    assert len(read_lines(output)) == len(TASKS)
+
+
+def test_parquet_output_keeps_earlier_segments_on_resume(tmp_path, fake_pipeline):
+    pq = pytest.importorskip('pyarrow.parquet')
+    output, checkpoint = str(tmp_path / 'out.parquet'), str(tmp_path / 'ckpt')
+    FAIL_AT['start'] = 200
+    with pytest.raises(RuntimeError):
+        run_batch(['video.mp4'], output, checkpoint=checkpoint)
+    FAIL_AT['start'] = None
+    run_batch(['video.mp4'], output, checkpoint=checkpoint)
+
+    assert sorted(pq.read_table(output).column('frame').to_pylist()) == [task[1] for task in TASKS]
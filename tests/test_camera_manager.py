@@ -0,0 +1,83 @@
+import time
+import threading
+
+import numpy as np
+
+import camera_manager
+from camera_manager import CameraConnection, CameraManager
+
+
+class FakeCapture:
+    """
+    Capture whose reads can be made to hang, like a stalled RTSP session
+    """
+    instances = []
+
+    def __init__(self, source, options=None):
+        self.hang = threading.Event()
+        self.released = False
+        FakeCapture.instances.append(self)
+
+    def isOpened(self):
+        return True
+
+    def read(self):
+        if self.hang.is_set():
+            # OpenCV okuması gibi dışarıdan kesilemez
+            while not self.released:
+                time.sleep(0.01)
+            return False, None
+        time.sleep(0.01)
+        return True, np.zeros((4, 4, 3), dtype=np.uint8)
+
+    def release(self):
+        self.released = True
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_stale_opencv_read_is_replaced(monkeypatch):
+    FakeCapture.instances.clear()
+    monkeypatch.setattr(camera_manager, 'open_capture', FakeCapture)
+    conn = CameraConnection(1, 'rtsp://camera', stale_timeout=0.1).start()
+    try:
+        assert conn.wait_frame(0, timeout=1.0)[1] is not None
+        FakeCapture.instances[0].hang.set()
+        time.sleep(0.2)
+        conn.check_health()
+
+        # Yeni bağlantı frame üretir, takılan okuma ise kendi başına bırakılır
+        assert wait_until(lambda: len(FakeCapture.instances) == 2)
+        seq, _ = conn.wait_frame(0, timeout=0)
+        assert conn.wait_frame(seq, timeout=1.0)[1] is not None
+        assert conn.reconnect_count == 1
+    finally:
+        conn.stop()
+        FakeCapture.instances[0].release()
+
+
+def test_manager_stops_idle_connections(monkeypatch):
+    monkeypatch.setattr(camera_manager, 'open_capture', FakeCapture)
+    manager = CameraManager(health_interval=0.05, idle_timeout=0.2)
+    conn = manager.ensure(1, 'rtsp://camera')
+    assert wait_until(lambda: conn.stopped)
+    assert manager.get(1) is None
+
+
+def test_manager_keeps_watched_connections(monkeypatch):
+    monkeypatch.setattr(camera_manager, 'open_capture', FakeCapture)
+    manager = CameraManager(health_interval=0.05, idle_timeout=0.2)
+    conn = manager.ensure(1, 'rtsp://camera')
+    seq = 0
+    deadline = time.time() + 0.5
+    while time.time() < deadline:
+        seq, _ = conn.wait_frame(seq, timeout=0.05)
+    assert not conn.stopped
+    manager.stop_all()
@@ -0,0 +1,78 @@
+import math
+import random
+from collections import Counter
+
+from camera_sharding import assign_cameras, settle_capacity
+
+CAMERAS = list(range(1, 201))
+
+
+def test_every_camera_is_assigned_to_a_live_node():
+    assignment = assign_cameras(CAMERAS, {'a': 10, 'b': 10, 'c': 10})
+
+    assert sorted(assignment) == CAMERAS
+    assert set(assignment.values()) == {'a', 'b', 'c'}
+
+
+def test_empty_inputs():
+    assert assign_cameras([], {'a': 10}) == {}
+    assert assign_cameras(CAMERAS, {}) == {}
+    assert assign_cameras(CAMERAS, {'a': 0, 'b': None}) == {}
+
+
+def test_assignment_is_deterministic():
+    capacities = {'a': 10, 'b': 20}
+
+    assert assign_cameras(CAMERAS, capacities) == assign_cameras(list(reversed(CAMERAS)), dict(reversed(capacities.items())))
+
+
+def test_load_is_bounded_by_capacity_share():
+    capacities = {'a': 10, 'b': 20, 'c': 30}
+    load = Counter(assign_cameras(CAMERAS, capacities, balance=1.1).values())
+
+    total = sum(capacities.values())
+    for node, capacity in capacities.items():
+        assert load[node] <= math.ceil(len(CAMERAS) * capacity / total * 1.1)
+    assert load['c'] > load['a']
+
+
+def test_adding_a_node_only_moves_cameras_to_it():
+    before = assign_cameras(CAMERAS, {'a': 10, 'b': 10, 'c': 10})
+    after = assign_cameras(CAMERAS, {'a': 10, 'b': 10, 'c': 10, 'd': 10})
+
+    moved = [camera for camera in CAMERAS if before[camera] != after[camera]]
+    assert moved
+    # Sınırlı yük nedeniyle birkaç kamera dolu düğümden komşusuna kayabilir
+    assert sum(1 for camera in moved if after[camera] == 'd') >= 0.8 * len(moved)
+    assert len(moved) < 0.4 * len(CAMERAS)
+
+
+def test_removing_a_node_keeps_other_cameras_in_place():
+    before = assign_cameras(CAMERAS, {'a': 10, 'b': 10, 'c': 10})
+    after = assign_cameras(CAMERAS, {'a': 10, 'b': 10})
+
+    assert 'c' not in after.values()
+    kept = [camera for camera in CAMERAS if before[camera] != 'c']
+    moved = [camera for camera in kept if after[camera] != before[camera]]
+    assert len(moved) < 0.1 * len(kept)
+
+
+def test_settle_capacity_ignores_jitter():
+    assert settle_capacity(None, 12.34) == 12.3
+    assert settle_capacity(10.0, 12.4) == 10.0
+    assert settle_capacity(10.0, 7.6) == 10.0
+    assert settle_capacity(10.0, 12.6) == 12.6
+    assert settle_capacity(10.0, 7.0) == 7.0
+
+
+def test_capacity_jitter_does_not_move_cameras():
+    rng = random.Random(0)
+    nominal = {'a': 10.0, 'b': 20.0, 'c': 30.0}
+    # İlk ölçüm de dalgalıdır; sonraki ölçümler ona göre %22'ye kadar sapabilir
+    stored = {node: settle_capacity(None, capacity * rng.uniform(0.9, 1.1)) for node, capacity in nominal.items()}
+    before = assign_cameras(CAMERAS[:40], stored)
+
+    for _ in range(60):
+        for node, capacity in nominal.items():
+            stored[node] = settle_capacity(stored[node], capacity * rng.uniform(0.9, 1.1))
+        assert assign_cameras(CAMERAS[:40], stored) == before
@@ -0,0 +1,32 @@
+import uuid
+
+import pytest
+
+from dedup_store import MemoryDedupStore, SharedMemoryDedupStore, SQLiteDedupStore
+
+
+@pytest.fixture(params=['memory', 'sqlite', 'shm'])
+def store(request, tmp_path):
+    if request.param == 'memory':
+        yield MemoryDedupStore()
+    elif request.param == 'sqlite':
+        yield SQLiteDedupStore(str(tmp_path / 'dedup.db'))
+    else:
+        name = f"test_dedup_{uuid.uuid4().hex[:8]}"
+        shm = SharedMemoryDedupStore(name, slots=64, lock_path=str(tmp_path / 'dedup.lock'))
+        yield shm
+        shm._shm.unlink()
+        shm.close()
+
+
+def test_seen_recently_records_first_sighting(store):
+    assert not store.seen_recently('34AB123', 60)
+    assert store.seen_recently('34AB123', 60)
+    assert not store.seen_recently('06XYZ99', 60)
+
+
+def test_check_without_record(store):
+    assert not store.seen_recently('34AB123', 60, record=False)
+    assert not store.seen_recently('34AB123', 60, record=False)
+    assert not store.seen_recently('34AB123', 60)
+    assert store.seen_recently('34AB123', 60, record=False)
@@ -0,0 +1,66 @@
+import os
+from datetime import datetime
+
+from evidence_store import THUMB_DIR, evict
+
+NOW = datetime(2026, 3, 10, 12, 0, 0)
+
+
+def write(root, relative, size=100, mtime=None):
+    path = os.path.join(root, relative)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(b'x' * size)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+    return path
+
+
+def ref(day, n):
+    key = f"{n:032x}"
+    return f"{day}/{key[:2]}/{key}"
+
+
+def test_missing_root_is_ignored(tmp_path):
+    assert evict(str(tmp_path / 'missing'), max_bytes=1, max_age_days=1) == 0
+
+
+def test_max_age_removes_old_days_and_their_thumbnails(tmp_path):
+    root = str(tmp_path)
+    old = write(root, f"{ref('2026-03-01', 1)}.plate.jpg")
+    old_thumb = write(root, f"{THUMB_DIR}/160/{ref('2026-03-01', 1)}.plate.jpg")
+    kept = write(root, f"{ref('2026-03-08', 2)}.plate.jpg")
+    kept_thumb = write(root, f"{THUMB_DIR}/160/{ref('2026-03-08', 2)}.plate.jpg")
+
+    assert evict(root, max_age_days=7, now=NOW) == 1
+
+    assert not os.path.exists(old)
+    assert not os.path.exists(old_thumb)
+    assert os.path.exists(kept)
+    assert os.path.exists(kept_thumb)
+
+
+def test_max_bytes_removes_oldest_files_first(tmp_path):
+    root = str(tmp_path)
+    oldest = write(root, f"{ref('2026-03-01', 1)}.plate.jpg", mtime=1000)
+    older = write(root, f"{ref('2026-03-02', 2)}.plate.jpg", mtime=3000)
+    newer = write(root, f"{ref('2026-03-02', 3)}.plate.jpg", mtime=2000)
+    newest = write(root, f"{ref('2026-03-03', 4)}.plate.jpg", mtime=500)
+    thumb = write(root, f"{THUMB_DIR}/160/{ref('2026-03-02', 3)}.plate.jpg")
+
+    # Gün sırası önce gelir, gün içinde değişiklik zamanına bakılır
+    assert evict(root, max_bytes=200) == 2
+
+    assert not os.path.exists(oldest)
+    assert not os.path.exists(newer)
+    assert not os.path.exists(thumb)
+    assert os.path.exists(older)
+    assert os.path.exists(newest)
+
+
+def test_under_limits_nothing_is_removed(tmp_path):
+    root = str(tmp_path)
+    path = write(root, f"{ref('2026-03-09', 1)}.plate.jpg")
+
+    assert evict(root, max_bytes=1000, max_age_days=7, now=NOW) == 0
+    assert os.path.exists(path)
@@ -0,0 +1,64 @@
+import pytest
+from flask import Flask
+
+import http_cache
+from database import db, init_db
+from http_cache import ensure_table_versions, mark_tables_changed
+from models import AuthorizedPlate, TableVersion
+
+
+@pytest.fixture
+def session():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    init_db(app)
+    with app.app_context():
+        db.create_all()
+        ensure_table_versions()
+        yield db.session
+        db.session.remove()
+        db.drop_all()
+
+
+def version(table='authorized_plate'):
+    return db.session.query(TableVersion.version).filter_by(name=table).scalar()
+
+
+def test_commit_bumps_version_of_written_tables(session):
+    session.add(AuthorizedPlate(plate_number='34AB123'))
+    session.commit()
+    assert version() == 1
+    assert version('plate_record') == 0
+
+    AuthorizedPlate.query.filter_by(plate_number='34AB123').update({'is_active': False})
+    session.commit()
+    assert version() == 2
+
+
+def test_manually_marked_tables_are_bumped(session):
+    mark_tables_changed(session, ['authorized_plate'])
+    session.commit()
+    assert version() == 1
+
+
+def test_rollback_discards_changes(session):
+    session.add(AuthorizedPlate(plate_number='34AB123'))
+    session.flush()
+    session.rollback()
+    session.commit()
+    assert version() == 0
+
+
+def test_failed_bump_fails_the_commit(session, monkeypatch):
+    def fail(connection, tables):
+        raise RuntimeError("sürüm tablosu kilitli")
+
+    monkeypatch.setattr(http_cache, 'bump_table_versions', fail)
+    session.add(AuthorizedPlate(plate_number='34AB123'))
+    with pytest.raises(RuntimeError):
+        session.commit()
+    session.rollback()
+
+    # Veri ETag'i değişmeden görünür olmaz
+    assert AuthorizedPlate.query.count() == 0
+    assert version() == 0
@@ -0,0 +1,40 @@
+from flask import Flask
+
+from ingest_queue import WriteBehindQueue
+
+
+def make_queue(writer):
+    return WriteBehindQueue(Flask(__name__), writer, flush_interval=0.01, retries=2)
+
+
+def test_thread_starts_on_first_submit():
+    written = []
+    ingest = make_queue(written.extend)
+    assert ingest._thread is None
+
+    ingest.submit({'plate_number': 'A'})
+    ingest.stop()
+
+    assert written == [{'plate_number': 'A'}]
+    assert ingest.stats() == {'pending': 0, 'flushed': 1, 'failed': 0}
+
+
+def test_stop_without_submit_is_a_no_op():
+    ingest = make_queue(lambda rows: None)
+    ingest.stop()
+    assert ingest._thread is None
+
+
+def test_failing_batch_drops_only_bad_rows():
+    written = []
+
+    def writer(rows):
+        if any(row['plate_number'] is None for row in rows):
+            raise ValueError("plate_number boş olamaz")
+        written.extend(rows)
+
+    ingest = make_queue(writer)
+    ingest._flush([{'plate_number': 'A'}, {'plate_number': None}, {'plate_number': 'B'}])
+
+    assert [row['plate_number'] for row in written] == ['A', 'B']
+    assert ingest.stats() == {'pending': 0, 'flushed': 2, 'failed': 1}
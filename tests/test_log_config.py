@@ -0,0 +1,72 @@
+import logging
+
+from log_config import RateLimitFilter
+
+DETECTED = "Plaka tespit edildi: %s (Güven: %.2f)"
+
+
+def record(msg, *args, **extra):
+    rec = logging.LogRecord('plate_detection', logging.INFO, __file__, 1, msg, args, None)
+    rec.__dict__.update(extra)
+    return rec
+
+
+def detected(plate, confidence):
+    return record(DETECTED, plate, confidence, plate_number=plate, confidence=confidence)
+
+
+def passed(log_filter, records):
+    return [rec for rec in records if log_filter.filter(rec)]
+
+
+def test_repeated_detection_with_varying_confidence_is_throttled():
+    log_filter = RateLimitFilter(rate=0.001, burst=3)
+
+    records = [detected('34AB123', 0.6 + i / 1000) for i in range(50)]
+
+    assert len(passed(log_filter, records)) == 3
+
+
+def test_distinct_plates_are_limited_separately():
+    log_filter = RateLimitFilter(rate=0.001, burst=2)
+
+    records = [detected(plate, 0.9 + i / 100) for i in range(5) for plate in ('34AB123', '06XYZ99')]
+
+    assert [rec.plate_number for rec in passed(log_filter, records)] == ['34AB123', '06XYZ99'] * 2
+
+
+def test_arguments_without_plate_number_share_one_bucket():
+    log_filter = RateLimitFilter(rate=0.001, burst=2)
+
+    records = [record("Kare süresi: %.3f", i / 100) for i in range(10)]
+
+    assert len(passed(log_filter, records)) == 2
+
+
+def test_sampling_reports_suppressed_count():
+    log_filter = RateLimitFilter(rate=0.001, burst=1, sample_every=5)
+
+    kept = passed(log_filter, [detected('34AB123', i / 100) for i in range(11)])
+
+    assert len(kept) == 3
+    assert [getattr(rec, 'suppressed', 0) for rec in kept] == [0, 4, 4]
+
+
+def test_errors_are_never_limited():
+    log_filter = RateLimitFilter(rate=0.001, burst=1)
+    records = [record("Bağlantı hatası: %s", 'x') for _ in range(5)]
+    for rec in records:
+        rec.levelno = logging.ERROR
+
+    assert len(passed(log_filter, records)) == 5
+
+
+def test_oldest_buckets_are_evicted_first():
+    log_filter = RateLimitFilter(rate=0.001, burst=1, max_keys=3)
+
+    assert passed(log_filter, [detected('A', 0.9), detected('B', 0.9), detected('C', 0.9)])
+    # A yeniden kullanıldı; yeni anahtar en eski kovayı (B) atar, A'nın sınırı korunur
+    assert not passed(log_filter, [detected('A', 0.8)])
+    assert passed(log_filter, [detected('D', 0.9)])
+    assert not passed(log_filter, [detected('A', 0.7), detected('C', 0.7)])
+    assert passed(log_filter, [detected('B', 0.9)])
@@ -0,0 +1,61 @@
+import io
+
+import pytest
+
+from plate_import import DEFAULT_SENSITIVITY, parse_plate_csv
+
+
+def parse(text):
+    errors = []
+    rows = list(parse_plate_csv(io.StringIO(text), errors))
+    return rows, errors
+
+
+def test_rows_are_normalized_and_defaulted():
+    rows, errors = parse(
+        "plate_number,description,is_active,sensitivity\n"
+        "34 ab 123, Site girişi ,evet,90\n"
+        "06xyz99,,,\n"
+    )
+
+    assert errors == []
+    assert rows == [
+        {'plate_number': '34AB123', 'description': 'Site girişi', 'is_active': True, 'sensitivity': 90.0},
+        {'plate_number': '06XYZ99', 'description': '', 'is_active': True, 'sensitivity': DEFAULT_SENSITIVITY},
+    ]
+
+
+def test_optional_columns_may_be_missing():
+    rows, errors = parse("plate_number\n35KLM7\n")
+
+    assert errors == []
+    assert rows == [{'plate_number': '35KLM7', 'description': '', 'is_active': True,
+                     'sensitivity': DEFAULT_SENSITIVITY}]
+
+
+def test_is_active_values():
+    rows, errors = parse("plate_number,is_active\nA1,pasif\nA2,0\nA3,Active\n")
+
+    assert errors == []
+    assert [row['is_active'] for row in rows] == [False, False, True]
+
+
+def test_invalid_rows_are_reported_with_line_numbers():
+    rows, errors = parse(
+        "plate_number,is_active,sensitivity\n"
+        "34AB123,,50\n"
+        ",,\n"
+        "34AB124,belki,\n"
+        "34AB125,,150\n"
+        "34AB126,,abc\n"
+        f"{'X' * 21},,\n"
+    )
+
+    assert [row['plate_number'] for row in rows] == ['34AB123']
+    assert [error['line'] for error in errors] == [3, 4, 5, 6, 7]
+    assert 'is_active' in errors[1]['error']
+
+
+def test_header_without_plate_number_is_rejected():
+    with pytest.raises(ValueError):
+        parse("plate,description\n34AB123,x\n")
@@ -0,0 +1,65 @@
+import json
+
+import numpy as np
+import pytest
+
+from roi import RegionOfInterest, roi_for_source
+
+
+def test_rectangle_crop_and_offset():
+    roi = RegionOfInterest([0.25, 0.5, 0.5, 0.5])
+    frame = np.arange(100 * 200 * 3, dtype=np.uint32).reshape(100, 200, 3).astype(np.uint8)
+
+    region, offset = roi.crop(frame)
+
+    assert roi.is_rectangle
+    assert offset == (50, 50)
+    assert region.shape == (50, 100, 3)
+    assert np.array_equal(region, frame[50:100, 50:150])
+
+
+def test_polygon_blacks_out_pixels_outside():
+    roi = RegionOfInterest([[0, 0], [1, 0], [0, 1]])
+    frame = np.full((100, 100, 3), 255, dtype=np.uint8)
+
+    region, offset = roi.crop(frame)
+
+    assert not roi.is_rectangle
+    assert offset == (0, 0)
+    assert region[5, 5].tolist() == [255, 255, 255]
+    assert region[95, 95].tolist() == [0, 0, 0]
+
+
+def test_motion_mask_covers_region():
+    mask = RegionOfInterest([0, 0, 0.5, 1]).motion_mask((10, 4))
+
+    assert mask.shape == (4, 10)
+    assert mask[:, :5].all()
+    assert not mask[:, 7:].any()
+
+
+@pytest.mark.parametrize('spec', [
+    [],
+    [0.1, 0.2, 0.3],
+    [[0, 0], [1, 1]],
+    [0.5, 0.5, 0.8, 0.2],
+    'not json',
+])
+def test_invalid_specs_raise_value_error(spec):
+    with pytest.raises(ValueError):
+        RegionOfInterest(spec)
+
+
+def test_from_settings():
+    assert RegionOfInterest.from_settings({}) is None
+    assert RegionOfInterest.from_settings(None) is None
+    assert RegionOfInterest.from_settings({'roi': [0, 0, 1, 1]}).bounds == (0.0, 0.0, 1.0, 1.0)
+
+
+def test_roi_for_source():
+    spec = json.dumps({'rtsp://cam1': [0, 0, 0.5, 0.5]})
+
+    assert roi_for_source('rtsp://cam1', spec).bounds == (0.0, 0.0, 0.5, 0.5)
+    assert roi_for_source('rtsp://cam2', spec) is None
+    assert roi_for_source('any', '[0, 0, 1, 1]').bounds == (0.0, 0.0, 1.0, 1.0)
+    assert roi_for_source('any', '[2, 0, 1, 1]') is None
@@ -0,0 +1,91 @@
+from datetime import datetime, timedelta
+
+import pytest
+from flask import Flask
+
+from database import db, init_db
+from models import Visit
+from visits import record_visits
+
+T0 = datetime(2026, 1, 1, 8, 0, 0)
+GAP = timedelta(seconds=60)
+
+
+@pytest.fixture
+def session():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    init_db(app)
+    with app.app_context():
+        db.create_all()
+        yield db.session
+        db.session.remove()
+        db.drop_all()
+
+
+def event(plate_number='34ABC123', seconds=0, camera_id=None, confidence=0.9, authorized=False, evidence=None):
+    return {
+        'plate_number': plate_number,
+        'camera_id': camera_id,
+        'timestamp': T0 + timedelta(seconds=seconds),
+        'confidence': confidence,
+        'is_authorized': authorized,
+        'action_taken': "Kapı Açıldı" if authorized else "Erişim Reddedildi",
+        'evidence': evidence
+    }
+
+
+def visits():
+    return Visit.query.order_by(Visit.plate_number, Visit.camera_id, Visit.first_seen).all()
+
+
+def test_sightings_within_gap_form_one_visit(session):
+    record_visits([event(seconds=0), event(seconds=30), event(seconds=80)], GAP)
+    session.commit()
+
+    [visit] = visits()
+    assert visit.first_seen == T0
+    assert visit.last_seen == T0 + timedelta(seconds=80)
+    assert visit.sighting_count == 3
+
+
+def test_gap_opens_new_visit(session):
+    record_visits([event(seconds=0), event(seconds=61)], GAP)
+    session.commit()
+
+    assert [visit.sighting_count for visit in visits()] == [1, 1]
+
+
+def test_plates_and_cameras_are_separate(session):
+    record_visits([event(), event(plate_number='06XYZ99'), event(camera_id=1)], GAP)
+    session.commit()
+
+    assert [(visit.plate_number, visit.camera_id) for visit in visits()] == [
+        ('06XYZ99', None), ('34ABC123', None), ('34ABC123', 1)
+    ]
+
+
+def test_later_batch_extends_existing_visit(session):
+    record_visits([event(seconds=0)], GAP)
+    session.commit()
+    record_visits([event(seconds=45), event(seconds=-30)], GAP)
+    session.commit()
+
+    [visit] = visits()
+    assert visit.first_seen == T0 - timedelta(seconds=30)
+    assert visit.sighting_count == 3
+
+
+def test_authorization_and_best_evidence(session):
+    record_visits([
+        event(seconds=0, confidence=0.7, evidence='low'),
+        event(seconds=10, confidence=0.95, authorized=True, evidence='best'),
+        event(seconds=20, confidence=0.8)
+    ], GAP)
+    session.commit()
+
+    [visit] = visits()
+    assert visit.is_authorized
+    assert visit.action_taken == "Kapı Açıldı"
+    assert visit.best_confidence == 0.95
+    assert visit.evidence == 'best'
@@ -0,0 +1,90 @@
+import time
+import logging
+import threading
+from collections import OrderedDict
+from flask_login import UserMixin
+
+logger = logging.getLogger(__name__)
+
+
+class SessionUser(UserMixin):
+    """
+    Detached snapshot of the fields authenticated requests read from a User
+    """
+    # UserMixin.is_active bir property; örnek niteliği olarak atanabilmesi için gölgelenir
+    is_active = True
+
+    def __init__(self, id, username, email, role, is_active):
+        self.id = id
+        self.username = username
+        self.email = email
+        self.role = role
+        self.is_active = is_active
+
+    @classmethod
+    def from_user(cls, user):
+        return cls(user.id, user.username, user.email, user.role, user.is_active)
+
+
+class UserCache:
+    """
+    Per-process TTL cache of session users
+
+    get() calls loader(user_id) only on a miss or after ttl seconds, so
+    authenticated requests normally need no database query. Endpoints that
+    change a user call invalidate(); other worker processes see the change
+    after at most ttl seconds.
+    """
+    def __init__(self, loader, ttl=30.0, max_entries=1024, log_every=10000):
+        self.loader = loader
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.log_every = log_every
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry and now - entry[1] <= self.ttl:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                self._maybe_log()
+                return entry[0]
+            self.misses += 1
+            self._maybe_log()
+
+        user = self.loader(user_id)
+        if user is not None:
+            with self._lock:
+                self._entries[user_id] = (user, now)
+                self._entries.move_to_end(user_id)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return user
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def _maybe_log(self):
+        lookups = self.hits + self.misses
+        if self.log_every and lookups % self.log_every == 0:
+            logger.info(f"User cache: {self._stats()}")
+
+    def _stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            'entries': len(self._entries),
+            'ttl': self.ttl
+        }
+
+    def stats(self):
+        with self._lock:
+            return self._stats()
@@ -0,0 +1,358 @@
+import os
+import re
+import json
+import time
+import shutil
+import select
+import logging
+import threading
+import subprocess
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# OPENCV_FFMPEG_CAPTURE_OPTIONS süreç genelinde okunur; açılışları sıraya koy
+_ffmpeg_env_lock = threading.Lock()
+
+
+class CaptureOptions:
+    """
+    Capture tuning shared by every backend
+
+    transport:   'tcp' or 'udp' for RTSP sources
+    buffer_size: frames OpenCV may queue internally (1 = always the newest)
+    frame_skip:  frames dropped with grab() between two returned frames
+    width/height: output size; the ffmpeg backend scales while decoding
+    backend:     'opencv' or 'ffmpeg'
+    """
+    def __init__(self, transport='tcp', buffer_size=1, frame_skip=0, width=None,
+                 height=None, backend='opencv', open_timeout_ms=5000,
+                 read_timeout_ms=5000, realtime=False):
+        self.transport = transport
+        self.buffer_size = int(buffer_size)
+        self.frame_skip = int(frame_skip)
+        self.width = int(width) if width else None
+        self.height = int(height) if height else None
+        self.backend = backend
+        self.open_timeout_ms = int(open_timeout_ms)
+        self.read_timeout_ms = int(read_timeout_ms)
+        self.realtime = realtime
+
+    @classmethod
+    def from_settings(cls, settings, source=None):
+        """
+        Build options from the 'capture' section of CameraSettings.settings
+
+        Malformed settings are logged with the masked source and the
+        defaults are used instead.
+        """
+        capture = (settings or {}).get('capture') or {}
+        try:
+            if not isinstance(capture, dict):
+                raise ValueError("'capture' bir nesne olmalı")
+            return cls(**{k: v for k, v in capture.items() if k in cls().__dict__})
+        except (TypeError, ValueError) as e:
+            logger.error("Geçersiz yakalama ayarları (%s), varsayılanlar kullanılıyor: %s", mask_source(source), e)
+            return cls()
+
+    @classmethod
+    def from_env(cls):
+        """
+        Build options from CAPTURE_* environment variables
+        """
+        defaults = cls()
+        return cls(
+            transport=os.environ.get('CAPTURE_TRANSPORT', defaults.transport),
+            buffer_size=os.environ.get('CAPTURE_BUFFER_SIZE', defaults.buffer_size),
+            frame_skip=os.environ.get('CAPTURE_FRAME_SKIP', defaults.frame_skip),
+            width=os.environ.get('CAPTURE_WIDTH') or None,
+            height=os.environ.get('CAPTURE_HEIGHT') or None,
+            backend=os.environ.get('CAPTURE_BACKEND', defaults.backend),
+        )
+
+
+def build_stream_url(camera):
+    """
+    Return (url, masked_url) for a CameraSettings row
+    """
+    auth = f"{camera.username}:{camera.password}@" if camera.username and camera.password else ""
+    if camera.stream_type == 'rtsp':
+        url = f"rtsp://{auth}{camera.ip_address}:{camera.port}{camera.rtsp_path}"
+    else:
+        url = f"http://{camera.ip_address}:{camera.port}/video_feed"
+    return url, url.replace(auth, '***@') if auth else url
+
+
+def mask_source(source):
+    """
+    Source with the credentials of a stream URL replaced by ***, safe to log
+    """
+    return re.sub(r'(://)[^/@]+@', r'\1***@', str(source))
+
+
+def settings_for_source(source, spec=None):
+    """
+    CameraSettings-style settings of a detector source from DETECTOR_CAMERA_SETTINGS
+
+    The value is a JSON object mapping sources (as given on the command
+    line) to settings objects with the same keys as CameraSettings.settings
+    (target_fps, idle_fps, roi, capture).
+    """
+    spec = spec if spec is not None else os.environ.get('DETECTOR_CAMERA_SETTINGS')
+    if not spec:
+        return {}
+    try:
+        if isinstance(spec, str):
+            spec = json.loads(spec)
+        settings = spec.get(str(source)) if isinstance(spec, dict) else None
+    except ValueError as e:
+        logger.error("Geçersiz kamera ayarları (%s): %s", mask_source(source), e)
+        return {}
+    return settings if isinstance(settings, dict) else {}
+
+
+def _scaled_size(width, height, options):
+    """
+    Apply options.width/height to a source size, keeping aspect ratio if only one is set
+    """
+    if options.width and options.height:
+        return options.width, options.height
+    if options.width:
+        return options.width, max(2, int(round(height * options.width / width / 2)) * 2)
+    if options.height:
+        return max(2, int(round(width * options.height / height / 2)) * 2), options.height
+    return width, height
+
+
+class OpenCVCapture:
+    """
+    cv2.VideoCapture with low-latency FFmpeg options, grab()-based frame
+    skipping and optional downscaling
+
+    OpenCV always decodes at the source resolution; width/height are applied
+    with cv2.resize after decoding. Use backend='ffmpeg' to scale while
+    decoding.
+    """
+    def __init__(self, source, options=None):
+        self.source = source
+        self.options = options or CaptureOptions()
+        self._size = None
+
+        if isinstance(source, int):
+            self.cap = cv2.VideoCapture(source)
+        else:
+            # Düşük gecikme bayrakları sadece ağ akışları için; yerel dosyalarda ilk frame'i düşürüyor
+            ffmpeg_options = ['fflags;nobuffer', 'flags;low_delay'] if '://' in str(source) else []
+            if str(source).startswith('rtsp://'):
+                ffmpeg_options.insert(0, f'rtsp_transport;{self.options.transport}')
+            params = [cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, self.options.open_timeout_ms,
+                      cv2.CAP_PROP_READ_TIMEOUT_MSEC, self.options.read_timeout_ms]
+            with _ffmpeg_env_lock:
+                previous = os.environ.get('OPENCV_FFMPEG_CAPTURE_OPTIONS')
+                os.environ['OPENCV_FFMPEG_CAPTURE_OPTIONS'] = '|'.join(ffmpeg_options)
+                try:
+                    self.cap = cv2.VideoCapture(source, cv2.CAP_FFMPEG, params)
+                finally:
+                    if previous is None:
+                        os.environ.pop('OPENCV_FFMPEG_CAPTURE_OPTIONS', None)
+                    else:
+                        os.environ['OPENCV_FFMPEG_CAPTURE_OPTIONS'] = previous
+
+        if self.cap.isOpened():
+            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, self.options.buffer_size)
+            width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            if width and height:
+                self._size = _scaled_size(width, height, self.options)
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def grab(self):
+        return self.cap.grab()
+
+    def read(self):
+        for _ in range(self.options.frame_skip):
+            if not self.cap.grab():
+                return False, None
+
+        ret, frame = self.cap.read()
+        if not ret:
+            return False, None
+
+        if self._size and (frame.shape[1], frame.shape[0]) != self._size:
+            frame = cv2.resize(frame, self._size, interpolation=cv2.INTER_AREA)
+        return True, frame
+
+    def get(self, prop):
+        return self.cap.get(prop)
+
+    def release(self):
+        self.cap.release()
+
+
+class FFmpegPipeCapture:
+    """
+    Decode with an ffmpeg subprocess writing raw BGR frames to a pipe
+
+    Scaling and frame dropping happen inside ffmpeg, and each frame is read
+    into one preallocated buffer. The returned array is reused on the next
+    read(); copy it if it must outlive the call.
+
+    The capture counts as opened only once ffprobe reported the source size
+    or, when the size was given and probing skipped, the first frame
+    arrived within open_timeout_ms. A frame that does not arrive within
+    read_timeout_ms fails the read and stops ffmpeg, so a stalled source
+    does not block the reader.
+    """
+    def __init__(self, source, options=None):
+        self.source = source
+        self.options = options or CaptureOptions(backend='ffmpeg')
+        self.process = None
+        self._buffer = None
+        self._pending = False
+
+        binary = shutil.which('ffmpeg')
+        if binary is None:
+            logger.error("ffmpeg bulunamadı, FFmpeg pipe kaynağı açılamıyor")
+            return
+
+        # İki boyut da verildiyse kaynağı yoklamaya gerek yok; ffmpeg doğrudan bu boyuta ölçekler
+        if self.options.width and self.options.height:
+            width, height = 0, 0
+        else:
+            width, height = self._probe_size()
+        if width and height:
+            self.width, self.height = _scaled_size(width, height, self.options)
+        elif self.options.width and self.options.height:
+            # Kaynak boyutu bilinmiyor; ffmpeg her durumda istenen boyuta ölçeklesin
+            self.width, self.height = self.options.width, self.options.height
+        else:
+            logger.error("Kaynak çözünürlüğü okunamadı: %s", mask_source(source))
+            return
+        self._buffer = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        self._view = memoryview(self._buffer).cast('B')
+
+        command = [binary, '-hide_banner', '-loglevel', 'error', '-nostdin',
+                   '-fflags', 'nobuffer', '-flags', 'low_delay']
+        if str(source).startswith('rtsp://'):
+            command += ['-rtsp_transport', self.options.transport]
+        if self.options.realtime:
+            command.append('-re')
+        command += ['-i', str(source)]
+
+        filters = []
+        if self.options.frame_skip:
+            filters.append(f"select='not(mod(n\\,{self.options.frame_skip + 1}))'")
+        if (self.width, self.height) != (width, height):
+            filters.append(f'scale={self.width}:{self.height}:flags=area')
+        if filters:
+            command += ['-vf', ','.join(filters), '-vsync', '0']
+        command += ['-an', '-f', 'rawvideo', '-pix_fmt', 'bgr24', '-']
+
+        # Tamponsuz boru: select() ile beklenebilsin diye veri Python tamponunda bekletilmez
+        self.process = subprocess.Popen(command, stdout=subprocess.PIPE, bufsize=0)
+
+        # Yoklama yapılmadıysa kaynağa ulaşılabildiği ancak ilk frame ile anlaşılır
+        if not (width and height):
+            if self._read_into_buffer(self.options.open_timeout_ms):
+                self._pending = True
+            else:
+                logger.error("Kaynaktan ilk frame alınamadı: %s", mask_source(source))
+                self.release()
+
+    def _probe_size(self):
+        """
+        Source resolution from ffprobe, bounded by open_timeout_ms; (0, 0) if unknown
+        """
+        binary = shutil.which('ffprobe')
+        if binary is None:
+            logger.error("ffprobe bulunamadı, kaynak çözünürlüğü okunamıyor")
+            return 0, 0
+
+        command = [binary, '-v', 'error', '-select_streams', 'v:0',
+                   '-show_entries', 'stream=width,height', '-of', 'csv=p=0:s=x']
+        source = str(self.source)
+        if '://' in source:
+            command += ['-rw_timeout', str(self.options.open_timeout_ms * 1000)]
+        if source.startswith('rtsp://'):
+            command += ['-rtsp_transport', self.options.transport]
+        command.append(source)
+
+        try:
+            output = subprocess.run(command, capture_output=True, text=True,
+                                    timeout=self.options.open_timeout_ms / 1000 + 1).stdout
+        except subprocess.TimeoutExpired:
+            logger.error("Kaynak çözünürlüğü zaman aşımına uğradı")
+            return 0, 0
+        try:
+            width, height = output.strip().splitlines()[0].split('x')[:2]
+            return int(width), int(height)
+        except (IndexError, ValueError):
+            return 0, 0
+
+    def isOpened(self):
+        return self.process is not None and (self._pending or self.process.poll() is None)
+
+    def _read_into_buffer(self, timeout_ms=None):
+        if self.process is None:
+            return False
+        if self._pending:
+            self._pending = False
+            return True
+        timeout_ms = self.options.read_timeout_ms if timeout_ms is None else timeout_ms
+        deadline = time.monotonic() + timeout_ms / 1000 if timeout_ms > 0 else None
+        stdout = self.process.stdout
+        received = 0
+        total = len(self._view)
+        while received < total:
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not select.select([stdout], [], [], remaining)[0]:
+                    # Yarım kalan frame akışı kaydırır; ffmpeg durdurulur, bağlantı yeniden açılmalı
+                    logger.error("Kaynaktan %d ms içinde frame gelmedi: %s", timeout_ms, mask_source(self.source))
+                    self.release()
+                    return False
+            count = stdout.readinto(self._view[received:])
+            if not count:
+                return False
+            received += count
+        return True
+
+    def grab(self):
+        return self._read_into_buffer()
+
+    def read(self):
+        if not self._read_into_buffer():
+            return False, None
+        return True, self._buffer
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return self.width
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return self.height
+        return 0
+
+    def release(self):
+        if self.process is None:
+            return
+        self.process.kill()
+        self.process.stdout.close()
+        self.process.wait()
+        self.process = None
+
+
+def open_capture(source, options=None):
+    """
+    Open a video source with the backend selected in options
+
+    Integer device indexes always use OpenCV.
+    """
+    options = options or CaptureOptions()
+    if isinstance(source, str) and source.isdigit():
+        source = int(source)
+    if options.backend == 'ffmpeg' and not isinstance(source, int):
+        return FFmpegPipeCapture(source, options)
+    return OpenCVCapture(source, options)
@@ -0,0 +1,108 @@
+import os
+import logging
+from datetime import timedelta
+from itertools import groupby
+from sqlalchemy import text
+from database import db
+from models import PlateRecord, Visit
+
+logger = logging.getLogger(__name__)
+
+VISIT_GAP = timedelta(seconds=float(os.environ.get("VISIT_GAP_SECONDS", 60)))
+
+
+def _sighting_key(event):
+    return event['plate_number'], event.get('camera_id') or 0
+
+
+def _lock_sighting(plate_number, camera_id):
+    # Aynı plaka ve kameraya yazan eşzamanlı işlemler sıraya girer; kilit commit ile bırakılır.
+    # SQLite yazıcıları zaten tek tek çalıştırır.
+    if db.engine.dialect.name == 'postgresql':
+        db.session.execute(text("SELECT pg_advisory_xact_lock(hashtext(:key))"),
+                           {'key': f"visit:{plate_number}:{camera_id or 0}"})
+
+
+def record_visits(events, gap=VISIT_GAP, lock=True):
+    """
+    Merge plate events into Visit rows in the current session
+
+    Events of the same plate and camera that are at most gap apart extend
+    the latest visit; anything else opens a new one. The visit is marked
+    authorized if any of its sightings was. The caller commits.
+
+    With lock=True each plate/camera pair is locked (a transaction-level
+    advisory lock on PostgreSQL) before its latest visit is read, so two
+    writers cannot both open a visit for the same sighting. Pairs are
+    locked in sorted order, which keeps concurrent writers deadlock-free.
+    """
+    ordered = sorted(events, key=lambda event: (_sighting_key(event), event['timestamp']))
+    for (plate_number, _), group in groupby(ordered, key=_sighting_key):
+        group = list(group)
+        camera_id = group[0].get('camera_id')
+        if lock:
+            _lock_sighting(plate_number, camera_id)
+        visit = Visit.query.filter(
+            Visit.plate_number == plate_number,
+            Visit.camera_id == camera_id,
+            Visit.last_seen >= group[0]['timestamp'] - gap
+        ).order_by(Visit.last_seen.desc()).first()
+
+        for event in group:
+            timestamp = event['timestamp']
+            if visit is None or timestamp - visit.last_seen > gap or visit.first_seen - timestamp > gap:
+                visit = Visit(
+                    plate_number=plate_number,
+                    camera_id=camera_id,
+                    first_seen=timestamp,
+                    last_seen=timestamp,
+                    sighting_count=0,
+                    best_confidence=event['confidence'],
+                    is_authorized=False,
+                    action_taken=event['action_taken']
+                )
+                db.session.add(visit)
+
+            visit.first_seen = min(visit.first_seen, timestamp)
+            visit.last_seen = max(visit.last_seen, timestamp)
+            visit.sighting_count += 1
+            # Ziyaretin kanıtı en yüksek güvenli okumanın görüntüsüdür
+            if event.get('evidence') and (not visit.evidence or event['confidence'] >= visit.best_confidence):
+                visit.evidence = event['evidence']
+            visit.best_confidence = max(visit.best_confidence, event['confidence'])
+            if event['is_authorized'] and not visit.is_authorized:
+                visit.is_authorized = True
+                visit.action_taken = event['action_taken']
+
+
+def rebuild_visits(chunk_size=5000, gap=VISIT_GAP):
+    """
+    Build the Visit table from existing PlateRecord rows
+
+    Runs from init-db without concurrent writers, so no per-sighting locks
+    are taken (one transaction would otherwise hold one lock per plate).
+    """
+    Visit.query.delete()
+    records = PlateRecord.query.order_by(PlateRecord.timestamp).yield_per(chunk_size)
+    chunk = []
+    total = 0
+    for record in records:
+        chunk.append({
+            'plate_number': record.plate_number,
+            'camera_id': record.camera_id,
+            'timestamp': record.timestamp,
+            'confidence': record.confidence,
+            'is_authorized': record.is_authorized,
+            'action_taken': record.action_taken,
+            'evidence': record.evidence
+        })
+        if len(chunk) >= chunk_size:
+            record_visits(chunk, gap, lock=False)
+            db.session.flush()
+            total += len(chunk)
+            chunk = []
+    if chunk:
+        record_visits(chunk, gap, lock=False)
+        total += len(chunk)
+    db.session.commit()
+    logger.info(f"Rebuilt visits from {total} plate records")